@@ -1,80 +1,738 @@
 import json
-from flask import Flask, render_template, url_for, abort, send_from_directory
+import hashlib
+import math
+import argparse
+import time
+import markdown
+from flask import Flask, render_template, url_for, abort, send_from_directory, send_file, request, jsonify, g, redirect
+from werkzeug.security import safe_join
 import os
-from pathlib import Path # Import Path
+import posixpath
+import threading
+from quantities import QuantityTable
+from search_index import SearchIndex
+from ingredient_index import IngredientIndex
+from facet_index import FacetIndex
+from related_index import RelatedIndex
+from media_manifest import MediaManifest
+from link_graph import LinkGraph
+from suggest_index import SuggestIndex, SUGGEST_COUNT
+from recipe_json import RecipeJSONCache, RECIPE_FIELDS, encode_json
+from recipe_model import Recipe
+from render_cache import RenderCache
+from snapshot import RecipeSnapshot
+from parser import parse_recipes, recipe_image_files, LINK_RE
+from reloader import RecipeWatcher, DEFAULT_POLL_INTERVAL
+from metrics import MetricsRegistry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from image_cache import DerivativeCache, DERIVATIVE_FORMATS, DEFAULT_CACHE_BYTES, PREGENERATE_WIDTHS, Image, snap_width
 
 app = Flask(__name__)
 # Define the absolute path to the 'dishes' directory for send_from_directory
 # app.root_path is the directory where app.py is located (e.g., /app)
 DISHES_DIRECTORY = os.path.abspath(os.path.join(app.root_path, 'dishes'))
+# Written by parser.py
+RECIPES_JSON_PATH = 'recipes.json'
+RECIPES_NDJSON_PATH = 'recipes.ndjson' # parser.py --format ndjson, used when there is no recipes.json
+RECIPES_SNAPSHOT_PATH = os.environ.get('RECIPES_SNAPSHOT', 'recipes.snapshot') # Empty to always load the JSON
+SEARCH_INDEX_PATH = 'search_index.json'
+RELATED_INDEX_PATH = 'related_recipes.json'
+MEDIA_MANIFEST_PATH = 'media_manifest.json'
+PAGES_JSON_PATH = 'pages.json' # The tips/ and starsystem/ guides, written by parser.py
+# Images under a content hash (/media/<hash>/...) never change, a year is the customary "forever"
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Parse cache of the in-process reloader, kept apart from the one parser.py uses
+RELOAD_CACHE_PATH = os.path.join(app.root_path, '.reload_cache.json')
+# Resized/re-encoded images (/images/...?w=&fmt=), bounded to IMAGE_CACHE_MAX_BYTES
+IMAGE_CACHE_DIRECTORY = os.environ.get('IMAGE_CACHE_DIRECTORY', os.path.join(app.root_path, '.image_cache'))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', DEFAULT_CACHE_BYTES))
+_derivative_cache = None
+_derivative_cache_lock = threading.Lock()
+# Recipes per page of the index listing
+INDEX_PAGE_SIZE = 50
+# Page size limits of /api/recipes, and the most ids one ?ids= request may ask for
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+API_MAX_IDS = 500
+# Request timings, cache statistics and data loading times, served at /metrics
+app_metrics = MetricsRegistry()
+app_metrics.describe('recipe_app_request_duration_seconds', 'histogram', "Time spent handling a request, by route")
+app_metrics.describe('recipe_app_request_phase_seconds', 'histogram',
+                     "Request time spent rendering templates (render) and on everything else (data): "
+                     "data access, derived structures, caches, compression")
+app_metrics.describe('recipe_app_requests_total', 'counter', "Requests by route and status code")
+app_metrics.describe('recipe_app_page_cache_requests_total', 'counter', "Rendered page cache lookups, by result")
+app_metrics.describe('recipe_app_page_cache_hit_ratio', 'gauge', "Share of page cache lookups that were hits")
+app_metrics.describe('recipe_app_image_derivative_cache_requests_total', 'counter',
+                     "Resized image cache lookups in this process, by result")
+app_metrics.describe('recipe_app_image_derivative_cache_hit_ratio', 'gauge',
+                     "Share of resized image cache lookups that were hits")
+app_metrics.describe('recipe_app_image_bytes_served_total', 'counter',
+                     "Body bytes of image responses, original files or resized derivatives")
+app_metrics.describe('recipe_app_recipes_load_seconds', 'gauge', "Time load_recipes took when the app started")
+app_metrics.describe('recipe_app_reload_seconds', 'histogram', "Time a hot reload took, parsing and index building")
+app_metrics.describe('recipe_app_recipes', 'gauge', "Recipes in the current data version")
+RELOAD_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Derivative widths offered to browsers in <img srcset>, the same ones parser.py --derivatives prepares
+app.jinja_env.globals['image_srcset_widths'] = PREGENERATE_WIDTHS
+
+def load_recipes():
+    """
+    Loads the recipe data written by parser.py, returning (recipes, sha256 digest of recipes.json).
+    The binary snapshot is preferred when it is at least as new as recipes.json: it is memory-mapped
+    and decodes a recipe's fields only when they are used, so startup does not depend on corpus size.
+    Without recipes.json, recipes.ndjson is read instead.
+    JSON recipes are turned into Recipe records, far smaller than the decoded dicts.
+    """
+    try:
+        if RECIPES_SNAPSHOT_PATH and os.path.getmtime(RECIPES_SNAPSHOT_PATH) >= os.path.getmtime(RECIPES_JSON_PATH):
+            snapshot = RecipeSnapshot(RECIPES_SNAPSHOT_PATH)
+            return snapshot, snapshot.recipes_digest
+    except (OSError, ValueError):
+        pass # Missing or unreadable snapshot, use recipes.json
+
+    try:
+        with open(RECIPES_JSON_PATH, 'rb') as f:
+            recipes_bytes = f.read()
+        recipes = [Recipe.from_dict(recipe) for recipe in json.loads(recipes_bytes.decode('utf-8'))]
+        return recipes, hashlib.sha256(recipes_bytes).hexdigest()
+    except FileNotFoundError:
+        if os.path.exists(RECIPES_NDJSON_PATH):
+            return load_ndjson_recipes(RECIPES_NDJSON_PATH)
+        print("ERROR: recipes.json not found. Make sure to run parser.py first.")
+        # You might want to exit or provide default empty data if the file is critical
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        print("ERROR: recipes.json is not valid JSON.")
+    return [], None
+
+def iter_ndjson_recipes(lines):
+    """
+    Yields the recipes of NDJSON input (parser.py --format ndjson) one at a time, as lines arrive.
+    `lines` is any iterable of str or bytes lines: an open file, a pipe, a socket's makefile().
+    """
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+def load_ndjson_recipes(path):
+    """Reads an NDJSON recipe file line by line, returning (recipes, sha256 digest of the file)."""
+    digest = hashlib.sha256()
+
+    def hashed_lines(f):
+        for line in f:
+            digest.update(line)
+            yield line
+
+    try:
+        with open(path, 'rb') as f:
+            recipes = [Recipe.from_dict(recipe) for recipe in iter_ndjson_recipes(hashed_lines(f))]
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        print(f"ERROR: {path} is not valid NDJSON.")
+        return [], None
+    return recipes, digest.hexdigest()
+
+def load_pages():
+    """
+    Loads the guide pages parser.py wrote to pages.json, returning (pages, link targets by source file).
+    The link targets cover the recipes as well, they are what LinkGraph is built from.
+    """
+    try:
+        with open(PAGES_JSON_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return [], {} # Recipes only, as before parser.py wrote pages
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        print(f"ERROR: {PAGES_JSON_PATH} is not valid JSON.")
+        return [], {}
+    return data.get("pages", []), data.get("links", {})
 
 # Load recipe data once when the app starts
-recipes_data = []
-try:
-    with open('recipes.json', 'r', encoding='utf-8') as f:
-        recipes_data = json.load(f)
-except FileNotFoundError:
-    print("ERROR: recipes.json not found. Make sure to run parser.py first.")
-    # You might want to exit or provide default empty data if the file is critical
-except json.JSONDecodeError:
-    print("ERROR: recipes.json is not valid JSON.")
+# recipes_digest (sha256 of recipes.json) ties persisted indexes to the data they were built from
+_load_start = time.perf_counter()
+recipes_data, recipes_digest = load_recipes()
+app_metrics.set('recipe_app_recipes_load_seconds', time.perf_counter() - _load_start)
+pages_data, document_links = load_pages()
+
+class DataVersion:
+    """
+    One loaded recipe list plus the structures derived from it.
+    Derived structures are built on first use and then shared by every request on this version.
+    """
+
+    def __init__(self, recipes, derived=None, persisted=None):
+        self.recipes = recipes
+        self._derived = dict(derived or {})
+        # name -> function loading a saved structure for these recipes (None if there is no usable one),
+        # tried before building it, so startup does not pay for reading files no request needed yet
+        self._persisted = dict(persisted or {})
+        self._building = {} # name -> lock held while that structure is loaded or built
+        self._lock = threading.Lock() # Guards _building only
+
+    def derived(self, name, builder=None):
+        """
+        Returns builder(recipes), computed once per data version; builder defaults to DERIVED_BUILDERS[name].
+        A persisted structure for `name` is loaded instead when there is one.
+        """
+        value = self._derived.get(name)
+        if value is None:
+            # A slow build (related, media) only holds up requests for that same structure
+            with self._lock:
+                name_lock = self._building.setdefault(name, threading.Lock())
+            with name_lock:
+                value = self._derived.get(name)
+                if value is None:
+                    load = self._persisted.pop(name, None)
+                    value = load() if load is not None else None
+                    if value is None:
+                        value = (builder or DERIVED_BUILDERS[name])(self.recipes)
+                    self._derived[name] = value
+        return value
+
+    def warm(self):
+        """Builds every derived structure now, so no request has to wait for one. Returns self."""
+        for name in DERIVED_BUILDERS:
+            self.derived(name)
+        return self
+
+def build_media_manifest(recipes):
+    """
+    MediaManifest of the images the recipes reference, under DISHES_DIRECTORY. Entries parser.py saved
+    for files that did not change since are reused, so usually only a stat() per image is needed.
+    """
+    images = [path for recipe in recipes for path in recipe_image_files(recipe)]
+    return MediaManifest.build(DISHES_DIRECTORY, images, previous=MediaManifest.load(MEDIA_MANIFEST_PATH, DISHES_DIRECTORY))
+
+def build_link_graph(recipes, recipe_links=None):
+    """
+    LinkGraph of the recipes (nodes 0 to len(recipes) - 1) followed by pages_data. `recipe_links` are the
+    recipes' link targets from a fresh parse; without them, those saved in pages.json are used.
+    """
+    sources = [recipe.get('source_file') for recipe in recipes] + [page['source_file'] for page in pages_data]
+    outgoing = dict(document_links)
+    if recipe_links:
+        outgoing.update(recipe_links)
+    return LinkGraph.build(sources, outgoing)
+
+# Structures derived from a recipe list, by name
+DERIVED_BUILDERS = {
+    'search': SearchIndex.build,
+    'ingredients': IngredientIndex.build,
+    'quantities': QuantityTable.from_recipes,
+    'facets': FacetIndex.build,
+    'related': RelatedIndex.build,
+    'suggest': SuggestIndex.build,
+    'media': build_media_manifest,
+    'links': build_link_graph,
+    'json': RecipeJSONCache,
+    'pages': lambda recipes: RenderCache(),
+}
+
+def persisted_index_loaders(digest):
+    """Loaders of the derived structures parser.py saved for the recipes.json with this digest, for DataVersion."""
+    if not digest:
+        return {}
+    return {
+        'search': lambda: SearchIndex.load(SEARCH_INDEX_PATH, digest),
+        'related': lambda: RelatedIndex.load(RELATED_INDEX_PATH, digest),
+    }
+
+_current_version = DataVersion(recipes_data, persisted=persisted_index_loaders(recipes_digest))
+_version_lock = threading.Lock()
+
+def current_version():
+    """
+    Returns the DataVersion of recipes_data, starting a new one if recipes_data was replaced.
+    A request takes its version once and uses it throughout, so a reload never mixes two versions in one response.
+    """
+    global _current_version
+    version = _current_version
+    if version.recipes is not recipes_data:
+        with _version_lock:
+            # Either publish_version is half-way (wait for it) or recipes_data was assigned directly
+            if _current_version.recipes is not recipes_data:
+                _current_version = DataVersion(recipes_data)
+            version = _current_version
+    return version
+
+def publish_version(version):
+    """Makes `version` the one new requests get; requests already running finish on the old one."""
+    global _current_version, recipes_data
+    with _version_lock:
+        _current_version = version
+        recipes_data = version.recipes
+
+def reload_recipes(workers=1):
+    """
+    Re-parses the dishes directory and swaps the result in as a new data version.
+    The parse cache limits parsing to added/modified files, and the derived structures are built
+    before the swap, so requests never wait on a reload. Returns the parse cache stats.
+    """
+    start = time.perf_counter()
+    stats = {}
+    links = {}
+    recipes = parse_recipes(base_dir_override=DISHES_DIRECTORY, cache_path=RELOAD_CACHE_PATH,
+                            stats=stats, workers=workers, links=links)
+    publish_version(DataVersion(tuple(recipes), derived={'links': build_link_graph(recipes, links)}).warm())
+    app_metrics.observe('recipe_app_reload_seconds', time.perf_counter() - start, buckets=RELOAD_BUCKETS)
+    return stats
+
+def start_watcher(interval=DEFAULT_POLL_INTERVAL):
+    """Starts a background thread reloading the recipes whenever a Markdown file under dishes/ changes."""
+
+    def on_change(added, modified, removed):
+        start = time.perf_counter()
+        stats = reload_recipes()
+        app.logger.info(f"Reloaded recipes ({len(added)} added, {len(modified)} modified, {len(removed)} removed, "
+                        f"{stats['misses']} parsed) in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    watcher = RecipeWatcher(DISHES_DIRECTORY, on_change, interval)
+    watcher.start()
+    return watcher
+
+def parse_servings_spec(spec, default_servings):
+    """Parses "3,5:2" into {3: default_servings, 5: 2.0}; raises ValueError on malformed input."""
+    servings_by_recipe = {}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        recipe_id, _, servings = part.partition(':')
+        servings = float(servings) if servings else default_servings
+        # float() also takes "nan" and "inf", which would end up in the JSON as invalid literals
+        if not math.isfinite(servings) or servings <= 0:
+            raise ValueError(f"servings must be a positive number: {part}")
+        total = servings_by_recipe.get(int(recipe_id), 0) + servings
+        if not math.isfinite(total):
+            raise ValueError(f"servings too large: {part}")
+        servings_by_recipe[int(recipe_id)] = total
+    return servings_by_recipe
+
+def cached_page_response(page):
+    """
+    Serves a CachedPage: picks the compressed variant the client accepts and answers
+    If-None-Match with 304 when the client already has that representation.
+    """
+    encoding, body, etag = page.negotiate(request.accept_encodings)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype=page.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def render_cached(version, key, render):
+    """Calls render() once per data version for the page `key` and serves the result via cached_page_response."""
+    pages = version.derived('pages')
+    rendered = False
+
+    def timed_render():
+        nonlocal rendered
+        rendered = True
+        start = time.perf_counter()
+        try:
+            return render()
+        finally:
+            g.render_seconds += time.perf_counter() - start
+
+    page = pages.get(key, timed_render)
+    app_metrics.inc('recipe_app_page_cache_requests_total', labels=(('result', 'miss' if rendered else 'hit'),))
+    return cached_page_response(page)
+
+def json_bytes_response(body):
+    """Serves already-serialized JSON with a strong ETag of the bytes, answering If-None-Match with 304."""
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+def parse_fields_spec(spec):
+    """Turns fields=title,category into a tuple of recipe fields (all of them when empty); ValueError if unknown."""
+    if not spec:
+        return RECIPE_FIELDS
+    fields = tuple(dict.fromkeys(field.strip() for field in spec.split(',') if field.strip()))
+    for field in fields:
+        if field not in RECIPE_FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+    return fields
+
+def template_image_paths(recipe):
+    """
+    Image paths for the template need to be relative to the 'dishes' directory.
+    The original image_paths from parser are relative to the .md file.
+    source_file from parser is like: "dishes/category/recipe_folder/recipe.md"
+    image_path from parser is like: "image.jpg"
+    We need to construct: "category/recipe_folder/image.jpg"
+    """
+    image_paths = recipe.get('image_paths')
+    if not image_paths:
+        return []
+    # os.path.dirname gives "dishes/cat1/recipe1"
+    recipe_md_dir_in_repo = posixpath.dirname((recipe.get('source_file') or '').replace(os.sep, '/'))
+    first_part, _, rest = recipe_md_dir_in_repo.partition('/')
+    if first_part.lower() == 'dishes':
+        # base_path_for_image will be "cat1/recipe1"
+        base_path_for_image = rest
+    else:
+        # Fallback if source_file is not directly under 'dishes' (e.g. "cat1/recipe1")
+        base_path_for_image = recipe_md_dir_in_repo
+    # img_path_in_md is like "image1.jpg" or "subdir/image.png", the result like "cat1/recipe1/image1.jpg"
+    return [posixpath.normpath(posixpath.join(base_path_for_image, img_path_in_md))
+            for img_path_in_md in image_paths]
 
 @app.route('/')
 @app.route('/index')
 def index():
-    return render_template('index.html', recipes=recipes_data)
+    """
+    Paginated recipe listing, optionally filtered on ?category= and ?difficulty= (number of stars).
+    Unknown filter values and out-of-range pages are 404s, so every cached page has a canonical URL.
+    """
+    version = current_version()
+    facets = version.derived('facets')
+    category = request.args.get('category') or None
+    stars = int_arg_or_404('difficulty')
+    page = int_arg_or_404('page', 1)
+    if (category is not None and category not in facets.categories) or \
+            (stars is not None and stars not in facets.difficulties):
+        abort(404)
+    if not 1 <= page <= index_page_count(facets, category, stars):
+        abort(404)
+    return render_cached(version, ('index', category, stars, page),
+                         lambda: render_index_page(version, category, stars, page))
+
+def int_arg_or_404(name, default=None):
+    """
+    An integer query parameter written the one canonical way ("3", not "03", "+3" or "abc"), else a 404:
+    request.args.get(type=int) would turn junk into the default and give a cached page any number of URLs.
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        abort(404)
+    if str(number) != value:
+        abort(404)
+    return number
+
+def index_page_count(facets, category, stars):
+    """Number of index pages for a filter combination (at least one, possibly empty)."""
+    return max(1, -(-len(facets.ids(category, stars)) // INDEX_PAGE_SIZE))
+
+def render_index_page(version, category, stars, page):
+    """HTML of one index page; the filters and page number must be valid (see index)."""
+    facets = version.derived('facets')
+    ids, total = facets.page(category, stars, page, INDEX_PAGE_SIZE)
+    category_counts, difficulty_counts = facets.counts(category, stars)
+    return render_template('index.html', recipes=[(recipe_id, version.recipes[recipe_id]) for recipe_id in ids],
+                           category=category, stars=stars, page=page,
+                           page_count=index_page_count(facets, category, stars), total=total,
+                           category_counts=category_counts, difficulty_counts=difficulty_counts)
+
+def render_recipe_page(version, recipe_id):
+    """HTML of a recipe's page, with content-hashed image URLs and links to its related recipes."""
+    recipe = version.recipes[recipe_id]
+    recipe_for_template = recipe.copy()
+    recipe_for_template['image_paths'] = template_image_paths(recipe)
+    media = version.derived('media')
+    image_hashes = {path: media.hash(path) for path in recipe_for_template['image_paths'] if media.hash(path)}
+    related = [(related_id, version.recipes[related_id]) for related_id, _ in version.derived('related').related(recipe_id)]
+    linked_from = [document_link(version, node) for node in version.derived('links').backlinks_to(recipe_id)]
+    return render_template('recipe.html', recipe=recipe_for_template, image_hashes=image_hashes, related=related,
+                           linked_from=linked_from)
 
 @app.route('/recipe/<int:recipe_id>')
 def recipe_detail(recipe_id):
-    try:
-        recipe = recipes_data[recipe_id]
-        
-        # Image paths for the template need to be relative to the 'dishes' directory.
-        # The original image_paths from parser are relative to the .md file.
-        # source_file from parser is like: "dishes/category/recipe_folder/recipe.md"
-        # image_path from parser is like: "image.jpg"
-        # We need to construct: "category/recipe_folder/image.jpg"
-        
-        template_image_paths = []
-        if recipe.get('image_paths'):
-            # recipe['source_file'] is like "dishes/cat1/recipe1/recipe.md" (from parser)
-            # os.path.dirname gives "dishes/cat1/recipe1"
-            recipe_md_dir_in_repo = os.path.dirname(recipe.get('source_file', ''))
-            
-            path_obj = Path(recipe_md_dir_in_repo)
-            if path_obj.parts and path_obj.parts[0].lower() == 'dishes':
-                # base_path_for_image will be "cat1/recipe1"
-                base_path_for_image = Path(*path_obj.parts[1:])
-            else:
-                # Fallback if source_file is not directly under 'dishes' (e.g. "cat1/recipe1")
-                # This might occur if source_file was "cat1/recipe1/recipe.md" without "dishes/" prefix
-                base_path_for_image = path_obj
-
-            for img_path_in_md in recipe['image_paths']: # img_path_in_md is like "image1.jpg" or "subdir/image.png"
-                # final_image_path should be "cat1/recipe1/image1.jpg"
-                final_image_path = base_path_for_image / img_path_in_md
-                # Use as_posix() for URL consistency (forward slashes)
-                template_image_paths.append(final_image_path.as_posix())
-
-        recipe_for_template = recipe.copy()
-        recipe_for_template['image_paths'] = template_image_paths
-
-        return render_template('recipe.html', recipe=recipe_for_template)
-    except IndexError:
+    version = current_version()
+    if recipe_id >= len(version.recipes):
         abort(404)
+    try:
+        return render_cached(version, ('recipe', recipe_id), lambda: render_recipe_page(version, recipe_id))
     except Exception as e:
-        # Log the exception for debugging
-        app.logger.error(f"Error processing recipe ID {recipe_id}: {e}")
+        # Log the exception, with its traceback, for debugging
+        app.logger.exception(f"Error processing recipe ID {recipe_id}: {e}")
         abort(500) # Internal server error
 
+def document_link(version, node):
+    """(URL, title) of a LinkGraph node: a recipe of the version, or one of the pages after them."""
+    if node < len(version.recipes):
+        return url_for('recipe_detail', recipe_id=node), version.recipes[node]['title']
+    page_id = node - len(version.recipes)
+    return url_for('page_detail', page_id=page_id), pages_data[page_id]['title']
+
+def render_page(version, page_id):
+    """HTML of a guide page: its Markdown with the links to recipes and pages rewritten to their URLs."""
+    page = pages_data[page_id]
+    graph = version.derived('links')
+
+    def app_link(match):
+        node = graph.resolve(page['source_file'], match.group(1))
+        if node is None:
+            return match.group(0) # External, an anchor, or dangling
+        start, end = match.start(1) - match.start(0), match.end(1) - match.start(0)
+        return match.group(0)[:start] + document_link(version, node)[0] + match.group(0)[end:]
+
+    content = markdown.markdown(LINK_RE.sub(app_link, page['content']), extensions=['tables'])
+    node = len(version.recipes) + page_id
+    linked_from = [document_link(version, other) for other in graph.backlinks_to(node)]
+    return render_template('page.html', page=page, content=content, linked_from=linked_from)
+
+@app.route('/pages')
+def page_index():
+    return render_template('pages.html', pages=list(enumerate(pages_data)))
+
+@app.route('/page/<int:page_id>')
+def page_detail(page_id):
+    version = current_version()
+    if page_id >= len(pages_data):
+        abort(404)
+    return render_cached(version, ('page', page_id), lambda: render_page(version, page_id))
+
+@app.route('/shopping-list')
+def shopping_list():
+    # e.g. /shopping-list?recipes=3,5:2&servings=4
+    # recipes lists recipe ids, each optionally with its own serving count (default: servings, or 1)
+    try:
+        default_servings = float(request.args.get('servings', 1))
+        servings_by_recipe = parse_servings_spec(request.args.get('recipes', ''), default_servings)
+    except ValueError:
+        abort(400)
+    if not servings_by_recipe or not math.isfinite(default_servings) or default_servings <= 0:
+        abort(400)
+
+    table = current_version().derived('quantities')
+    try:
+        items = table.shopping_list(servings_by_recipe)
+    except IndexError:
+        abort(404)
+    return jsonify({
+        "recipes": [{"id": recipe_id, "servings": servings} for recipe_id, servings in servings_by_recipe.items()],
+        "items": items,
+    })
+
+@app.route('/search')
+def search():
+    # e.g. /search?q=红烧肉&limit=10
+    query = request.args.get('q', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        abort(400)
+
+    version = current_version()
+    results = []
+    if query:
+        index = version.derived('search')
+        for recipe_id, score in index.search(query, limit):
+            recipe = version.recipes[recipe_id]
+            results.append({
+                "id": recipe_id,
+                "title": recipe['title'],
+                "category": recipe['category'],
+                "score": score,
+            })
+    return jsonify({"query": query, "results": results})
+
+@app.route('/suggest')
+def suggest():
+    # e.g. /suggest?prefix=红烧&limit=5, for completing what is typed into the search box
+    prefix = request.args.get('prefix', '')
+    try:
+        limit = min(max(int(request.args.get('limit', SUGGEST_COUNT)), 1), SUGGEST_COUNT)
+    except ValueError:
+        abort(400)
+    suggestions = current_version().derived('suggest').suggest(prefix, limit)
+    return jsonify({"prefix": prefix, "suggestions": suggestions})
+
+@app.route('/cook-with')
+def cook_with():
+    # e.g. /cook-with?have=鸡蛋,番茄,盐&missing=1
+    # Recipes that can be made from the listed ingredients, missing at most `missing` of them
+    have = [name for name in request.args.get('have', '').split(',') if name.strip()]
+    try:
+        max_missing = int(request.args.get('missing', 0))
+    except ValueError:
+        abort(400)
+    if not have or not 0 <= max_missing <= 10:
+        abort(400)
+
+    version = current_version()
+    index = version.derived('ingredients')
+    results = []
+    for recipe_id, missing in index.cookable(have, max_missing):
+        recipe = version.recipes[recipe_id]
+        results.append({"id": recipe_id, "title": recipe['title'], "missing": missing})
+    return jsonify({"have": have, "results": results})
+
+@app.route('/api/recipes')
+def api_recipes():
+    # e.g. /api/recipes?page=2&per_page=100&category=soup&difficulty=3&fields=title,ingredients
+    # or, in bulk: /api/recipes?ids=3,5,8&fields=title (recipes in the requested order)
+    version = current_version()
+    try:
+        fields = parse_fields_spec(request.args.get('fields', ''))
+    except ValueError:
+        abort(400)
+    serialized = version.derived('json')
+
+    if 'ids' in request.args:
+        try:
+            ids = [int(value) for value in request.args['ids'].split(',') if value.strip()]
+        except ValueError:
+            abort(400)
+        if not ids or len(ids) > API_MAX_IDS:
+            abort(400)
+        if not all(0 <= recipe_id < len(version.recipes) for recipe_id in ids):
+            abort(404)
+        return json_bytes_response(b'{"recipes":' + serialized.array(ids, fields) + b"}")
+
+    facets = version.derived('facets')
+    category = request.args.get('category') or None
+    try:
+        stars = int(request.args['difficulty']) if request.args.get('difficulty') else None
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', API_PAGE_SIZE))
+    except ValueError:
+        abort(400)
+    if page < 1 or not 1 <= per_page <= API_MAX_PAGE_SIZE:
+        abort(400)
+    if (category is not None and category not in facets.categories) or \
+            (stars is not None and stars not in facets.difficulties):
+        abort(404)
+    ids, total = facets.page(category, stars, page, per_page)
+    header = encode_json({"page": page, "per_page": per_page, "total": total})
+    return json_bytes_response(header[:-1] + b',"recipes":' + serialized.array(ids, fields) + b"}")
+
+@app.route('/api/recipes/<int:recipe_id>')
+def api_recipe(recipe_id):
+    # e.g. /api/recipes/3?fields=title,ingredients
+    version = current_version()
+    try:
+        fields = parse_fields_spec(request.args.get('fields', ''))
+    except ValueError:
+        abort(400)
+    if recipe_id >= len(version.recipes):
+        abort(404)
+    return json_bytes_response(version.derived('json').object(recipe_id, fields))
+
+def derivative_cache():
+    """The process-wide image DerivativeCache, created on first use."""
+    global _derivative_cache
+    with _derivative_cache_lock:
+        if _derivative_cache is None or _derivative_cache.cache_dir != IMAGE_CACHE_DIRECTORY:
+            _derivative_cache = DerivativeCache(IMAGE_CACHE_DIRECTORY, IMAGE_CACHE_MAX_BYTES)
+        return _derivative_cache
+
 @app.route('/images/<path:filename>')
 def serve_image(filename):
     # Serve files from the DISHES_DIRECTORY
     # filename is expected to be a path relative to DISHES_DIRECTORY
     # e.g. category/recipe_folder/image.jpg
-    return send_from_directory(DISHES_DIRECTORY, filename)
+    # ?w=640&fmt=webp serves a resized/re-encoded copy from the derivative cache instead
+    return send_image(filename)
+
+@app.route('/media/<digest>/<path:filename>')
+def serve_versioned_image(digest, filename):
+    # The same files as /images/, under the content hash from the media manifest (recipe pages link here).
+    # The URL changes whenever the file does, so browsers and CDNs can keep the response without revalidating.
+    entry = current_version().derived('media').current_entry(posixpath.normpath(filename))
+    if entry is None or entry["hash"] != digest:
+        # Changed since the manifest was built, or an old hash: the unversioned URL serves what is there now
+        # Only the derivative parameters are passed on; url_for reserves keys like _anchor and _external
+        return redirect(url_for('serve_image', filename=filename, w=request.args.get('w'), fmt=request.args.get('fmt')))
+    response = send_image(filename)
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+def send_image(filename):
+    """Response with an image under DISHES_DIRECTORY, or with its resized copy for ?w= and ?fmt=."""
+    width = request.args.get('w', type=int)
+    fmt = request.args.get('fmt', '').lower() or None
+    if (width is None and fmt is None) or Image is None:
+        return send_from_directory(DISHES_DIRECTORY, filename)
+    if (width is not None and width <= 0) or (fmt is not None and fmt not in DERIVATIVE_FORMATS):
+        abort(400)
+
+    if safe_join(DISHES_DIRECTORY, filename) is None:
+        abort(404)
+    relative_path = posixpath.normpath(filename)
+    if fmt is None:
+        # Keep the source format when only a width is asked for
+        fmt = os.path.splitext(relative_path)[1].lstrip('.').lower()
+        if fmt not in DERIVATIVE_FORMATS:
+            fmt = 'jpeg'
+    try:
+        path = derivative_cache().get(DISHES_DIRECTORY, relative_path, snap_width(width) if width else None, fmt)
+    except FileNotFoundError:
+        abort(404)
+    except (OSError, ValueError) as e:
+        # Not an image Pillow can read, fall back to the original file
+        app.logger.warning(f"Cannot build derivative of {filename}: {e}")
+        return send_from_directory(DISHES_DIRECTORY, filename)
+    # send_file hands the open file to the WSGI server's file_wrapper (sendfile where supported)
+    return send_file(path, mimetype=DERIVATIVE_FORMATS[fmt][1], max_age=86400)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.render_seconds = 0.0 # Added to by render_cached
+
+@app.after_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.request_start
+    route = request.endpoint or 'unmatched' # Endpoint names, so the label values stay bounded
+    app_metrics.observe('recipe_app_request_duration_seconds', elapsed, (('route', route),))
+    if g.render_seconds:
+        app_metrics.observe('recipe_app_request_phase_seconds', g.render_seconds, (('route', route), ('phase', 'render')))
+    app_metrics.observe('recipe_app_request_phase_seconds', elapsed - g.render_seconds, (('route', route), ('phase', 'data')))
+    app_metrics.inc('recipe_app_requests_total', labels=(('route', route), ('status', str(response.status_code))))
+    if route in ('serve_image', 'serve_versioned_image') and response.status_code == 200:
+        variant = 'derivative' if request.args.get('w') or request.args.get('fmt') else 'original'
+        app_metrics.inc('recipe_app_image_bytes_served_total', response.content_length or 0, (('variant', variant),))
+    return response
+
+def collect_cache_metrics():
+    """Samples read at scrape time: cache statistics that are kept elsewhere anyway."""
+    samples = [('recipe_app_recipes', (), len(_current_version.recipes))]
+    hits = app_metrics.value('recipe_app_page_cache_requests_total', (('result', 'hit'),)) or 0
+    misses = app_metrics.value('recipe_app_page_cache_requests_total', (('result', 'miss'),)) or 0
+    if hits + misses:
+        samples.append(('recipe_app_page_cache_hit_ratio', (), hits / (hits + misses)))
+    cache = _derivative_cache
+    if cache is not None:
+        samples.append(('recipe_app_image_derivative_cache_requests_total', (('result', 'hit'),), cache.hits))
+        samples.append(('recipe_app_image_derivative_cache_requests_total', (('result', 'miss'),), cache.misses))
+        if cache.hits + cache.misses:
+            samples.append(('recipe_app_image_derivative_cache_hit_ratio', (), cache.hits / (cache.hits + cache.misses)))
+    return samples
+
+app_metrics.add_collector(collect_cache_metrics)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus text format; each worker process exposes its own numbers
+    return app.response_class(app_metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+if os.environ.get('RECIPES_WATCH'):
+    # e.g. RECIPES_WATCH=1 under a WSGI server; every worker process then watches on its own
+    start_watcher(float(os.environ.get('RECIPES_WATCH_INTERVAL', DEFAULT_POLL_INTERVAL)))
 
 if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Run the recipe app's development server")
+    arg_parser.add_argument("--watch", action="store_true",
+                            help="Reload the recipes when files under dishes/ change, without restarting")
+    args = arg_parser.parse_args()
+    if args.watch and not os.environ.get('RECIPES_WATCH'):
+        start_watcher()
     # For local development, ensure FLASK_ENV=development for debug mode.
     # The app.run(debug=True) is also an option but FLASK_ENV is preferred.
-    app.run(debug=True)
+    # With --watch the code reloader is off, it would restart the whole process on every recipe edit.
+    app.run(debug=True, use_reloader=not args.watch)
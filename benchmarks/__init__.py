@@ -0,0 +1,5 @@
+# Benchmarks for the parser and the app. Run them from the repository root, e.g.:
+#   python -m benchmarks.bench_ingredients
+# The suite generates synthetic corpora (benchmarks/corpus.py) and checks against baselines.json:
+#   python -m benchmarks.suite --check
+#   python -m benchmarks.suite --scales 1000,10000,100000 --save-baseline
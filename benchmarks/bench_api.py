@@ -0,0 +1,54 @@
+import argparse
+import json
+import statistics
+import time
+from recipe_model import json_default
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def dumps_response(recipes, recipe_ids, fields, header=None):
+    """What a route re-serializing on every request would do."""
+    objects = [{"id": recipe_id, **{field: recipes[recipe_id][field] for field in fields if field in recipes[recipe_id]}}
+               for recipe_id in recipe_ids]
+    return json.dumps(dict(header or {}, recipes=objects), ensure_ascii=False, separators=(',', ':'),
+                      default=json_default).encode('utf-8')
+
+def timed(function, runs):
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="/api/recipes: cached serialized fields vs. json.dumps per request")
+    arg_parser.add_argument("--runs", type=int, default=300)
+    args = arg_parser.parse_args()
+
+    import app
+    from recipe_json import RECIPE_FIELDS
+    version = app.current_version()
+    recipes = version.recipes
+    print(f"{len(recipes)} recipes ({type(recipes).__name__})")
+    client = app.app.test_client()
+    cases = [
+        ("single recipe", '/api/recipes/7', [7], RECIPE_FIELDS),
+        ("page of 50", '/api/recipes?page=2', range(50, 100), RECIPE_FIELDS),
+        ("page of 200, 2 fields", '/api/recipes?per_page=200&fields=title,difficulty', range(200), ("title", "difficulty")),
+        ("bulk 100 ids", '/api/recipes?ids=' + ",".join(str(i) for i in range(0, 300, 3)), range(0, 300, 3), RECIPE_FIELDS),
+    ]
+    for label, path, recipe_ids, fields in cases:
+        client.get(path) # Fill the per-version field cache
+        cached = timed(lambda: client.get(path), args.runs)
+        serialized = version.derived('json')
+        concat = timed(lambda: serialized.array(recipe_ids, fields), args.runs)
+        dumps = timed(lambda: dumps_response(recipes, recipe_ids, fields), args.runs)
+        print(f"{label:22} route p50 {statistics.median(cached):6.3f} ms p99 {percentile(cached, 0.99):6.3f} ms | "
+              f"body: concat p50 {statistics.median(concat):6.3f} ms, json.dumps p50 {statistics.median(dumps):6.3f} ms "
+              f"({statistics.median(dumps) / statistics.median(concat):4.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import os
+import tempfile
+from benchmarks.corpus import generate_corpus
+from export import export_site
+
+
+def report(label, stats):
+    print(f"{label:28} {stats['seconds']:7.2f} s: {stats['rendered']:6} rendered, {stats['copied']:5} copied, "
+          f"{stats['skipped']:6} unchanged")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Static export: full build vs rebuild after a one-file change")
+    arg_parser.add_argument("--scale", type=int, default=10000, help="Number of generated recipes")
+    arg_parser.add_argument("-j", "--workers", type=int, default=0, help="0 for one per CPU (default: 0)")
+    args = arg_parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        dishes = os.path.join(data_dir, "dishes")
+        output = os.path.join(data_dir, "site")
+        generate_corpus(dishes, args.scale)
+        print(f"{args.scale} recipes, {workers} worker(s), {os.cpu_count()} CPU(s)")
+        report("full build", export_site(output, dishes, workers=workers))
+        report("no change", export_site(output, dishes, workers=workers))
+
+        category = sorted(os.listdir(dishes))[0]
+        name = sorted(os.listdir(os.path.join(dishes, category)))[0]
+        path = os.path.join(dishes, category, name, f"{name}.md")
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        content = content.replace("## 操作\n\n", "## 操作\n\n- 出锅前尝一下咸淡\n", 1)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        report("one recipe's steps changed", export_site(output, dishes, workers=workers))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content.replace(f"# {name}", f"# 新{name}", 1))
+        report("one recipe's title changed", export_site(output, dishes, workers=workers))
+        report("forced full rebuild", export_site(output, dishes, workers=workers, force=True))
+
+if __name__ == "__main__":
+    main()
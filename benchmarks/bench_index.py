@@ -0,0 +1,38 @@
+import argparse
+import json
+import os
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Cold and cached render time of index listing pages")
+    arg_parser.add_argument("--scale", type=int, default=100, help="Replicate the corpus this many times")
+    arg_parser.add_argument("--runs", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    import app
+    with open(os.path.join(REPO_ROOT, "recipes.json"), 'r', encoding='utf-8') as f:
+        recipes = json.load(f) * args.scale
+    client = app.app.test_client()
+    print(f"{len(recipes)} recipes")
+    for path in ['/', '/?page=2', '/?category=meat_dish', '/?category=meat_dish&difficulty=3&page=2']:
+        cold = []
+        for _ in range(args.runs):
+            # A new data version has an empty page cache; its facet index is built before timing
+            app.publish_version(app.DataVersion(list(recipes)))
+            app.current_version().derived('facets')
+            start = time.perf_counter()
+            response = client.get(path)
+            cold.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        client.get(path)
+        cached_ms = (time.perf_counter() - start) * 1000
+        print(f"{path:45} {response.status_code}: first render {min(cold):7.1f} ms, cached {cached_ms:5.2f} ms, "
+              f"{len(response.data):8} bytes")
+    start = time.perf_counter()
+    app.DERIVED_BUILDERS['facets'](recipes)
+    print(f"Facet index build: {(time.perf_counter() - start) * 1000:.1f} ms (once per data version)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import json
+import random
+import time
+from ingredient_index import IngredientIndex, normalize_ingredient
+
+def naive_cookable(required_sets, have, max_missing):
+    """The scan the bitmap index replaces: compare every recipe's requirements with the pantry."""
+    pantry = {normalize_ingredient(name) for name in have}
+    results = []
+    for recipe_id, required in enumerate(required_sets):
+        missing = required - pantry
+        if required and len(missing) <= max_missing:
+            results.append((len(missing), recipe_id, sorted(missing)))
+    results.sort()
+    return [(recipe_id, missing) for _, recipe_id, missing in results]
+
+def time_per_call(function, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            function(query)
+    return (time.perf_counter() - start) / (repeat * len(queries))
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Bitmap ingredient index vs. a naive scan")
+    arg_parser.add_argument("--recipes", default="recipes.json")
+    arg_parser.add_argument("--scale", type=int, default=1, help="Replicate the corpus this many times")
+    arg_parser.add_argument("--queries", type=int, default=50)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    with open(args.recipes, 'r', encoding='utf-8') as f:
+        recipes = json.load(f) * args.scale
+    start = time.perf_counter()
+    index = IngredientIndex.build(recipes)
+    build_time = time.perf_counter() - start
+
+    # Pantries drawn from the most common ingredients, like real users' kitchens
+    rng = random.Random(42)
+    common = sorted(index.vocabulary, key=lambda name: -bin(index.bitmaps[index.vocabulary[name]]).count("1"))[:80]
+    pantries = [rng.sample(common, rng.randint(5, 20)) for _ in range(args.queries)]
+
+    print(f"{len(recipes)} recipes, {len(index.vocabulary)} ingredients, index built in {build_time * 1000:.1f} ms")
+    for max_missing in (0, 1, 2):
+        for have in pantries:
+            assert index.cookable(have, max_missing) == naive_cookable(index.required_sets, have, max_missing)
+        bitmap = time_per_call(lambda have: index.cookable(have, max_missing), pantries, args.repeat)
+        naive = time_per_call(lambda have: naive_cookable(index.required_sets, have, max_missing), pantries, args.repeat)
+        print(f"missing<={max_missing}: bitmap {bitmap * 1e6:8.1f} us, naive scan {naive * 1e6:8.1f} us "
+              f"({naive / bitmap:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.corpus import generate_corpus
+from media_manifest import MediaManifest
+
+
+def timed(label, build):
+    start = time.perf_counter()
+    manifest = build()
+    print(f"{label:34} {(time.perf_counter() - start) * 1000:8.0f} ms ({len(manifest.entries)} images)")
+    return manifest
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Media manifest: cold build (hash and measure every image), "
+                                                     "sequential and parallel, and a rebuild reusing a saved one")
+    arg_parser.add_argument("--scale", type=int, default=10000, help="Number of generated recipes")
+    arg_parser.add_argument("--image-every", type=int, default=1, help="One image per this many recipes")
+    arg_parser.add_argument("-j", "--workers", type=int, default=0, help="0 for one per CPU (default: 0)")
+    args = arg_parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        images = generate_corpus(corpus_dir, args.scale, image_every=args.image_every)
+        print(f"{len(images)} images, {workers} worker(s), {os.cpu_count()} CPU(s)")
+        timed("cold, sequential", lambda: MediaManifest.build(corpus_dir, images))
+        manifest = timed(f"cold, {workers} worker(s)", lambda: MediaManifest.build(corpus_dir, images, workers=workers))
+        manifest.save(os.path.join(corpus_dir, "media_manifest.json"))
+        previous = MediaManifest.load(os.path.join(corpus_dir, "media_manifest.json"), corpus_dir)
+        timed("unchanged files, saved manifest", lambda: MediaManifest.build(corpus_dir, images, previous=previous))
+
+if __name__ == "__main__":
+    main()
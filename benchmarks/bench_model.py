@@ -0,0 +1,93 @@
+import argparse
+import gc
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from recipe_model import Recipe
+from snapshot import RecipeSnapshot, write_snapshot
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load(text, as_records):
+    recipes = json.loads(text)
+    return [Recipe.from_dict(recipe) for recipe in recipes] if as_records else recipes
+
+def traced_mb(text, as_records):
+    """Memory held by the loaded recipes, in MB."""
+    gc.collect()
+    tracemalloc.start()
+    recipes = load(text, as_records)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del recipes
+    return size / 2 ** 20
+
+def timed_us(function, runs):
+    samples = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(runs):
+            function()
+        samples.append((time.perf_counter() - start) / runs * 1e6)
+    return statistics.median(samples)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Recipe records vs. dicts: memory of a large corpus; "
+                                                     "field access, template rendering and routes on "
+                                                     "records and snapshot recipes")
+    arg_parser.add_argument("--scale", type=int, default=315, help="Replicate recipes.json this many times")
+    arg_parser.add_argument("--runs", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    with open(os.path.join(REPO_ROOT, "recipes.json"), 'r', encoding='utf-8') as f:
+        text = f.read()
+    body = text.strip()[1:-1]
+    # One JSON document, so every copy is decoded into its own objects as a real corpus would be
+    big = "[" + ",".join([body] * args.scale) + "]"
+    count = len(json.loads(text)) * args.scale
+    dict_mb, record_mb = traced_mb(big, False), traced_mb(big, True)
+    print(f"{count} recipes: dicts {dict_mb:7.1f} MB, Recipe records {record_mb:7.1f} MB "
+          f"({1 - record_mb / dict_mb:.0%} less)")
+    start = time.perf_counter()
+    recipes = json.loads(big)
+    decoded = time.perf_counter()
+    recipes = [Recipe.from_dict(recipe) for recipe in recipes]
+    print(f"Load: json.loads {decoded - start:.2f} s, converting to records {time.perf_counter() - decoded:.2f} s")
+    del recipes
+
+    import app
+    records = load(text, True)
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        write_snapshot(os.path.join(snapshot_dir, "recipes.snapshot"), records)
+        snapshot = RecipeSnapshot(os.path.join(snapshot_dir, "recipes.snapshot"))
+        client = app.app.test_client()
+        # Routes that read a field or two of many recipes: up to 100 search results, every cookable recipe
+        title = records[0].title
+        routes = [f"/search?q={title}&limit=100", "/cook-with?have=鸡蛋,盐,食用油&missing=2"]
+        for label, recipes in (("Recipe", records), ("LazyRecipe", snapshot)):
+            page = [recipes[recipe_id] for recipe_id in range(50)]
+            get = timed_us(lambda: [recipe.get('title') for recipe in page], args.runs * 10)
+            attribute = timed_us(lambda: [recipe.title for recipe in page], args.runs * 10)
+            version = app.DataVersion(recipes)
+            with app.app.test_request_context('/'):
+                version.derived('facets')
+                version.derived('related')
+                index = timed_us(lambda: app.render_index_page(version, None, None, 1), args.runs)
+                detail = timed_us(lambda: app.render_recipe_page(version, 100), args.runs)
+            print(f"{label:10} 50 x get('title') {get:7.2f} us, .title {attribute:7.2f} us | "
+                  f"index page render {index:8.1f} us | recipe page render {detail:8.1f} us")
+            app.publish_version(version)
+            version.derived('search')
+            version.derived('ingredients')
+            for route in routes:
+                results = len(client.get(route).get_json()["results"])
+                print(f"{'':10} GET {route:40} {timed_us(lambda: client.get(route), args.runs):8.1f} us "
+                      f"({results} results)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from benchmarks.corpus import generate_corpus
+from parser import parse_recipes
+from related_index import RelatedIndex
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed(build, recipes):
+    start = time.perf_counter()
+    index = build(recipes)
+    return index, time.perf_counter() - start
+
+def report(label, recipes, exact_limit):
+    index, seconds = timed(RelatedIndex.build, recipes)
+    line = f"{label:22} {len(recipes):6} recipes: LSH build {seconds * 1000:8.0f} ms"
+    if len(recipes) <= exact_limit:
+        exact, exact_seconds = timed(RelatedIndex.build_exact, recipes)
+        with_neighbors = sum(1 for neighbors in exact.neighbors if neighbors)
+        line += (f", exact {exact_seconds * 1000:8.0f} ms, recall {index.recall(exact):.3f} "
+                 f"({with_neighbors} recipes have related ones)")
+    print(line)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Related recipes: MinHash/LSH build time and recall "
+                                                     "against exact Jaccard similarity")
+    arg_parser.add_argument("--scales", default="1000,10000", help="Sizes of the generated corpora")
+    arg_parser.add_argument("--exact-limit", type=int, default=5000,
+                            help="Largest corpus also compared pairwise (quadratic)")
+    args = arg_parser.parse_args()
+
+    with open(os.path.join(REPO_ROOT, "recipes.json"), 'r', encoding='utf-8') as f:
+        report("recipes.json", json.load(f), args.exact_limit)
+    # The generated corpora draw from a few dozen ingredients: far more overlap than real recipes
+    for scale in map(int, args.scales.split(",")):
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            generate_corpus(corpus_dir, scale, image_every=0)
+            report("generated", parse_recipes(base_dir_override=corpus_dir), args.exact_limit)
+
+if __name__ == "__main__":
+    main()
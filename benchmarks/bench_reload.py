@@ -0,0 +1,82 @@
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def serve_requests(client, paths, stop, latencies):
+    """Requests `paths` in a loop until `stop` is set, appending each latency (ms) to `latencies`."""
+    position = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = client.get(paths[position % len(paths)])
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+        position += 1
+
+def report(label, latencies):
+    print(f"{label:15} {len(latencies):6} requests: p50 {statistics.median(latencies):6.2f} ms, "
+          f"p99 {percentile(latencies, 0.99):6.2f} ms, max {max(latencies):7.2f} ms")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Request latency while recipes are hot-reloaded")
+    arg_parser.add_argument("--seconds", type=float, default=3.0, help="Length of each phase")
+    arg_parser.add_argument("--reloads", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    import app
+    with tempfile.TemporaryDirectory() as data_dir:
+        dishes = os.path.join(data_dir, "dishes")
+        shutil.copytree(os.path.join(REPO_ROOT, "dishes"), dishes,
+                        ignore=lambda directory, names: [name for name in names if name.endswith(('.jpg', '.jpeg', '.png'))])
+        app.DISHES_DIRECTORY = dishes
+        app.RELOAD_CACHE_PATH = os.path.join(data_dir, "reload_cache.json")
+
+        start = time.perf_counter()
+        app.reload_recipes()
+        print(f"Cold reload (full parse + indexes): {(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"{len(app.recipes_data)} recipes")
+
+        client = app.app.test_client()
+        paths = ['/', f'/recipe/{len(app.recipes_data) // 2}', '/search?q=番茄炒蛋', '/cook-with?have=鸡蛋,番茄&missing=1']
+        for path in paths: # Render and cache every page once
+            client.get(path)
+
+        edited = next(os.path.join(root, name) for root, _, names in os.walk(dishes) for name in sorted(names)
+                      if name.endswith('.md'))
+        with open(edited, 'r', encoding='utf-8') as f:
+            original = f.read()
+
+        for phase in ("steady", "during reloads"):
+            latencies = []
+            stop = threading.Event()
+            thread = threading.Thread(target=serve_requests, args=(client, paths, stop, latencies))
+            thread.start()
+            reload_times = []
+            if phase == "steady":
+                time.sleep(args.seconds)
+            else:
+                for i in range(args.reloads):
+                    with open(edited, 'w', encoding='utf-8') as f:
+                        f.write(original + f"\n<!-- edit {i} -->\n")
+                    start = time.perf_counter()
+                    app.reload_recipes()
+                    reload_times.append((time.perf_counter() - start) * 1000)
+                    time.sleep(args.seconds / args.reloads)
+            stop.set()
+            thread.join()
+            report(phase, latencies)
+            if reload_times:
+                print(f"{'':15} incremental reload (1 file re-parsed + indexes): "
+                      f"median {statistics.median(reload_times):.0f} ms, max {max(reload_times):.0f} ms")
+
+if __name__ == "__main__":
+    main()
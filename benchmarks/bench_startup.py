@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from parser import file_digest
+from related_index import RelatedIndex
+from search_index import SearchIndex
+from snapshot import write_snapshot
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter: import the app (loading the recipes), then serve the first requests,
+# the search among them so the persisted search index is read as well
+CHILD = r"""
+import json, resource, sys, time
+sys.path.insert(0, %r)
+start = time.perf_counter()
+import app
+loaded = time.perf_counter()
+reload_start = time.perf_counter()
+app.load_recipes()
+load_recipes_ms = (time.perf_counter() - reload_start) * 1000
+client = app.app.test_client()
+client.get('/')
+client.get('/recipe/' + str(len(app.recipes_data) // 2))
+client.get('/search?q=' + app.recipes_data[0]['title'])
+first_requests = time.perf_counter()
+print(json.dumps({
+    "loader": type(app.recipes_data).__name__,
+    "import_ms": (loaded - start) * 1000,
+    "load_recipes_ms": load_recipes_ms,
+    "first_requests_ms": (first_requests - loaded) * 1000,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+def measure(snapshot_setting, runs, data_dir):
+    env = dict(os.environ, RECIPES_SNAPSHOT=snapshot_setting)
+    code = CHILD.replace("%r", repr(REPO_ROOT), 1)
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], env=env, cwd=data_dir,
+                                capture_output=True, text=True, check=True)
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    # Report the median run
+    return sorted(results, key=lambda result: result["import_ms"])[len(results) // 2]
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Cold start of app.py: recipes.json vs. the binary snapshot, "
+                                                     "with the indexes parser.py persists next to them")
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--scale", type=int, default=1, help="Replicate the corpus this many times")
+    args = arg_parser.parse_args()
+
+    with open(os.path.join(REPO_ROOT, "recipes.json"), 'r', encoding='utf-8') as f:
+        recipes = json.load(f) * args.scale
+    with tempfile.TemporaryDirectory() as data_dir:
+        # Same files parser.py writes, so `import app` does all it does in production
+        output_bytes = json.dumps(recipes, ensure_ascii=False, indent=4).encode('utf-8')
+        with open(os.path.join(data_dir, "recipes.json"), 'wb') as f:
+            f.write(output_bytes)
+        digest = file_digest(output_bytes)
+        SearchIndex.build(recipes).save(os.path.join(data_dir, "search_index.json"), digest)
+        RelatedIndex.build(recipes).save(os.path.join(data_dir, "related_recipes.json"), digest)
+        write_snapshot(os.path.join(data_dir, "recipes.snapshot"), recipes, digest)
+        print(f"{len(recipes)} recipes")
+        for label, setting in (("json", ""), ("snapshot", "recipes.snapshot")):
+            result = measure(setting, args.runs, data_dir)
+            print(f"{label:9} ({result['loader']}): import app {result['import_ms']:7.1f} ms "
+                  f"(load_recipes {result['load_recipes_ms']:7.1f} ms), "
+                  f"first 3 requests {result['first_requests_ms']:6.1f} ms, max RSS {result['max_rss_mb']:6.1f} MB")
+
+if __name__ == "__main__":
+    main()
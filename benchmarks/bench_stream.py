@@ -0,0 +1,66 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs parser.py's command line in a fresh interpreter and reports its peak RSS on stderr
+CHILD = r"""
+import resource, runpy, sys
+sys.path.insert(0, %r)
+sys.argv = ["parser.py"] + sys.argv[1:]
+try:
+    runpy.run_path(%r, run_name="__main__")
+finally:
+    sys.stderr.write("max_rss_kb=%%d\n" %% resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def copy_corpus(data_dir, scale):
+    """Replicates the Markdown files of dishes/ `scale` times under data_dir/dishes (images are left out)."""
+    source = os.path.join(REPO_ROOT, "dishes")
+    for copy in range(scale):
+        for root, _, names in os.walk(source):
+            target = os.path.join(data_dir, "dishes", f"copy{copy}", os.path.relpath(root, source))
+            for name in names:
+                if name.endswith(".md"):
+                    os.makedirs(target, exist_ok=True)
+                    shutil.copyfile(os.path.join(root, name), os.path.join(target, name))
+
+def run(data_dir, parser_args):
+    """Returns (ms to the first output line, ms to exit, output line count, peak RSS in MB)."""
+    code = CHILD % (REPO_ROOT, os.path.join(REPO_ROOT, "parser.py"))
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", code] + parser_args, cwd=data_dir,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    first_line_ms = None
+    lines = 0
+    for _ in process.stdout:
+        if first_line_ms is None:
+            first_line_ms = (time.perf_counter() - start) * 1000
+        lines += 1
+    stderr = process.stderr.read().decode('utf-8')
+    process.wait()
+    total_ms = (time.perf_counter() - start) * 1000
+    max_rss_kb = int(stderr.rsplit("max_rss_kb=", 1)[1])
+    return first_line_ms, total_ms, lines, max_rss_kb / 1024
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="parser.py: recipes.json vs. streamed NDJSON output")
+    arg_parser.add_argument("--scale", type=int, default=10, help="Replicate the corpus this many times")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        copy_corpus(data_dir, args.scale)
+        _, json_ms, _, json_rss = run(data_dir, ["--no-cache"])
+        # --format json only prints a summary once everything is written, so its first record is its exit
+        print(f"json   : first record {json_ms:8.0f} ms, done {json_ms:8.0f} ms, max RSS {json_rss:6.1f} MB")
+        first_ms, ndjson_ms, lines, ndjson_rss = run(data_dir, ["--no-cache", "--format", "ndjson", "-o", "-"])
+        print(f"ndjson : first record {first_ms:8.0f} ms, done {ndjson_ms:8.0f} ms, max RSS {ndjson_rss:6.1f} MB "
+              f"({lines} records)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from benchmarks.corpus import generate_corpus
+from parser import parse_recipes
+from suggest_index import SuggestIndex
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def report(label, recipes, queries, seed):
+    start = time.perf_counter()
+    index = SuggestIndex.build(recipes)
+    build_seconds = time.perf_counter() - start
+
+    # Prefixes of 1 to 4 characters of the indexed texts, as typed into a search box
+    rng = random.Random(seed)
+    texts = [suggestion["text"] for suggestion in index.suggestions]
+    prefixes = []
+    for _ in range(queries):
+        text = rng.choice(texts)
+        prefixes.append(text[:rng.randint(1, min(4, len(text)))])
+    latencies = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.suggest(prefix)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    print(f"{label:14} {len(recipes):6} recipes, {len(index.keys):6} entries, {len(index.top):4} precomputed: "
+          f"build {build_seconds * 1000:6.0f} ms, suggest p50 {latencies[len(latencies) // 2]:5.1f} us, "
+          f"p99 {latencies[int(len(latencies) * 0.99)]:5.1f} us, max {latencies[-1]:6.1f} us")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Typeahead suggestions: index build time and lookup latency")
+    arg_parser.add_argument("--scales", default="1000,10000", help="Sizes of the generated corpora")
+    arg_parser.add_argument("--queries", type=int, default=20000, help="Prefixes looked up per corpus")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    args = arg_parser.parse_args()
+
+    with open(os.path.join(REPO_ROOT, "recipes.json"), 'r', encoding='utf-8') as f:
+        report("recipes.json", json.load(f), args.queries, args.seed)
+    for scale in map(int, args.scales.split(",")):
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            generate_corpus(corpus_dir, scale, image_every=0)
+            report("generated", parse_recipes(base_dir_override=corpus_dir), args.queries, args.seed)
+
+if __name__ == "__main__":
+    main()
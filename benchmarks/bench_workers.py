@@ -0,0 +1,125 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from snapshot import write_snapshot
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_until_ready(port, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+def get(port, path):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        connection.request("GET", urllib.parse.quote(path, safe="/?=&,"))
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+def memory_of(pid):
+    """(RSS, PSS, private) of a process in MB, from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    return values["Rss"], values["Pss"], values["Private_Clean"] + values["Private_Dirty"]
+
+def worker_pids(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children", 'r') as f:
+        return [int(pid) for pid in f.read().split()]
+
+def load(port, paths, seconds, clients):
+    """Requests random paths from `clients` threads for `seconds`; returns requests per second."""
+    counts = [0] * clients
+    deadline = time.perf_counter() + seconds
+
+    def client(number):
+        rng = random.Random(number)
+        while time.perf_counter() < deadline:
+            status = get(port, rng.choice(paths))
+            assert status == 200, status
+            counts[number] += 1
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds
+
+def measure(data_dir, workers, preload, paths, seconds):
+    port = free_port()
+    command = [sys.executable, os.path.join(REPO_ROOT, "serve.py"), "--port", str(port), "-w", str(workers)]
+    if not preload:
+        command.append("--no-preload")
+    server = subprocess.Popen(command, cwd=data_dir, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(port)
+        # Every worker has seen every page once, as after some time in production
+        for path in paths * workers:
+            get(port, path)
+        throughput = load(port, paths, seconds, clients=max(2, workers * 2))
+        memory = [memory_of(pid) for pid in worker_pids(server.pid)]
+        master = memory_of(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    return throughput, memory, master
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="serve.py: worker memory and throughput by worker count")
+    arg_parser.add_argument("--workers", default="1,2,4")
+    arg_parser.add_argument("--scale", type=int, default=20, help="Replicate the corpus this many times")
+    arg_parser.add_argument("--seconds", type=float, default=5.0)
+    args = arg_parser.parse_args()
+
+    with open(os.path.join(REPO_ROOT, "recipes.json"), 'r', encoding='utf-8') as f:
+        recipes = json.load(f) * args.scale
+    rng = random.Random(1)
+    paths = (["/", "/index?page=2", "/search?q=番茄", "/cook-with?have=鸡蛋,番茄&missing=1"]
+             + [f"/recipe/{rng.randrange(len(recipes))}" for _ in range(40)]
+             + [f"/api/recipes/{rng.randrange(len(recipes))}" for _ in range(40)])
+    print(f"{len(recipes)} recipes, {os.cpu_count()} CPU(s)")
+    with tempfile.TemporaryDirectory() as data_dir:
+        with open(os.path.join(data_dir, "recipes.json"), 'w', encoding='utf-8') as f:
+            json.dump(recipes, f, ensure_ascii=False)
+        write_snapshot(os.path.join(data_dir, "recipes.snapshot"), recipes)
+        for preload in (True, False):
+            for workers in map(int, args.workers.split(",")):
+                throughput, memory, master = measure(data_dir, workers, preload, paths, args.seconds)
+                rss = sum(m[0] for m in memory) / len(memory)
+                pss = sum(m[1] for m in memory) / len(memory)
+                private = sum(m[2] for m in memory) / len(memory)
+                total = sum(m[1] for m in memory) + master[1]
+                print(f"{'preload' if preload else 'no preload':10} {workers} workers: {throughput:7.0f} req/s | "
+                      f"per worker RSS {rss:6.1f} MB, PSS {pss:6.1f} MB, private {private:6.1f} MB | "
+                      f"total PSS incl. master {total:6.1f} MB")
+
+if __name__ == "__main__":
+    main()
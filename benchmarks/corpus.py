@@ -0,0 +1,75 @@
+import io
+import os
+import random
+
+try:
+    from PIL import Image
+except ImportError: # Optional, placeholder bytes are written instead of real JPEGs
+    Image = None
+
+CATEGORIES = ("aquatic", "breakfast", "condiment", "dessert", "drink", "meat_dish", "semi-finished", "soup",
+              "staple", "vegetable_dish")
+INGREDIENTS = ("鸡蛋", "番茄", "土豆", "五花肉", "鸡胸肉", "牛腩", "排骨", "豆腐", "青椒", "洋葱", "大蒜", "生姜",
+               "小葱", "香菜", "胡萝卜", "白菜", "茄子", "黄瓜", "虾仁", "鲈鱼", "面粉", "大米", "冰糖", "生抽",
+               "老抽", "料酒", "蚝油", "醋", "盐", "白糖", "淀粉", "花椒", "干辣椒", "八角", "桂皮", "芝麻酱")
+UNITS = ("g", "ml", "个", "克", "毫升", "勺")
+ACTIONS = ("切成小块", "洗净沥干", "焯水 2 分钟", "大火翻炒", "小火慢炖", "加入调料拌匀", "盖上锅盖焖", "撒上葱花")
+DISH_SUFFIXES = ("炒", "烧", "炖", "拌", "蒸", "煎", "汤", "饭", "面", "粥")
+
+
+def render_recipe(rng, name, image_name=None):
+    """Markdown of one recipe following the headings and layout of dishes/template."""
+    ingredients = rng.sample(INGREDIENTS, rng.randint(3, 10))
+    lines = [f"# {name}的做法", ""]
+    if image_name:
+        lines += [f"![{name}成品](./{image_name})", ""]
+    lines += [
+        f"{name}是一道家常菜。一般初学者只需要 {rng.randint(10, 90)} 分钟即可完成。",
+        "",
+        f"预估烹饪难度：{'★' * rng.randint(1, 5)}",
+        "",
+        "## 必备原料和工具",
+        "",
+    ]
+    lines += [f"- {ingredient}" + ("（可选）" if rng.random() < 0.1 else "") for ingredient in ingredients]
+    lines += ["", "## 计算", "", "每次制作前需要确定计划做几份。一份正好够 2 个人吃。", "", "每份：", ""]
+    for ingredient in ingredients:
+        low = rng.randint(1, 50) * 5
+        amount = f"{low}-{low + rng.randint(1, 4) * 5}" if rng.random() < 0.3 else str(low)
+        lines.append(f"- {ingredient} {amount}{rng.choice(UNITS)}")
+    lines += ["", "## 操作", ""]
+    for _ in range(rng.randint(4, 12)):
+        lines.append(f"- {rng.choice(ingredients)}{rng.choice(ACTIONS)}，**等待 {rng.randint(1, 20)} 分钟**")
+    lines += ["", "## 附加内容", "", "- 操作时注意火候。", "",
+              "如果您遵循本指南的制作流程而发现有问题或可以改进的流程，请提出 Issue 或 Pull request 。", ""]
+    return "\n".join(lines)
+
+def placeholder_image(width=800, height=600):
+    """Bytes of a JPEG (a plain color, when Pillow is available) used for every generated image."""
+    if Image is None:
+        return b"\xff\xd8\xff\xe0" + bytes(1024)
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 120, 60)).save(buffer, "JPEG", quality=80)
+    return buffer.getvalue()
+
+def generate_corpus(root, count, seed=42, image_every=4):
+    """
+    Writes `count` synthetic recipes under root (laid out like dishes/: category/recipe/recipe.md),
+    every `image_every`-th one with a JPEG next to it. Same seed, same corpus.
+    Returns the image paths relative to root.
+    """
+    rng = random.Random(seed)
+    image_bytes = placeholder_image()
+    images = []
+    for number in range(count):
+        name = f"{rng.choice(INGREDIENTS)}{rng.choice(INGREDIENTS)}{rng.choice(DISH_SUFFIXES)}{number}"
+        directory = os.path.join(root, rng.choice(CATEGORIES), name)
+        os.makedirs(directory, exist_ok=True)
+        image_name = f"{name}.jpg" if image_every and number % image_every == 0 else None
+        with open(os.path.join(directory, f"{name}.md"), 'w', encoding='utf-8') as f:
+            f.write(render_recipe(rng, name, image_name))
+        if image_name:
+            with open(os.path.join(directory, image_name), 'wb') as f:
+                f.write(image_bytes)
+            images.append(os.path.relpath(os.path.join(directory, image_name), root).replace(os.sep, "/"))
+    return images
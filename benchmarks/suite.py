@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.corpus import generate_corpus
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_SCALES = (1000, 10000)
+DEFAULT_THRESHOLD = 0.25
+# Tail latencies of a few hundred requests are noisy, they get a looser threshold
+DEFAULT_P99_THRESHOLD = 0.5
+# Metrics where a larger value is better; for every other one, smaller is better
+HIGHER_IS_BETTER = {"parse_files_per_sec"}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def time_requests(client, paths):
+    """Requests each path once, returning (p50, p99) latency in ms."""
+    latencies = []
+    for path in paths:
+        start = time.perf_counter()
+        response = client.get(path)
+        response.close() # Releases the file send_file opened
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, (path, response.status_code)
+    return percentile(latencies, 0.5), percentile(latencies, 0.99)
+
+def measure(corpus_dir, requests, seed):
+    """
+    Runs in a fresh interpreter (see run_scale) so peak RSS only covers this corpus:
+    parses it, then serves it through the Flask test client. Returns the metrics dict.
+    """
+    from parser import parse_recipes, recipe_image_files
+    start = time.perf_counter()
+    recipes = parse_recipes(base_dir_override=corpus_dir)
+    parse_seconds = time.perf_counter() - start
+    metrics = {
+        "parse_files_per_sec": len(recipes) / parse_seconds,
+        "parse_peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+    import app
+    app.DISHES_DIRECTORY = corpus_dir
+    app.publish_version(app.DataVersion(recipes))
+    client = app.app.test_client()
+    rng = random.Random(seed)
+    page_count = -(-len(recipes) // app.INDEX_PAGE_SIZE)
+    images = [path for recipe in recipes for path in recipe_image_files(recipe)]
+    # First views of random pages and recipes, so most requests render (as right after a deploy)
+    routes = {
+        "index": [f"/?page={rng.randint(1, page_count)}" for _ in range(requests)],
+        "recipe_detail": [f"/recipe/{rng.randrange(len(recipes))}" for _ in range(requests)],
+        "serve_image": [f"/images/{rng.choice(images)}" for _ in range(requests)],
+    }
+    for route, paths in routes.items():
+        metrics[f"{route}_p50_ms"], metrics[f"{route}_p99_ms"] = time_requests(client, paths)
+    return metrics
+
+def run_scale(scale, requests, seed, runs):
+    """Measures a generated corpus `runs` times, each in a new process; returns the median of every metric."""
+    results = []
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        start = time.perf_counter()
+        generate_corpus(corpus_dir, scale, seed)
+        print(f"{scale} recipes generated in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--measure", corpus_dir,
+                                     "--requests", str(requests), "--seed", str(seed)],
+                                    capture_output=True, text=True, check=True)
+            results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return {name: statistics.median(result[name] for result in results) for name in results[0]}
+
+def compare(results, baselines, threshold, p99_threshold):
+    """Prints every metric against its baseline and returns the list of regressions."""
+    regressions = []
+    for scale, metrics in results.items():
+        for name, value in metrics.items():
+            baseline = baselines.get(scale, {}).get(name)
+            if baseline is None:
+                print(f"{scale:>7} {name:24} {value:10.2f}  (no baseline)")
+                continue
+            change = (value - baseline) / baseline
+            worse = -change if name in HIGHER_IS_BETTER else change
+            flag = "REGRESSION" if worse > (p99_threshold if name.endswith("_p99_ms") else threshold) else ""
+            print(f"{scale:>7} {name:24} {value:10.2f}  baseline {baseline:10.2f}  {change:+7.1%} {flag}")
+            if flag:
+                regressions.append((scale, name))
+    return regressions
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Parse throughput, peak memory and request latency "
+                                                     "on synthetic corpora, checked against stored baselines")
+    arg_parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                            help="Comma separated corpus sizes, e.g. 1000,10000,100000")
+    arg_parser.add_argument("--requests", type=int, default=500, help="Requests per route")
+    arg_parser.add_argument("--seed", type=int, default=42)
+    arg_parser.add_argument("--runs", type=int, default=3, help="Runs per scale, the median is reported")
+    arg_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help="Relative change counted as a regression (default: 0.25)")
+    arg_parser.add_argument("--p99-threshold", type=float, default=DEFAULT_P99_THRESHOLD,
+                            help="The same for p99 latencies (default: 0.5)")
+    arg_parser.add_argument("--check", action="store_true", help="Exit with status 1 when a metric regressed")
+    arg_parser.add_argument("--save-baseline", action="store_true", help=f"Store the results in {BASELINES_PATH}")
+    arg_parser.add_argument("--measure", metavar="CORPUS_DIR", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.requests, args.seed)))
+        return
+
+    results = {scale: run_scale(int(scale), args.requests, args.seed, args.runs) for scale in args.scales.split(",")}
+    try:
+        with open(BASELINES_PATH, 'r', encoding='utf-8') as f:
+            baselines = json.load(f)
+    except FileNotFoundError:
+        baselines = {}
+    regressions = compare(results, baselines, args.threshold, args.p99_threshold)
+
+    if args.save_baseline:
+        baselines.update({scale: {name: round(value, 3) for name, value in metrics.items()}
+                          for scale, metrics in results.items()})
+        with open(BASELINES_PATH, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=4, sort_keys=True)
+            f.write("\n")
+        print(f"Baselines written to {BASELINES_PATH}")
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed beyond the threshold")
+        if args.check:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
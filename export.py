@@ -0,0 +1,270 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import posixpath
+import shutil
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import safe_join
+import app as application
+from link_graph import LinkGraph
+from media_manifest import MediaManifest
+from parser import parse_recipes
+from recipe_model import json_default
+
+MANIFEST_NAME = ".build_manifest.json"
+PARSE_CACHE_NAME = ".parse_cache.json"
+MANIFEST_VERSION = 1
+
+# Set by export_site before the pool forks, so the workers render from the parent's parsed recipes
+_export_version = None
+
+
+def index_page_path(category=None, stars=None, page=None):
+    """Output path of an index page, e.g. "category/soup/difficulty/3/page-2.html"."""
+    parts = []
+    if category is not None:
+        parts += ["category", category]
+    if stars is not None:
+        parts += ["difficulty", str(stars)]
+    parts.append("index.html" if (page or 1) == 1 else f"page-{page}.html")
+    return posixpath.join(*parts)
+
+def recipe_page_path(recipe_id):
+    return f"recipe/{recipe_id}.html"
+
+def static_url_for(base_url):
+    """url_for for the exported templates: maps the app's endpoints to the files export_site writes."""
+
+    def url_for(endpoint, **values):
+        if endpoint == 'index':
+            path = index_page_path(values.get('category'), values.get('difficulty'), values.get('page'))
+        elif endpoint == 'recipe_detail':
+            path = recipe_page_path(values['recipe_id'])
+        elif endpoint == 'serve_image':
+            # There are no resized copies in the export (w/fmt), every image is the original file
+            path = f"images/{values['filename']}"
+        elif endpoint == 'static':
+            path = f"static/{values['filename']}"
+        else:
+            raise ValueError(f"No static page for endpoint {endpoint!r}")
+        return base_url + urllib.parse.quote(path)
+
+    return url_for
+
+def templates_digest():
+    """sha256 of every template file, so editing any of them re-renders every page."""
+    digest = hashlib.sha256()
+    template_dir = os.path.join(application.app.root_path, application.app.template_folder)
+    for root, dirs, files in sorted(os.walk(template_dir)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, template_dir).encode('utf-8') + b"\0")
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+def page_key(settings, inputs):
+    """Manifest key of a page: changes whenever the templates, settings or the page's inputs do."""
+    # No sort_keys: the parser builds every recipe dict in the same key order, and sorting doubles the cost
+    payload = json.dumps(inputs, ensure_ascii=False, separators=(',', ':'), default=json_default)
+    return hashlib.sha256(f"{settings}\0{payload}".encode('utf-8')).hexdigest()
+
+def file_key(path):
+    """Manifest key of a copied file; None when the source is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def plan_pages(version, settings):
+    """Yields (output path, key, job) for every index and recipe page."""
+    recipes = version.recipes
+    facets = version.derived('facets')
+    combinations = [(None, None)] + [(category, None) for category in facets.categories] + \
+                   [(None, stars) for stars in facets.difficulties]
+    combinations += [(category, stars) for category in facets.categories for stars in facets.difficulties
+                     if facets.ids(category, stars)]
+    for category, stars in combinations:
+        page_count = application.index_page_count(facets, category, stars)
+        category_counts, difficulty_counts = facets.counts(category, stars)
+        for page in range(1, page_count + 1):
+            ids, total = facets.page(category, stars, page, application.INDEX_PAGE_SIZE)
+            # Everything index.html shows: the listed recipes' titles and categories, counts and pagination
+            inputs = ['index', category, stars, page, page_count, total, list(category_counts.items()),
+                      list(difficulty_counts.items()),
+                      [(recipe_id, recipes[recipe_id]['title'], recipes[recipe_id]['category']) for recipe_id in ids]]
+            yield index_page_path(category, stars, page), page_key(settings, inputs), ('index', category, stars, page)
+    related = version.derived('related')
+    for recipe_id, recipe in enumerate(recipes):
+        # The page also links to its related recipes by title
+        inputs = ['recipe', recipe, [(related_id, recipes[related_id]['title'])
+                                     for related_id, _ in related.related(recipe_id)]]
+        yield recipe_page_path(recipe_id), page_key(settings, inputs), ('recipe', recipe_id)
+
+def plan_files(version, dishes_dir):
+    """
+    Yields (output path, key, source path) for the images the recipe pages reference and the static files.
+    Images missing from dishes_dir are reported and skipped.
+    """
+    seen = set()
+    for recipe in version.recipes:
+        for image_path in application.template_image_paths(recipe):
+            if image_path in seen:
+                continue
+            seen.add(image_path)
+            source = safe_join(dishes_dir, image_path)
+            key = file_key(source) if source else None
+            if key is None:
+                print(f"WARNING: image {image_path} referenced by {recipe.get('source_file')} not found")
+                continue
+            yield f"images/{image_path}", key, source
+    static_dir = application.app.static_folder
+    for root, dirs, files in os.walk(static_dir):
+        for name in files:
+            source = os.path.join(root, name)
+            relative_path = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            yield f"static/{relative_path}", file_key(source), source
+
+def _run_export_job(job):
+    """Process pool entry point: renders one page or copies one file into the output directory."""
+    kind, output_path = job[0], job[-1]
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if kind == 'copy':
+        shutil.copy2(job[1], output_path)
+        return
+    with application.app.app_context():
+        if kind == 'index':
+            html = application.render_index_page(_export_version, *job[1:4])
+        else:
+            html = application.render_recipe_page(_export_version, job[1])
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+def _run_export_jobs(jobs, workers):
+    """Runs export jobs sequentially or on a forked process pool, which inherits the loaded app and recipes."""
+    if workers <= 1 or len(jobs) <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        for job in jobs:
+            _run_export_job(job)
+        return
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+        for _ in executor.map(_run_export_job, jobs, chunksize=chunksize):
+            pass
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("outputs", {})
+
+def save_manifest(path, outputs):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"version": MANIFEST_VERSION, "outputs": outputs}, ensure_ascii=False))
+    os.replace(tmp_path, path)
+
+def default_state_dir(output_dir):
+    """Where export_site keeps its build state for output_dir: ".static_site.build" next to "static_site"."""
+    output_dir = os.path.abspath(output_dir)
+    return os.path.join(os.path.dirname(output_dir), f".{os.path.basename(output_dir)}.build")
+
+def export_site(output_dir, dishes_dir=None, base_url="/", workers=1, force=False, state_dir=None):
+    """
+    Writes the site as static files: every index page (all category/difficulty combinations and pages),
+    every recipe page, the images they reference and the static files.
+
+    The build manifest maps every output to a key of what it was built from (a hash of the templates
+    and the page's inputs, or a copied file's size and mtime); outputs whose key did not change are
+    skipped, and outputs that are no longer produced are deleted. The Markdown is re-parsed through a
+    parse cache, so a one-file change parses and renders only what it affects. Both are kept in
+    state_dir (default: default_state_dir(output_dir)), outside output_dir so they are not deployed.
+    `force` rebuilds everything. Returns counts of rendered, copied, skipped and deleted outputs.
+    """
+    global _export_version
+    start = time.perf_counter()
+    dishes_dir = os.path.abspath(dishes_dir or application.DISHES_DIRECTORY)
+    output_dir = os.path.abspath(output_dir)
+    state_dir = os.path.abspath(state_dir or default_state_dir(output_dir))
+    if state_dir == output_dir or state_dir.startswith(output_dir + os.sep):
+        raise ValueError(f"the build state would be exported with the site: {state_dir}")
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(state_dir, exist_ok=True)
+    for name in (MANIFEST_NAME, PARSE_CACHE_NAME):
+        # Left by builds that kept their state in output_dir
+        if os.path.exists(os.path.join(output_dir, name)):
+            os.remove(os.path.join(output_dir, name))
+    manifest_path = os.path.join(state_dir, MANIFEST_NAME)
+    old_outputs = {} if force else load_manifest(manifest_path)
+
+    recipes = parse_recipes(base_dir_override=dishes_dir, cache_path=os.path.join(state_dir, PARSE_CACHE_NAME),
+                            workers=workers)
+    # An empty media manifest: the export links images by their plain path, its copies are kept fresh by file_key.
+    # An empty link graph: the guide pages are not exported, so recipe pages have no backlinks to them.
+    version = application.DataVersion(tuple(recipes), derived={'media': MediaManifest(dishes_dir, {}),
+                                                               'links': LinkGraph.build([], {})})
+    settings = page_key(templates_digest(), [base_url, application.INDEX_PAGE_SIZE])
+
+    outputs = {}
+    jobs = []
+    stats = {"rendered": 0, "copied": 0, "skipped": 0, "deleted": 0}
+    planned = [(path, key, job) for path, key, job in plan_pages(version, settings)]
+    planned += [(path, key, ('copy', source)) for path, key, source in plan_files(version, dishes_dir)]
+    for path, key, job in planned:
+        outputs[path] = key
+        full_path = os.path.join(output_dir, *path.split('/'))
+        if old_outputs.get(path) == key and os.path.exists(full_path):
+            stats["skipped"] += 1
+            continue
+        stats["copied" if job[0] == 'copy' else "rendered"] += 1
+        jobs.append(job + (full_path,))
+
+    jinja_globals = application.app.jinja_env.globals
+    saved_globals = {name: jinja_globals.get(name) for name in ('url_for', 'image_srcset_widths')}
+    jinja_globals['url_for'] = static_url_for(base_url)
+    jinja_globals['image_srcset_widths'] = ()
+    _export_version = version
+    try:
+        _run_export_jobs(jobs, workers)
+    finally:
+        jinja_globals.update(saved_globals)
+        _export_version = None
+
+    for path in old_outputs.keys() - outputs.keys():
+        try:
+            os.remove(os.path.join(output_dir, *path.split('/')))
+            stats["deleted"] += 1
+        except FileNotFoundError:
+            pass
+    # Written last: an interrupted build leaves the previous manifest, so its outputs are rebuilt next time
+    save_manifest(manifest_path, outputs)
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Export the recipe site as static HTML, rebuilding only "
+                                                     "the pages whose recipe or template changed")
+    arg_parser.add_argument("-o", "--output", default="static_site",
+                            help="Output directory (default: static_site; mkdocs already builds into site/)")
+    arg_parser.add_argument("--dishes", help="Recipe directory (default: dishes/ next to app.py)")
+    arg_parser.add_argument("--base-url", default="/",
+                            help="URL prefix the site is served under, ending in '/' (default: /)")
+    arg_parser.add_argument("-j", "--workers", type=int, default=0,
+                            help="Number of processes parsing and rendering, 0 for one per CPU (default: 0)")
+    arg_parser.add_argument("--force", action="store_true", help="Ignore the build manifest and rebuild everything")
+    arg_parser.add_argument("--state-dir", help="Directory for the build manifest and parse cache, outside the output "
+                                                "(default: .<output>.build next to it)")
+    args = arg_parser.parse_args()
+
+    stats = export_site(args.output, args.dishes, args.base_url, args.workers or os.cpu_count() or 1, args.force,
+                        args.state_dir)
+    print(f"Exported to {args.output} in {stats['seconds']:.2f} s: {stats['rendered']} pages rendered, "
+          f"{stats['copied']} files copied, {stats['skipped']} unchanged, {stats['deleted']} deleted")
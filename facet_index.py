@@ -0,0 +1,62 @@
+from collections import defaultdict
+
+DIFFICULTY_STAR = "★"
+
+
+def difficulty_stars(difficulty):
+    """Star rating of a difficulty string ("★★★" -> 3); None when the recipe has no rating."""
+    return (difficulty or "").count(DIFFICULTY_STAR) or None
+
+
+class FacetIndex:
+    """
+    Posting lists of recipe ids for every category / star difficulty filter combination.
+
+    There are only a few dozen combinations, so each one (including "no filter" on either facet)
+    gets its own precomputed, ascending id list. A listing page is then a slice of one list and
+    facet counts are list lengths: nothing a request does depends on the size of the corpus.
+    """
+
+    def __init__(self, postings):
+        self.postings = postings # (category or None, stars or None) -> recipe ids, ascending
+        self.categories = sorted(category for category, stars in postings if category is not None and stars is None)
+        self.difficulties = sorted(stars for category, stars in postings if category is None and stars is not None)
+
+    @classmethod
+    def build(cls, recipes):
+        postings = defaultdict(list)
+        postings[(None, None)] # Present even for an empty corpus
+        for recipe_id, recipe in enumerate(recipes):
+            category = recipe.get('category')
+            stars = difficulty_stars(recipe.get('difficulty'))
+            # A set, so a recipe without a rating is not added twice to the same list
+            for key in {(None, None), (category, None), (None, stars), (category, stars)}:
+                postings[key].append(recipe_id)
+        return cls(dict(postings))
+
+    def ids(self, category=None, stars=None):
+        """Ids of the recipes matching the filters (None = any), ascending."""
+        return self.postings.get((category, stars), ())
+
+    def page(self, category=None, stars=None, page=1, per_page=50):
+        """Returns (recipe ids on 1-based page `page`, total number of matching recipes)."""
+        ids = self.ids(category, stars)
+        start = (page - 1) * per_page
+        return ids[start:start + per_page], len(ids)
+
+    def counts(self, category=None, stars=None):
+        """
+        Facet counts under the current filters, each facet counted with the other one applied:
+        returns ({category: count}, {stars: count}), zero counts left out.
+        """
+        category_counts = {}
+        for value in self.categories:
+            count = len(self.ids(value, stars))
+            if count:
+                category_counts[value] = count
+        difficulty_counts = {}
+        for value in self.difficulties:
+            count = len(self.ids(category, value))
+            if count:
+                difficulty_counts[value] = count
+        return category_counts, difficulty_counts
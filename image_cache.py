@@ -0,0 +1,176 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError: # Optional, without Pillow the original images are served
+    Image = None
+
+# Requested widths are rounded up to one of these, so the cache cannot be filled with every possible size
+DERIVATIVE_WIDTHS = (160, 320, 640, 960, 1280, 1920)
+# fmt query value -> (Pillow format, mimetype, file extension)
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "jpg": ("JPEG", "image/jpeg", "jpg"),
+    "png": ("PNG", "image/png", "png"),
+}
+DERIVATIVE_QUALITY = 80
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+# How often (seconds) a cache looks at the directory for what other processes wrote and evicted
+RESCAN_INTERVAL = 60
+# What parser.py --derivatives prepares ahead of time
+PREGENERATE_WIDTHS = (320, 640)
+PREGENERATE_FORMAT = "webp"
+
+
+def snap_width(width):
+    """Rounds a requested width up to the nearest allowed derivative width."""
+    for allowed in DERIVATIVE_WIDTHS:
+        if width <= allowed:
+            return allowed
+    return DERIVATIVE_WIDTHS[-1]
+
+def derivative_name(relative_path, stat_result, width, fmt):
+    """Cache file name of a derivative; a changed source (mtime/size) gets a new name."""
+    key = f"{relative_path}|{stat_result.st_mtime_ns}|{stat_result.st_size}|{width}|{fmt}"
+    return f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.{DERIVATIVE_FORMATS[fmt][2]}"
+
+def render_derivative(source_path, destination_path, width, fmt):
+    """Resizes (never upscales) and re-encodes one image with Pillow, writing it atomically."""
+    pillow_format = DERIVATIVE_FORMATS[fmt][0]
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image) # Phone photos are often stored rotated
+        if width and image.width > width:
+            image.thumbnail((width, image.height), Image.LANCZOS)
+        if pillow_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        elif pillow_format == "WEBP" and image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        tmp_path = f"{destination_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            image.save(tmp_path, pillow_format, quality=DERIVATIVE_QUALITY, optimize=True)
+            os.replace(tmp_path, destination_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return os.path.getsize(destination_path)
+
+
+class DerivativeCache:
+    """
+    Resized/re-encoded copies of source images in a directory bounded to `max_bytes`.
+    When the limit is exceeded, the least recently used derivatives are deleted. Recency is mirrored
+    to file mtimes, and the directory may be shared by several processes (app workers, parser.py
+    --derivatives): a derivative already on disk is used whoever rendered it. Sizes are accounted in
+    memory; every `rescan_interval` seconds a miss rescans the directory instead, so the bound also
+    covers what other processes wrote without a directory scan per miss.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_BYTES, rescan_interval=RESCAN_INTERVAL):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.rescan_interval = rescan_interval
+        self._last_rescan = 0.0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # file name -> size, least recently used first
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.rescan()
+
+    def rescan(self):
+        """Reloads the LRU state from the cache directory and evicts down to max_bytes."""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue # Evicted by another process meanwhile
+                files.append((st.st_mtime_ns, entry.name, st.st_size))
+        with self._lock:
+            self._last_rescan = time.monotonic()
+            # Files touched within one mtime tick keep the order this process saw them used in
+            order = {name: position for position, name in enumerate(self._entries)}
+            files.sort(key=lambda file: (file[0], order.get(file[1], -1)))
+            self._entries = OrderedDict((name, size) for _, name, size in files)
+            self._total_bytes = sum(self._entries.values())
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def get(self, source_root, relative_path, width, fmt):
+        """
+        Returns the path of the derivative of source_root/relative_path at `width` (None keeps the
+        original width) in format `fmt`, rendering it on a miss.
+        Raises FileNotFoundError when the source does not exist.
+        """
+        source_path = os.path.join(source_root, relative_path)
+        name = derivative_name(relative_path, os.stat(source_path), width, fmt)
+        path = os.path.join(self.cache_dir, name)
+        with self._lock:
+            try:
+                size = os.stat(path).st_size # Also finds derivatives other processes rendered
+            except FileNotFoundError:
+                size = None
+            if size is not None:
+                self._total_bytes += size - self._entries.pop(name, 0)
+                self._entries[name] = size
+                self.hits += 1
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return path
+
+        size = render_derivative(source_path, path, width, fmt)
+        with self._lock:
+            self.misses += 1
+            self._total_bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            stale = time.monotonic() - self._last_rescan >= self.rescan_interval
+            if not stale:
+                self._evict()
+        if stale:
+            self.rescan() # Evicts too, counting what other processes added meanwhile
+        return path
+
+
+def _pregenerate_job(job):
+    cache_dir, source_root, relative_path, width, fmt = job
+    source_path = os.path.join(source_root, relative_path)
+    try:
+        path = os.path.join(cache_dir, derivative_name(relative_path, os.stat(source_path), width, fmt))
+        if not os.path.exists(path):
+            render_derivative(source_path, path, width, fmt)
+        return None
+    except Exception as e:
+        return f"{relative_path} ({width}px {fmt}): {e}"
+
+def pregenerate(cache, source_root, relative_paths, widths=PREGENERATE_WIDTHS, fmt=PREGENERATE_FORMAT, workers=1):
+    """
+    Renders the derivatives of many images in a process pool so the first page views hit the cache.
+    Returns the list of failures as strings; the cache's size bound is enforced afterwards.
+    """
+    jobs = [(cache.cache_dir, source_root, relative_path, width, fmt)
+            for relative_path in sorted(set(relative_paths)) for width in widths]
+    if workers <= 1:
+        results = [_pregenerate_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_pregenerate_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    cache.rescan()
+    return [failure for failure in results if failure]
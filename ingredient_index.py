@@ -0,0 +1,122 @@
+import re
+
+# The recipe template says these are assumed to be in every kitchen, so they never count as missing
+KITCHEN_BASICS = {"燃气灶", "饮用水", "水", "锅", "食用油", "碗与盘子", "碗", "盘子", "筷子", "炒勺",
+                  "洗涤剂", "抹布", "钢丝球", "菜刀"}
+# Different spellings of the same ingredient
+INGREDIENT_ALIASES = {
+    "食盐": "盐", "食用盐": "盐", "精盐": "盐", "油": "食用油", "白砂糖": "白糖", "砂糖": "白糖", "糖": "白糖",
+    "大蒜": "蒜", "蒜瓣": "蒜", "蒜头": "蒜", "生姜": "姜", "老姜": "姜", "鸡蛋液": "鸡蛋", "西红柿": "番茄",
+}
+NOTE_RE = re.compile(r'[（(][^）)]*[）)]')
+SPLIT_RE = re.compile(r'[、，,;；]')
+
+
+def normalize_ingredient(name):
+    """Returns the vocabulary form of an ingredient name: notes in brackets removed, aliases resolved."""
+    name = NOTE_RE.sub('', name).strip(" \t:：。.")
+    return INGREDIENT_ALIASES.get(name, name)
+
+def required_ingredients(ingredient_lines):
+    """
+    Turns a recipe's "必备原料和工具" entries into the set of normalized names it requires.
+    Entries marked optional (可选), list headings ("原料:") and kitchen basics are left out;
+    "盆、碗、盘子" style enumerations count as several ingredients.
+    """
+    required = set()
+    for line in ingredient_lines or []:
+        if '可选' in line or line.rstrip().endswith((':', '：')):
+            continue
+        for part in SPLIT_RE.split(NOTE_RE.sub('', line)):
+            name = normalize_ingredient(part)
+            if name and name not in KITCHEN_BASICS:
+                required.add(name)
+    return required
+
+def iter_bits(bits):
+    """Yields the positions of the set bits of an int, lowest first."""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+class IngredientIndex:
+    """
+    Bitmap index from normalized ingredient names to the recipes requiring them.
+
+    Recipe sets are Python ints used as bitsets (bit i = recipe id i), so set algebra over the whole
+    corpus is a handful of big-int operations. The cost of a query depends on the size of the
+    pantry and of the largest recipe, not on the number of recipes or ingredients.
+    """
+
+    def __init__(self, vocabulary, bitmaps, size_bitmaps, required_sets):
+        self.vocabulary = vocabulary # name -> ingredient id
+        self.bitmaps = bitmaps # ingredient id -> recipes requiring it
+        self.size_bitmaps = size_bitmaps # n -> recipes requiring exactly n ingredients
+        self.required_sets = required_sets # recipe id -> set of ingredient names
+
+    @classmethod
+    def build(cls, recipes):
+        vocabulary = {}
+        bitmaps = []
+        size_bitmaps = []
+        required_sets = []
+        for recipe_id, recipe in enumerate(recipes):
+            required = required_ingredients(recipe.get('ingredients'))
+            required_sets.append(required)
+            bit = 1 << recipe_id
+            for name in required:
+                ingredient_id = vocabulary.get(name)
+                if ingredient_id is None:
+                    ingredient_id = vocabulary[name] = len(bitmaps)
+                    bitmaps.append(0)
+                bitmaps[ingredient_id] |= bit
+            while len(size_bitmaps) <= len(required):
+                size_bitmaps.append(0)
+            size_bitmaps[len(required)] |= bit
+        return cls(vocabulary, bitmaps, size_bitmaps, required_sets)
+
+    def _have_levels(self, have_ids):
+        """levels[j] = recipes requiring at least j of the pantry ingredients (a bit-sliced counter)."""
+        top = len(self.size_bitmaps) - 1
+        all_recipes = (1 << len(self.required_sets)) - 1
+        levels = [all_recipes] + [0] * top
+        for counted, ingredient_id in enumerate(have_ids, start=1):
+            bits = self.bitmaps[ingredient_id]
+            for j in range(min(counted, top), 0, -1):
+                levels[j] |= levels[j - 1] & bits
+        return levels
+
+    def missing_bitmaps(self, have, max_missing=0):
+        """
+        Returns a list whose entry m is the bitset of recipes missing exactly m required
+        ingredients from `have`, for m = 0..max_missing.
+        """
+        have_ids = sorted({self.vocabulary[name] for name in map(normalize_ingredient, have)
+                           if name in self.vocabulary})
+        levels = self._have_levels(have_ids)
+        levels.append(0) # Nobody requires more than the largest recipe
+
+        # A recipe requiring n ingredients misses exactly m of them when it has exactly n - m.
+        # Recipes without any parsed ingredient are never returned, there is nothing to match on.
+        result = []
+        for missing in range(max_missing + 1):
+            bits = 0
+            for required_count in range(max(missing, 1), len(self.size_bitmaps)):
+                have_count = required_count - missing
+                bits |= self.size_bitmaps[required_count] & levels[have_count] & ~levels[have_count + 1]
+            result.append(bits)
+        return result
+
+    def cookable(self, have, max_missing=0):
+        """
+        Recipes whose required ingredients are all in `have`, or miss at most `max_missing` of them.
+        Returns [(recipe id, sorted missing ingredient names)], fewest missing first, then by id.
+        """
+        pantry = {normalize_ingredient(name) for name in have}
+        results = []
+        for bits in self.missing_bitmaps(have, max_missing):
+            for recipe_id in iter_bits(bits):
+                results.append((recipe_id, sorted(self.required_sets[recipe_id] - pantry)))
+        return results
@@ -0,0 +1,71 @@
+import os
+import posixpath
+import urllib.parse
+
+
+def resolve_link(source_file, target):
+    """
+    The repository path a link in source_file points to, e.g. "dishes/breakfast/太阳蛋.md" for
+    "./../dishes/breakfast/太阳蛋.md" in "starsystem/1Star.md"; None for external links and anchors.
+    """
+    parts = urllib.parse.urlsplit(target.strip())
+    if parts.scheme or parts.netloc:
+        return None
+    path = urllib.parse.unquote(parts.path)
+    if not path:
+        return None # "#section" of the same document
+    if path.startswith('/'):
+        return posixpath.normpath(path.lstrip('/'))
+    source_dir = posixpath.dirname(source_file.replace(os.sep, '/'))
+    return posixpath.normpath(posixpath.join(source_dir, path))
+
+
+class LinkGraph:
+    """
+    Links between the documents the app serves, recipes and pages, resolved once to node ids
+    so a page finds what it links to and what links to it by list index.
+
+    Nodes are numbered by position in the `sources` list given to build (the app puts the recipes
+    first, so recipe i is node i, and the pages after them). Links to files that are not a node
+    are dangling and kept as (source file, target as written) for reporting.
+    """
+
+    def __init__(self, node_of, links, backlinks, dangling):
+        self.node_of = node_of # source file -> node id
+        self.links = links # node id -> [node ids it links to], in document order
+        self.backlinks = backlinks # node id -> [node ids linking to it], in node order
+        self.dangling = dangling # [(source file, target)]
+
+    @classmethod
+    def build(cls, sources, outgoing):
+        """`sources`: the source file of every node; `outgoing`: {source file: [link targets as written]}."""
+        node_of = {source: node for node, source in enumerate(sources) if source}
+        links = [[] for _ in sources]
+        backlinks = [[] for _ in sources]
+        dangling = []
+        for node, source in enumerate(sources):
+            for target in outgoing.get(source, ()):
+                path = resolve_link(source, target)
+                if path is None:
+                    continue
+                other = node_of.get(path)
+                if other is None:
+                    dangling.append((source, target))
+                elif other != node and other not in links[node]:
+                    links[node].append(other)
+                    backlinks[other].append(node)
+        return cls(node_of, links, backlinks, dangling)
+
+    def links_from(self, node):
+        return self.links[node] if 0 <= node < len(self.links) else []
+
+    def backlinks_to(self, node):
+        return self.backlinks[node] if 0 <= node < len(self.backlinks) else []
+
+    def resolve(self, source_file, target):
+        """Node id a link in source_file points to, or None if it is external or dangling."""
+        path = resolve_link(source_file, target)
+        return None if path is None else self.node_of.get(path)
+
+    def link_count(self):
+        return sum(len(node_links) for node_links in self.links)
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import safe_join
+from image_cache import Image
+
+MEDIA_MANIFEST_VERSION = 1
+# Hex digits of the sha256 kept: plenty to tell the versions of one file apart, short enough for URLs
+HASH_LENGTH = 16
+HASH_CHUNK_BYTES = 1 << 20
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+def image_dimensions(path):
+    """(width, height) read from the image header, or (None, None) without Pillow or for undecodable files."""
+    if Image is None:
+        return None, None
+    try:
+        with Image.open(path) as image: # Only the header is read until the pixels are used
+            return image.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None, None
+
+def _describe_job(job):
+    """Process pool entry point: the manifest entry of one image file, given its stat (size, mtime_ns)."""
+    path, relative_path, size, mtime_ns = job
+    try:
+        digest = file_hash(path)
+    except OSError:
+        return relative_path, None
+    width, height = image_dimensions(path)
+    return relative_path, {"size": size, "mtime_ns": mtime_ns, "width": width, "height": height, "hash": digest}
+
+
+class MediaManifest:
+    """
+    What is known about every image the recipes reference: byte size, dimensions and content hash,
+    keyed by path relative to the dishes directory. The hash goes into the image URLs, so those
+    change whenever a file does and can be cached as immutable. Referenced files that do not exist
+    are listed in `missing`, to be reported instead of 404ing when a page asks for them.
+    """
+
+    def __init__(self, source_root, entries, missing=()):
+        self.source_root = source_root
+        self.entries = entries # relative path -> {"size", "mtime_ns", "width", "height", "hash"}
+        self.missing = sorted(missing)
+
+    @classmethod
+    def build(cls, source_root, relative_paths, workers=1, previous=None):
+        """
+        Describes the files at `relative_paths` under source_root. Files whose size and mtime match
+        their entry in `previous` (a saved manifest) keep it without being read; the others are
+        hashed and measured, on a process pool when workers > 1.
+        """
+        old_entries = previous.entries if previous is not None else {}
+        entries = {}
+        missing = set()
+        jobs = []
+        for relative_path in sorted(set(relative_paths)):
+            path = safe_join(source_root, relative_path)
+            try:
+                st = os.stat(path) if path else None
+            except OSError:
+                st = None
+            if st is None or not os.path.isfile(path):
+                missing.add(relative_path)
+                continue
+            entry = old_entries.get(relative_path)
+            if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                entries[relative_path] = entry
+            else:
+                jobs.append((path, relative_path, st.st_size, st.st_mtime_ns))
+
+        if workers <= 1 or len(jobs) <= 1:
+            results = map(_describe_job, jobs)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_describe_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+        for relative_path, entry in results:
+            if entry is None:
+                missing.add(relative_path) # Removed or unreadable since the stat
+            else:
+                entries[relative_path] = entry
+        return cls(source_root, entries, missing)
+
+    def hash(self, relative_path):
+        entry = self.entries.get(relative_path)
+        return entry["hash"] if entry else None
+
+    def current_entry(self, relative_path):
+        """The file's entry if it has not changed on disk since the manifest was built, else None (one stat)."""
+        entry = self.entries.get(relative_path)
+        if entry is None:
+            return None
+        try:
+            st = os.stat(os.path.join(self.source_root, relative_path))
+        except OSError:
+            return None
+        if st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]:
+            return None
+        return entry
+
+    def undecodable(self):
+        """Files Pillow could not read the dimensions of (e.g. Git LFS pointers that were never fetched)."""
+        return sorted(path for path, entry in self.entries.items() if entry["width"] is None)
+
+    def save(self, path):
+        """Writes the manifest atomically, tagged with the directory it describes."""
+        data = {
+            "version": MEDIA_MANIFEST_VERSION,
+            "source_root": str(self.source_root),
+            "entries": self.entries,
+            "missing": self.missing,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, source_root):
+        """Loads a saved manifest, or returns None if it is missing, unreadable or describes another directory."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        if data.get("version") != MEDIA_MANIFEST_VERSION or data.get("source_root") != str(source_root):
+            return None
+        return cls(source_root, data["entries"], data.get("missing", ()))
@@ -0,0 +1,111 @@
+import bisect
+import threading
+
+# Upper bounds in seconds; requests served from the caches land in the first few buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_labels(labels):
+    """Prometheus label set for a tuple of (name, value) pairs, e.g. {route="index",phase="render"}."""
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+def format_value(value):
+    if isinstance(value, float) and value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of one label set. observe() is a bisect and three additions."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Per bucket, not cumulative; the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms kept in process memory and rendered in the Prometheus text
+    exposition format. Updates take one lock and touch a dict entry, so they can sit on the hot path;
+    values that already exist elsewhere (cache statistics) are read by collectors at scrape time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {} # metric name -> (type, help text), in registration order
+        self._values = {} # (name, labels) -> number, for counters and gauges
+        self._histograms = {} # (name, labels) -> Histogram
+        self._collectors = []
+
+    def describe(self, name, metric_type, help_text):
+        self._help.setdefault(name, (metric_type, help_text))
+
+    def inc(self, name, amount=1, labels=()):
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, name, value, labels=()):
+        self._values[(name, labels)] = value
+
+    def observe(self, name, value, labels=(), buckets=LATENCY_BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def add_collector(self, collect):
+        """collect() is called on every scrape and returns [(name, labels, value)] samples to expose."""
+        self._collectors.append(collect)
+
+    def value(self, name, labels=()):
+        return self._values.get((name, labels))
+
+    def histogram(self, name, labels=()):
+        return self._histograms.get((name, labels))
+
+    def render(self):
+        """The exposition text of every metric."""
+        samples = {} # name -> [line]
+        with self._lock:
+            values = list(self._values.items())
+            histograms = [(key, list(h.counts), h.sum, h.count, h.buckets) for key, h in self._histograms.items()]
+        for collect in self._collectors:
+            values.extend(((name, labels), value) for name, labels, value in collect())
+        for (name, labels), value in values:
+            samples.setdefault(name, []).append(f"{name}{format_labels(labels)} {format_value(value)}")
+        for (name, labels), counts, total, count, buckets in histograms:
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else format_value(bound)
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+        output = []
+        for name in list(self._help) + [name for name in samples if name not in self._help]:
+            if name not in samples:
+                continue
+            if name in self._help:
+                metric_type, help_text = self._help[name]
+                output.append(f"# HELP {name} {help_text}")
+                output.append(f"# TYPE {name} {metric_type}")
+            output.extend(samples[name])
+        return "\n".join(output) + "\n"
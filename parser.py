@@ -1,54 +1,133 @@
 import os
+import posixpath
 import glob
 import json
 import re
+import argparse
+import contextlib
+import hashlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from markdown import Markdown # Using python-markdown's core
 from pathlib import Path
+from quantities import extract_quantities
+from search_index import SearchIndex
+from related_index import RelatedIndex
+from image_cache import DerivativeCache, Image, pregenerate
+from media_manifest import MediaManifest
+from link_graph import LinkGraph
+from snapshot import write_snapshot
+from recipe_model import Recipe, json_default
+from metrics import Histogram, LATENCY_BUCKETS
 
-def extract_section_content(content, section_title):
+# Patterns are compiled once at import time, they run for every line of every recipe
+TITLE_RE = re.compile(r'^#\s+(.+?)\s*$')
+# The target may hold balanced parentheses ("石凉粉(冰粉)成品1.jpg") or be wrapped in <...>
+IMAGE_RE = re.compile(r'!\[.*?\]\((?!<?https?://)<?((?:[^()<>]|\([^()<>]*\))*?)>?\)')
+# Targets of [text](target) links (not images); link_graph.resolve_link drops the external ones
+LINK_RE = re.compile(r'(?<!!)\[[^\]]*\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)')
+# The template puts the difficulty on its own line ("预估烹饪难度：★★★") instead of under a "##" heading
+INLINE_DIFFICULTY_RE = re.compile(r'^预估烹饪难度\s*[:：]\s*(.+?)$')
+LIST_ITEM_RE = re.compile(r'^(?:[*-]|\d+\.)\s+(.+)', re.MULTILINE)
+KEY_VALUE_PATTERNS = [
+    # Key: Value or Key： Value, optionally starting with a list marker
+    re.compile(r'^\s*(?:[*-]\s+)?([^\n:]+?)\s*[:：]\s*(.+?)\s*$'),
+    # Key（Comment）Value, optionally starting with a list marker
+    re.compile(r'^\s*(?:[*-]\s+)?([^\n（]+?)\s*（(.+?)）\s*(.+?)\s*$'),
+    # Key Value (more general), optionally starting with a list marker
+    re.compile(r'^\s*(?:[*-]\s+)?([^\s]+)\s+([^\s]+.*)\s*$')
+]
+
+def tokenize_markdown(content):
     """
-    Extracts content from a specific section in Markdown text.
-    A section is defined by a H2 heading (## Section Title).
-    Content is everything between this heading and the next heading (any level) or end of doc.
+    Splits a recipe document into its parts in a single scan over its lines.
+
+    Returns a dict with:
+    - "title": text of the first H1 heading, or None
+    - "description": non-empty lines between the title and the next "##" heading
+    - "sections": {lowercased H2 title: section text}, where the text runs until the next "##" heading;
+      a heading without any lines after it maps to None. Only the first section with a given title is kept.
+    - "inline_difficulty": value of a "预估烹饪难度：..." line outside of any section, or None
+    - "image_paths": local image references (![alt](path)), in document order
+    - "links": targets of the other links ([text](target)) as written, in document order
     """
-    # Regex to find the section and capture its content until the next heading or EOF
-    # It looks for '## section_title', then a newline, then captures (non-greedy)
-    # until it hits another heading '^\s*#+' or the end of the string '$' (changed from \Z for section end)
-def extract_section_content(content, section_title):
-    lines = content.splitlines()
-    in_section = False
-    section_lines = []
-    
-    normalized_param_title = section_title.lower().strip()
+    title = None
+    description_lines = []
+    in_description = False # Between the title and the next "##" heading
+    inline_difficulty = None
+    image_paths = []
+    links = []
+    sections = {}
+    section_lines = None # Lines of the section being collected, None when outside a (kept) section
+
+    for line in content.splitlines():
+        if '![' in line:
+            image_paths.extend(match.group(1) for match in IMAGE_RE.finditer(line))
+        if '](' in line:
+            links.extend(match.group(1) for match in LINK_RE.finditer(line))
 
-    for line in lines:
         stripped_line = line.strip()
-        normalized_line_lower = stripped_line.lower()
+        if stripped_line.startswith('##'):
+            # Any H2 or deeper heading ends the description and the current section
+            in_description = False
+            section_title = stripped_line[2:].strip().lower()
+            if section_title in sections:
+                section_lines = None
+            else:
+                section_lines = sections[section_title] = []
+            continue
 
-        if in_section:
-            # Stop if we hit another H2 or H3 heading
-            if stripped_line.startswith('##') or stripped_line.startswith('###'):
-                break 
+        if title is None:
+            title_match = TITLE_RE.match(line)
+            if title_match:
+                title = title_match.group(1).strip()
+                in_description = True
+                if section_lines is not None:
+                    section_lines.append(line)
+                continue
+
+        if section_lines is not None:
             section_lines.append(line) # Keep original line content
-        else:
-            if normalized_line_lower.startswith("##"):
-                # Extract text after "##" and normalize (strip, lower)
-                title_part_on_line = stripped_line[2:].strip().lower()
-                if title_part_on_line == normalized_param_title:
-                    in_section = True
-                    # Content is on subsequent lines, so don't add this heading line
-    
-    if section_lines:
-        return "\n".join(section_lines).strip() # Strip overall block
-    return None
+            continue
+
+        if inline_difficulty is None:
+            difficulty_match = INLINE_DIFFICULTY_RE.match(stripped_line)
+            if difficulty_match:
+                inline_difficulty = difficulty_match.group(1).strip()
+                continue
+
+        if in_description and stripped_line:
+            description_lines.append(stripped_line)
+
+    return {
+        "title": title,
+        "description": "\n".join(description_lines),
+        "sections": {
+            section_title: "\n".join(lines).strip() if lines else None
+            for section_title, lines in sections.items()
+        },
+        "inline_difficulty": inline_difficulty,
+        "image_paths": image_paths,
+        "links": links,
+    }
+
+def extract_section_content(content, section_title):
+    """
+    Extracts content from a specific section in Markdown text.
+    A section is defined by a H2 heading (## Section Title).
+    Content is everything between this heading and the next H2 or deeper heading or end of doc.
+    When several fields are needed from one document, use tokenize_markdown once instead.
+    """
+    return tokenize_markdown(content)["sections"].get(section_title.lower().strip())
 
 def parse_markdown_list(text):
     """Parses a Markdown list (lines starting with -, *, or number.) into a list of strings."""
     if not text:
         return []
-    # Regex to find list items starting with 'DIGIT.', '*', or '-'
+    # Find list items starting with 'DIGIT.', '*', or '-'
     # It captures the content after the marker and leading spaces.
-    return [item.strip() for item in re.findall(r'^(?:[*-]|\d+\.)\s+(.+)', text, re.MULTILINE)]
+    return [item.strip() for item in LIST_ITEM_RE.findall(text)]
 
 def parse_key_value_pairs(text):
     """Parses lines like 'Key: Value' or 'Key（Value）' into a dictionary."""
@@ -57,22 +136,14 @@ def parse_key_value_pairs(text):
     data = {}
     # Handles "Key: Value", "Key：Value", "Key Value" (less specific), "Key（注释）Value"
     # Also handles optional list markers like "- Key: Value"
-    # Prioritizing more specific patterns first
-    patterns = [
-        # Key: Value or Key： Value, optionally starting with a list marker
-        r'^\s*(?:[*-]\s+)?([^\n:]+?)\s*[:：]\s*(.+?)\s*$',
-        # Key（Comment）Value, optionally starting with a list marker
-        r'^\s*(?:[*-]\s+)?([^\n（]+?)\s*（(.+?)）\s*(.+?)\s*$',
-        # Key Value (more general), optionally starting with a list marker
-        r'^\s*(?:[*-]\s+)?([^\s]+)\s+([^\s]+.*)\s*$'
-    ]
+    # Prioritizing more specific patterns first (see KEY_VALUE_PATTERNS)
     for line in text.splitlines():
         line = line.strip()
         if not line:
             continue
         matched = False
-        for pattern in patterns:
-            match = re.match(pattern, line)
+        for pattern in KEY_VALUE_PATTERNS:
+            match = pattern.match(line)
             if match:
                 if len(match.groups()) == 3: # Key（Comment）Value
                     key, comment, value = match.groups()
@@ -89,116 +160,453 @@ def parse_key_value_pairs(text):
     return data
 
 
-def parse_recipes(base_dir_override=None):
-    recipes_data = []
+PARSE_CACHE_VERSION = 6
+SEARCH_INDEX_PATH = "search_index.json"
+RELATED_INDEX_PATH = "related_recipes.json"
+SNAPSHOT_PATH = "recipes.snapshot"
+NDJSON_PATH = "recipes.ndjson"
+MEDIA_MANIFEST_PATH = "media_manifest.json"
+PAGES_PATH = "pages.json"
+PAGES_VERSION = 1
+# Guides next to dishes/ that link to recipes and each other; the app serves them as pages
+PAGE_TREES = ("tips", "starsystem")
+IMAGE_CACHE_DIRECTORY = os.environ.get("IMAGE_CACHE_DIRECTORY", ".image_cache")
+
+def read_markdown_file(filepath):
+    """Reads a Markdown file, returning its raw bytes and decoded text (newlines normalized like text mode)."""
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    content = raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+    return raw, content
+
+def file_digest(raw):
+    """Returns the content digest used to decide whether a cached parse is still valid."""
+    return hashlib.sha256(raw).hexdigest()
+
+def load_parse_cache(cache_path, base_dir):
+    """
+    Loads the on-disk parse cache written by save_parse_cache.
+    Returns a dict of {relative path: entry}, or {} if the cache is missing, unreadable,
+    written by another parser version or for another base directory.
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, UnicodeDecodeError):
+        return {}
+    if cache.get("version") != PARSE_CACHE_VERSION or cache.get("base_dir") != str(base_dir):
+        return {}
+    return cache.get("files", {})
+
+def save_parse_cache(cache_path, base_dir, entries):
+    """Writes the parse cache atomically so an interrupted run never leaves a truncated file behind."""
+    cache = {"version": PARSE_CACHE_VERSION, "base_dir": str(base_dir), "files": entries}
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        # dumps, unlike dump, runs the C encoder; this is on the hot-reload path
+        f.write(json.dumps(cache, ensure_ascii=False))
+    os.replace(tmp_path, cache_path)
+
+def parse_recipe_file(filepath, base_dir, content=None, links=None):
+    """
+    Parses a single recipe Markdown file into a recipe dict.
+    `content` can be passed when the caller already read the file.
+    If `links` is a list, the targets of the file's links are appended to it (see tokenize_markdown).
+    Parsing failures are returned as an error record (category "error") instead of raised.
+    """
+    path_obj = Path(filepath)
+    try:
+        # Determine category based on the path relative to the base_dir
+        # path_obj.parent is the directory containing the .md file
+        # We want the first directory *after* base_dir
+        relative_path_to_parent = path_obj.parent.relative_to(base_dir)
+        if relative_path_to_parent.parts:
+            category = relative_path_to_parent.parts[0]
+        else:
+            # If the file is directly in base_dir (e.g. temp_dishes/recipe.md)
+            category = "general"
+
+        if content is None:
+            _, content = read_markdown_file(filepath)
+
+        # One pass over the document, every field below is read from its result
+        document = tokenize_markdown(content)
+        sections = document["sections"]
+        if links is not None:
+            links.extend(document["links"])
+
+        # Title (first H1)
+        title = document["title"] or "Untitled Recipe"
+
+        # Description (text immediately following title until the next heading)
+        description = document["description"]
+
+        # The difficulty is either a "## 预估烹饪难度" section or an inline "预估烹饪难度：★★" line
+        difficulty_text = sections.get("预估烹饪难度")
+        if difficulty_text is None:
+            difficulty_text = document["inline_difficulty"]
+        
+        ingredients_text = sections.get("必备原料和工具")
+        ingredients_list = []
+        if ingredients_text:
+            raw_ingredients = parse_markdown_list(ingredients_text)
+            if not raw_ingredients and ingredients_text: 
+                 ingredients_list = [line.strip() for line in ingredients_text.split('\n') if line.strip()]
+            else:
+                ingredients_list = raw_ingredients
+
+        calculations_text = sections.get("计算")
+        calculations_data = parse_key_value_pairs(calculations_text)
+        if not calculations_data and calculations_text: 
+            calculations_data = calculations_text
+
+        instructions_text = sections.get("操作")
+        instructions_list = parse_markdown_list(instructions_text)
+        if not instructions_list and instructions_text: 
+            instructions_list = [line.strip() for line in instructions_text.split('\n') if line.strip()]
+
+        image_paths = document["image_paths"]
+        
+        recipe_dict = {
+            "title": title,
+            "description": description,
+            "difficulty": difficulty_text,
+            "ingredients": ingredients_list,
+            "calculations": calculations_data,
+            "quantities": extract_quantities(calculations_text),
+            "instructions": instructions_list,
+            "image_paths": image_paths,
+            "category": category,
+        }
+        # Store source_file path relative to the original base_dir name ('dishes') for consistency
+        # This makes sure that when app.py uses these paths, it still works as if from 'dishes'
+        original_base_name = "dishes" # Default name of the main recipes directory
+        path_relative_to_current_basedir = path_obj.relative_to(base_dir)
+        recipe_dict["source_file"] = str(Path(original_base_name) / path_relative_to_current_basedir)
+        return recipe_dict
+
+    except Exception as e:
+        print(f"Error parsing file {filepath}: {e}")
+        return {
+            "title": "Error parsing file",
+            "source_file": str(filepath),
+            "error": str(e),
+            "category": "error",
+            "description": None, "difficulty": None, "ingredients": [], 
+            "calculations": None, "quantities": [], "instructions": [], "image_paths": []
+        }
+
+def recipe_image_files(recipe):
+    """Paths of a recipe's local images relative to the dishes directory, e.g. "aquatic/蛏抱蛋/1.jpeg"."""
+    # source_file is like "dishes/category/recipe_folder/recipe.md"
+    recipe_dir = posixpath.dirname(recipe.get("source_file", "").replace(os.sep, "/")).partition("/")[2]
+    return [posixpath.normpath(posixpath.join(recipe_dir, image_path)) for image_path in recipe.get("image_paths") or []]
+
+def parse_page_file(filepath, root, links=None):
+    """
+    Parses a guide page into {"title", "source_file", "content"}; the app renders the Markdown content
+    as a whole. If `links` is a list, the targets of the page's links are appended to it.
+    """
+    _, content = read_markdown_file(filepath)
+    document = tokenize_markdown(content)
+    if links is not None:
+        links.extend(document["links"])
+    path_obj = Path(filepath)
+    return {
+        "title": document["title"] or path_obj.stem,
+        "source_file": path_obj.relative_to(root).as_posix(),
+        "content": content,
+    }
+
+def parse_pages(root=".", trees=PAGE_TREES, links=None):
+    """
+    Parses the Markdown pages under each of root's `trees` (tips/, starsystem/), in path order.
+    If `links` is a dict, each page's link targets are stored in it under its source_file, as iter_recipes does.
+    """
+    pages = []
+    for tree in trees:
+        for filepath in sorted(glob.glob(str(Path(root) / tree / '**/*.md'), recursive=True)):
+            page_links = []
+            try:
+                page = parse_page_file(filepath, root, page_links)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Error parsing file {filepath}: {e}")
+                continue
+            pages.append(page)
+            if links is not None:
+                links[page["source_file"]] = page_links
+    return pages
+
+def write_pages(path, pages, links):
+    """Writes the pages and the link targets of every document (recipes included) for the app, atomically."""
+    data = {"version": PAGES_VERSION, "pages": pages, "links": links}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(data, ensure_ascii=False))
+    os.replace(tmp_path, path)
+
+def broken_image_references(recipes, manifest):
+    """(source file, image path) of every image reference whose file the media manifest found missing."""
+    missing = set(manifest.missing)
+    return list(dict.fromkeys((recipe.get("source_file"), image_path) for recipe in recipes
+                              for image_path in recipe_image_files(recipe) if image_path in missing))
+
+def _parse_file_job(job):
+    """
+    Process pool entry point: parses one file and returns (recipe, link targets, content digest, seconds, bytes).
+    The digest is None when the file could not be read, so the error record is not cached.
+    """
+    filepath, base_dir = job
+    start = time.perf_counter()
+    try:
+        raw, content = read_markdown_file(filepath)
+    except (OSError, UnicodeDecodeError):
+        return parse_recipe_file(filepath, base_dir), [], None, time.perf_counter() - start, 0
+    links = []
+    recipe = parse_recipe_file(filepath, base_dir, content=content, links=links)
+    return recipe, links, file_digest(raw), time.perf_counter() - start, len(raw)
+
+def _iter_parse_jobs(jobs, workers):
+    """Runs parse jobs sequentially or on a process pool, yielding results in job order as they complete."""
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield _parse_file_job(job)
+        return
+    # Several files per task keeps the IPC overhead low on large corpora,
+    # while still leaving a few chunks per worker to balance uneven files.
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_parse_file_job, jobs, chunksize=chunksize)
+
+def iter_recipes(base_dir_override=None, cache_path=None, stats=None, workers=1, profile=None, links=None):
+    """
+    Parses every Markdown recipe under the dishes directory, yielding each Recipe as soon
+    as it is available, in the same order parse_recipes returns them. Without `cache_path` only the
+    recipe being yielded is held, so memory does not grow with the corpus; with it, the old and new
+    cache entries (every recipe, as a dict) are held until the cache is written at the end.
+
+    If `cache_path` is given, parsed recipes are kept in an on-disk cache keyed on each file's
+    mtime/size and content digest, so only added or modified files are re-parsed and deleted
+    files are dropped. The result is identical to a cold full parse.
+    The cache is written and `stats` (a dict) is filled with the cache "hits", "misses" and
+    "removed" counts once the generator is exhausted.
+    With `workers` > 1 the files that need parsing are spread over a process pool;
+    the output order is the same as a sequential parse. `workers=0` uses every CPU.
+    If `profile` is a list, (relative path, seconds, bytes) is appended to it for every file parsed
+    (cache hits are not parsed, use no cache to profile them all).
+    If `links` is a dict, the targets of each recipe's Markdown links are stored in it under the
+    recipe's source_file, for link_graph.LinkGraph; the cache keeps them too.
+    """
     # Using Path for easier path manipulation
     if base_dir_override:
         base_dir = Path(base_dir_override)
     else:
         base_dir = Path('dishes')
+    if not workers:
+        workers = os.cpu_count() or 1
     
     markdown_files = glob.glob(str(base_dir / '**/*.md'), recursive=True)
 
-    for filepath in markdown_files:
-        path_obj = Path(filepath)
+    old_entries = load_parse_cache(cache_path, base_dir) if cache_path else {}
+    new_entries = {}
+    hits = 0
+
+    # First pass: find what the cache can answer (only stat() for unchanged files), queue the rest
+    cached = [None] * len(markdown_files) # cached entry per position, None when it must be parsed
+    pending = [] # (position, cache key, stat result)
+    for position, filepath in enumerate(markdown_files):
+        cache_key = Path(filepath).relative_to(base_dir).as_posix()
+        entry = old_entries.get(cache_key)
         try:
-            category_parts = path_obj.parent.parts
-            # Determine category based on the path relative to the base_dir
-            # path_obj.parent is the directory containing the .md file
-            # We want the first directory *after* base_dir
-            relative_path_to_parent = path_obj.parent.relative_to(base_dir)
-            if relative_path_to_parent.parts:
-                category = relative_path_to_parent.parts[0]
+            st = os.stat(filepath)
+        except OSError:
+            st = None
+        if entry and st is not None:
+            if entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                # Unchanged on disk, no need to even read the file
+                reuse = True
             else:
-                # If the file is directly in base_dir (e.g. temp_dishes/recipe.md)
-                category = "general"
+                # Touched (e.g. fresh checkout) but maybe not modified, compare contents
+                try:
+                    raw, _ = read_markdown_file(filepath)
+                    reuse = file_digest(raw) == entry["digest"]
+                except (OSError, UnicodeDecodeError):
+                    reuse = False
+            if reuse:
+                new_entries[cache_key] = dict(entry, mtime_ns=st.st_mtime_ns, size=st.st_size)
+                cached[position] = entry
+                hits += 1
+                continue
+        pending.append((position, cache_key, st))
+
+    # Second pass: yield in file order, parsing the misses (possibly in parallel) as they come up
+    results = _iter_parse_jobs([(markdown_files[position], base_dir) for position, _, _ in pending], workers)
+    next_pending = 0
+    for position, entry in enumerate(cached):
+        if entry is None:
+            _, cache_key, st = pending[next_pending]
+            next_pending += 1
+            recipe, recipe_links, digest, seconds, size = next(results)
+            if profile is not None:
+                profile.append((cache_key, seconds, size))
+            if cache_path and digest is not None and st is not None and recipe["category"] != "error":
+                new_entries[cache_key] = {
+                    "mtime_ns": st.st_mtime_ns, "size": st.st_size, "digest": digest, "recipe": recipe,
+                    "links": recipe_links,
+                }
+        else:
+            recipe, recipe_links = entry["recipe"], entry["links"]
+        if links is not None:
+            links[recipe["source_file"]] = recipe_links
+        # The cache keeps the plain dict, the caller gets the compact record
+        yield Recipe.from_dict(recipe)
 
+    if cache_path:
+        save_parse_cache(cache_path, base_dir, new_entries)
+    if stats is not None:
+        stats["hits"] = hits
+        stats["misses"] = len(pending)
+        stats["removed"] = len(set(old_entries) - set(new_entries))
 
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
+def parse_recipes(base_dir_override=None, cache_path=None, stats=None, workers=1, profile=None, links=None):
+    """Parses every Markdown recipe under the dishes directory into a list; see iter_recipes."""
+    return list(iter_recipes(base_dir_override, cache_path, stats, workers, profile, links))
 
-            # Title (first H1)
-            title_match = re.search(r'^#\s+(.+?)\s*$', content, re.MULTILINE)
-            title = title_match.group(1).strip() if title_match else "Untitled Recipe"
+def write_parse_profile(profile, path, top=10):
+    """
+    Writes a per-file parse timing profile as TSV (seconds, bytes, path), slowest file first,
+    and prints a summary with the slowest files. Buckets match the app's latency histograms.
+    """
+    profile = sorted(profile, key=lambda entry: entry[1], reverse=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("seconds\tbytes\tpath\n")
+        for relative_path, seconds, size in profile:
+            f.write(f"{seconds:.6f}\t{size}\t{relative_path}\n")
+    if not profile:
+        return
+    histogram = Histogram(LATENCY_BUCKETS)
+    for _, seconds, _ in profile:
+        histogram.observe(seconds)
+    total = sum(seconds for _, seconds, _ in profile)
+    print(f"Parse profile written to {path}: {len(profile)} files, {total:.3f} s in total, "
+          f"median {profile[len(profile) // 2][1] * 1000:.2f} ms")
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), histogram.counts):
+        cumulative += count
+        if count:
+            print(f"  <= {bound * 1000:g} ms: {cumulative} files")
+    print(f"Slowest {min(top, len(profile))} files:")
+    for relative_path, seconds, size in profile[:top]:
+        print(f"  {seconds * 1000:8.2f} ms {size:8} bytes  {relative_path}")
 
-            # Description (text immediately following title until the next heading)
-            description = ""
-            if title_match:
-                search_start_pos = title_match.end()
-                # Find the start of the next heading (##, ###, etc.) or end of content
-                next_heading_match = re.search(r'^\s*##+', content[search_start_pos:], re.MULTILINE)
-                
-                description_end_pos = len(content) # Default to end of content
-                if next_heading_match:
-                    description_end_pos = search_start_pos + next_heading_match.start()
-                
-                description_text = content[search_start_pos:description_end_pos].strip()
-                # Join lines that are part of the same paragraph, then strip leading/trailing whitespace.
-                # This handles multi-line descriptions better.
-                description_lines = [line.strip() for line in description_text.splitlines()]
-                description = "\n".join(filter(None, description_lines)) # Remove empty lines from list then join
-            
-            # Using the helper to extract sections
-            difficulty_text = extract_section_content(content, "预估烹饪难度")
-            
-            ingredients_text = extract_section_content(content, "必备原料和工具")
-            ingredients_list = []
-            if ingredients_text:
-                raw_ingredients = parse_markdown_list(ingredients_text)
-                if not raw_ingredients and ingredients_text: 
-                     ingredients_list = [line.strip() for line in ingredients_text.split('\n') if line.strip()]
-                else:
-                    ingredients_list = raw_ingredients
-
-            calculations_text = extract_section_content(content, "计算")
-            calculations_data = parse_key_value_pairs(calculations_text)
-            if not calculations_data and calculations_text: 
-                calculations_data = calculations_text
-
-            instructions_text = extract_section_content(content, "操作")
-            instructions_list = parse_markdown_list(instructions_text)
-            if not instructions_list and instructions_text: 
-                instructions_list = [line.strip() for line in instructions_text.split('\n') if line.strip()]
-
-            image_paths = []
-            for img_match in re.finditer(r'!\[.*?\]\((?!https?://)(.*?)\)', content):
-                img_path = img_match.group(1)
-                image_paths.append(img_path)
-            
-            recipe_dict = {
-                "title": title,
-                "description": description,
-                "difficulty": difficulty_text,
-                "ingredients": ingredients_list,
-                "calculations": calculations_data,
-                "instructions": instructions_list,
-                "image_paths": image_paths,
-                "category": category,
-            }
-            # Store source_file path relative to the original base_dir name ('dishes') for consistency
-            # This makes sure that when app.py uses these paths, it still works as if from 'dishes'
-            original_base_name = "dishes" # Default name of the main recipes directory
-            path_relative_to_current_basedir = path_obj.relative_to(base_dir)
-            recipe_dict["source_file"] = str(Path(original_base_name) / path_relative_to_current_basedir)
-            
-            recipes_data.append(recipe_dict)
-
-        except Exception as e:
-            print(f"Error parsing file {filepath}: {e}")
-            recipes_data.append({
-                "title": "Error parsing file",
-                "source_file": filepath,
-                "error": str(e),
-                "category": "error",
-                "description": None, "difficulty": None, "ingredients": [], 
-                "calculations": None, "instructions": [], "image_paths": []
-            })
-
-    return recipes_data
+def write_ndjson(recipes, stream):
+    """Writes recipes to a binary stream as NDJSON (one compact JSON object per line), returning the count."""
+    count = 0
+    for recipe in recipes:
+        stream.write(json.dumps(recipe, ensure_ascii=False, separators=(',', ':'), default=json_default).encode('utf-8')
+                     + b"\n")
+        stream.flush() # Downstream jobs see each record as soon as it is parsed
+        count += 1
+    return count
 
 if __name__ == "__main__":
-    all_recipes = parse_recipes()
-    output_path = Path("recipes.json")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(all_recipes, f, ensure_ascii=False, indent=4)
-    print(f"Successfully parsed {len(all_recipes)} recipes into {output_path}")
+    arg_parser = argparse.ArgumentParser(description="Parse dishes/**/*.md into recipes.json")
+    arg_parser.add_argument("--cache",
+                            help="Incremental parse cache file (default: .parse_cache.json for --format json; "
+                                 "none for ndjson, whose memory would otherwise grow with the cache)")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Ignore the parse cache and parse every file")
+    arg_parser.add_argument("-j", "--workers", type=int, default=1,
+                            help="Number of parser processes, 0 for one per CPU (default: 1)")
+    arg_parser.add_argument("--derivatives", action="store_true",
+                            help="Also pre-generate the resized WebP copies of every recipe image the app serves "
+                                 "(json format only)")
+    arg_parser.add_argument("--format", choices=("json", "ndjson"), default="json",
+                            help="json: recipes.json plus the search index and snapshot the app loads; "
+                                 "ndjson: stream one recipe per line as files are parsed (default: json)")
+    arg_parser.add_argument("--profile", metavar="PATH",
+                            help="Write per-file parse times to PATH (TSV, slowest first); best with --no-cache")
+    arg_parser.add_argument("-o", "--output", help="NDJSON output file, '-' for stdout (default: recipes.ndjson)")
+    args = arg_parser.parse_args()
+    if args.no_cache:
+        args.cache = None
+    elif args.cache is None and args.format == "json":
+        args.cache = ".parse_cache.json"
+
+    cache_stats = {}
+    parse_profile = [] if args.profile else None
+    if args.format == "ndjson":
+        output_path = args.output or NDJSON_PATH
+        # With '-' the records own stdout, so progress and error messages go to stderr
+        log = sys.stderr if output_path == "-" else sys.stdout
+        recipes = iter_recipes(cache_path=args.cache, stats=cache_stats,
+                               workers=args.workers, profile=parse_profile)
+        if output_path == "-":
+            stream = sys.stdout.buffer
+            with contextlib.redirect_stdout(log):
+                try:
+                    count = write_ndjson(recipes, stream)
+                except BrokenPipeError:
+                    # The reader stopped early (e.g. `| head`), keep the exit-time flush from failing too
+                    os.dup2(os.open(os.devnull, os.O_WRONLY), stream.fileno())
+                    sys.exit(1)
+        else:
+            with open(output_path, 'wb') as stream:
+                count = write_ndjson(recipes, stream)
+        print(f"Successfully parsed {count} recipes into {output_path}", file=log)
+        if args.cache:
+            print(f"Parse cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                  f"{cache_stats['removed']} removed", file=log)
+        if args.profile:
+            with contextlib.redirect_stdout(log):
+                write_parse_profile(parse_profile, args.profile)
+    else:
+        links = {}
+        all_recipes = parse_recipes(cache_path=args.cache, stats=cache_stats,
+                                    workers=args.workers, profile=parse_profile, links=links)
+        output_path = Path("recipes.json")
+        output_bytes = json.dumps(all_recipes, ensure_ascii=False, indent=4, default=json_default).encode('utf-8')
+        with open(output_path, 'wb') as f:
+            f.write(output_bytes)
+        print(f"Successfully parsed {len(all_recipes)} recipes into {output_path}")
+
+        # The app loads this instead of building the index at startup, as long as the digests match
+        SearchIndex.build(all_recipes).save(SEARCH_INDEX_PATH, file_digest(output_bytes))
+        print(f"Search index written to {SEARCH_INDEX_PATH}")
+        RelatedIndex.build(all_recipes).save(RELATED_INDEX_PATH, file_digest(output_bytes))
+        print(f"Related recipes written to {RELATED_INDEX_PATH}")
+        write_snapshot(SNAPSHOT_PATH, all_recipes, file_digest(output_bytes))
+        print(f"Recipe snapshot written to {SNAPSHOT_PATH}")
+        # The guides link to recipes and recipes to guides; every relative link must lead to one of them
+        pages = parse_pages(links=links)
+        write_pages(PAGES_PATH, pages, links)
+        graph = LinkGraph.build([recipe.get("source_file") for recipe in all_recipes]
+                                + [page["source_file"] for page in pages], links)
+        for source_file, target in graph.dangling:
+            print(f"WARNING: link {target} in {source_file} points to a missing file")
+        print(f"{len(pages)} pages written to {PAGES_PATH}: {graph.link_count()} links, "
+              f"{len(graph.dangling)} dangling")
+        # Sizes, dimensions and hashes of the referenced images; the app puts the hashes in image URLs
+        dishes_root = os.path.abspath("dishes")
+        media = MediaManifest.build(dishes_root, [path for recipe in all_recipes for path in recipe_image_files(recipe)],
+                                    workers=args.workers or os.cpu_count() or 1,
+                                    previous=MediaManifest.load(MEDIA_MANIFEST_PATH, dishes_root))
+        media.save(MEDIA_MANIFEST_PATH)
+        for source_file, image_path in broken_image_references(all_recipes, media):
+            print(f"WARNING: image {image_path} referenced by {source_file} not found")
+        print(f"Media manifest written to {MEDIA_MANIFEST_PATH}: {len(media.entries)} images, "
+              f"{len(media.missing)} missing, {len(media.undecodable())} not decodable")
+        if args.cache:
+            print(f"Parse cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                  f"{cache_stats['removed']} removed")
+        if args.profile:
+            write_parse_profile(parse_profile, args.profile)
+        if args.derivatives:
+            if Image is None:
+                print("Pillow is not installed, skipping image derivatives")
+            else:
+                images = list(media.entries)
+                failures = pregenerate(DerivativeCache(IMAGE_CACHE_DIRECTORY), dishes_root, images,
+                                       workers=args.workers or os.cpu_count() or 1)
+                for failure in failures:
+                    print(f"Error generating image derivative {failure}")
+                print(f"Image derivatives ready for {len(set(images))} images in {IMAGE_CACHE_DIRECTORY}")
@@ -0,0 +1,236 @@
+import re
+import numpy as np
+from ingredient_index import NOTE_RE, normalize_ingredient
+
+# Unit spelling -> (canonical unit, factor to the canonical unit)
+# Mass is normalized to grams and volume to millilitres, counting units are kept as they are.
+UNIT_ALIASES = {
+    "mg": ("g", 0.001), "g": ("g", 1), "克": ("g", 1), "kg": ("g", 1000), "千克": ("g", 1000),
+    "公斤": ("g", 1000), "斤": ("g", 500), "两": ("g", 50),
+    "ml": ("ml", 1), "毫升": ("ml", 1), "l": ("ml", 1000), "升": ("ml", 1000),
+    "cm": ("cm", 1), "厘米": ("cm", 1),
+}
+COUNT_UNITS = ["个", "颗", "粒", "片", "根", "块", "把", "朵", "勺", "汤匙", "茶匙", "只", "条", "瓣",
+               "张", "杯", "碗", "节", "段", "头", "枚", "支", "包", "袋", "盒", "罐", "滴", "撮", "份"]
+
+_UNIT_PATTERN = "|".join(sorted((re.escape(unit) for unit in list(UNIT_ALIASES) + COUNT_UNITS),
+                                key=len, reverse=True))
+# "250g", "10-15ml", "0.5 根", "100ml-200ml", "2～3 个"
+QUANTITY_RE = re.compile(
+    r'(?P<min>\d+(?:\.\d+)?)\s*(?:(?:' + _UNIT_PATTERN + r')?\s*[-~～到至]\s*(?P<max>\d+(?:\.\d+)?))?\s*'
+    r'(?P<unit>' + _UNIT_PATTERN + r')(?![a-zA-Z])',
+    re.IGNORECASE
+)
+LIST_MARKER_RE = re.compile(r'^\s*(?:[*-]|\d+\.)\s+')
+NAME_SEPARATORS_RE = re.compile(r'[\s,，:：=(（、]+')
+# "盐的用量为 3 g" / "盐量 = 份数 * 1 克" / "辣椒的数量 = ..." / "鸡腿肉用量通常来说为 ..." / "蛋挞液约 10ml" -> "盐", ...
+NAME_SUFFIX_RE = re.compile(r'(?:的)?(?:(?:用|数|总)?量)+(?:通常来说)?(?:为|是)?$|(?:的)?大?约$|共需$|总共$|可选$')
+# A clause rather than a name ("如果觉得酱料较为清淡，可以加入 2 克盐"): the name, if any, follows the quantity
+PROSE_RE = re.compile(r'^(?:如果|一般|通常|当所有|每份|作为|基于|若)|可以|可按|准备|时候')
+# The quantity is divided by ("分钟/500ml", "面粉 / 4 克") rather than a fraction ("1/4 个")
+RATE_RE = re.compile(r'(?<![\d\s])\s*/\s*$')
+FRACTION_RE = re.compile(r'(?:(?P<whole>\d+)\s+)?(?P<numerator>\d+)\s*/\s*$')
+_UNIT_NAMES = {unit.lower() for unit in list(UNIT_ALIASES) + COUNT_UNITS}
+
+
+def normalize_unit(unit):
+    """Returns (canonical unit, factor) for a unit as written in a recipe."""
+    return UNIT_ALIASES.get(unit.lower(), (unit, 1))
+
+def name_part(text):
+    """The first part of `text` with letters in it, notes in brackets removed ("🥛 牛奶 (全脂)" -> "牛奶"), or ''."""
+    for part in NAME_SEPARATORS_RE.split(NOTE_RE.sub('', text)):
+        if re.search(r'\w', part):
+            return part
+    return ''
+
+def parse_quantity_line(line):
+    """
+    Parses one line of a "## 计算" section, e.g. "- 辣椒油 (0-10ml)" or "* 3 个鸡蛋".
+    Returns {"ingredient", "amount", "min", "max", "unit"} with the amount normalized to the
+    canonical unit (g, ml or a counting unit), or None when the line has no usable quantity.
+    A range is stored as min/max with its midpoint as the amount.
+    """
+    text = LIST_MARKER_RE.sub('', line).strip()
+    match = QUANTITY_RE.search(text)
+    if not match:
+        return None
+    before, after = text[:match.start()], text[match.end():]
+    if RATE_RE.search(before):
+        return None # A rate, "1.5 分钟/500ml * 水体积", not an amount
+    if not before.strip() and after.lstrip().startswith('='):
+        return None # A unit definition, "1 汤匙 = 15ml"
+    fraction = FRACTION_RE.search(before)
+    if fraction:
+        before = before[:fraction.start()]
+
+    name = name_part(before)
+    if not name or PROSE_RE.search(name):
+        # Quantity first, as in "3 个鸡蛋", or after a clause
+        name = name_part(after.lstrip().removeprefix('的'))
+        if PROSE_RE.search(name):
+            return None
+    # Emoji and marks go ("牛奶🥛", "`油`" -> "牛奶", "油"); the tail of a note cut by the quantity ("水量）")
+    # or a sum ("100g 肉+5g 淀粉") is no name
+    name = re.sub(r'^[^\w(（/]+|[^\w)）]+$', '', name)
+    if name.endswith((')', '）')) or '+' in name:
+        return None
+    ingredient = normalize_ingredient(NAME_SUFFIX_RE.sub('', name) or name)
+    # "2 人 1 顿 520g", "100°C 沸水", "1 : 1 蔗糖糖浆" and the like have no ingredient name in front
+    if not ingredient or ingredient[0].isdigit() or ingredient.startswith('/') or ingredient.lower() in _UNIT_NAMES:
+        return None
+
+    unit, factor = normalize_unit(match.group("unit"))
+    low = float(match.group("min")) * factor
+    high = float(match.group("max")) * factor if match.group("max") else low
+    if fraction:
+        # "1/4 根", "2 1/2 茶匙": the match only covered the denominator
+        whole = float(fraction.group("whole") or 0)
+        low = high = (whole + float(fraction.group("numerator")) / float(match.group("min"))) * factor
+    if high < low:
+        low, high = high, low
+    return {
+        "ingredient": ingredient,
+        "amount": round((low + high) / 2, 6),
+        "min": round(low, 6),
+        "max": round(high, 6),
+        "unit": unit,
+    }
+
+def extract_quantities(text):
+    """Parses every list line of a "## 计算" section into normalized quantities (see parse_quantity_line)."""
+    if not text:
+        return []
+    quantities = []
+    for line in text.splitlines():
+        if not LIST_MARKER_RE.match(line):
+            continue
+        quantity = parse_quantity_line(line)
+        if quantity:
+            quantities.append(quantity)
+    return quantities
+
+
+class QuantityTable:
+    """
+    The quantities of a whole corpus stored column-wise in NumPy arrays.
+
+    Rows are grouped by recipe: the rows of recipe i are recipe_offsets[i]:recipe_offsets[i + 1].
+    Ingredient and unit names are stored once in `ingredients`/`units` and referenced by id.
+    Quantities are per serving (份), scaling to N servings multiplies them by N.
+    """
+
+    def __init__(self, recipe_offsets, ingredient_ids, unit_ids, amounts, mins, maxs, ingredients, units):
+        self.recipe_offsets = recipe_offsets
+        self.ingredient_ids = ingredient_ids
+        self.unit_ids = unit_ids
+        self.amounts = amounts
+        self.mins = mins
+        self.maxs = maxs
+        self.ingredients = ingredients
+        self.units = units
+
+    @classmethod
+    def from_recipes(cls, recipes):
+        """Builds the table from recipe dicts carrying a "quantities" list (as written by parser.py)."""
+        rows = []
+        offsets = [0]
+        for recipe in recipes:
+            rows.extend(recipe.get("quantities") or [])
+            offsets.append(len(rows))
+
+        # Ids follow the sorted names, so aggregated lists come out in name order for free
+        ingredients = sorted({row["ingredient"] for row in rows})
+        units = sorted({row["unit"] for row in rows})
+        ingredient_index = {name: i for i, name in enumerate(ingredients)}
+        unit_index = {name: i for i, name in enumerate(units)}
+
+        return cls(
+            recipe_offsets=np.array(offsets, dtype=np.int64),
+            ingredient_ids=np.array([ingredient_index[row["ingredient"]] for row in rows], dtype=np.int32),
+            unit_ids=np.array([unit_index[row["unit"]] for row in rows], dtype=np.int32),
+            amounts=np.array([row["amount"] for row in rows], dtype=np.float64),
+            mins=np.array([row["min"] for row in rows], dtype=np.float64),
+            maxs=np.array([row["max"] for row in rows], dtype=np.float64),
+            ingredients=ingredients,
+            units=units,
+        )
+
+    @property
+    def recipe_count(self):
+        return len(self.recipe_offsets) - 1
+
+    def _select_rows(self, recipe_ids, servings):
+        """Returns (row indices, per-row serving multiplier, per-row position in recipe_ids), fully vectorized."""
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        servings = np.asarray(servings, dtype=np.float64)
+        starts = self.recipe_offsets[recipe_ids]
+        lengths = self.recipe_offsets[recipe_ids + 1] - starts
+        total = int(lengths.sum())
+        # Concatenation of arange(start, start + length) for every selected recipe
+        segment_starts = np.cumsum(lengths) - lengths
+        rows = np.arange(total, dtype=np.int64) - np.repeat(segment_starts, lengths) + np.repeat(starts, lengths)
+        positions = np.repeat(np.arange(len(recipe_ids)), lengths)
+        return rows, np.repeat(servings, lengths), positions
+
+    def _items(self, ingredient_ids, unit_ids, amounts, mins, maxs):
+        return [
+            {
+                "ingredient": self.ingredients[ingredient_id],
+                "amount": round(float(amount), 3),
+                "min": round(float(low), 3),
+                "max": round(float(high), 3),
+                "unit": self.units[unit_id],
+            }
+            for ingredient_id, unit_id, amount, low, high
+            in zip(ingredient_ids.tolist(), unit_ids.tolist(), amounts, mins, maxs)
+        ]
+
+    def scale(self, recipe_id, servings):
+        """Returns the quantities of one recipe scaled to `servings` servings."""
+        rows = slice(self.recipe_offsets[recipe_id], self.recipe_offsets[recipe_id + 1])
+        return self._items(self.ingredient_ids[rows], self.unit_ids[rows], self.amounts[rows] * servings,
+                           self.mins[rows] * servings, self.maxs[rows] * servings)
+
+    def shopping_lists(self, combos):
+        """
+        Builds one shopping list per combo in a single vectorized pass.
+        Each combo is a {recipe id: servings} dict; quantities of the same ingredient and unit
+        are summed. Returns a list (one per combo) of item lists sorted by ingredient name.
+        """
+        recipe_ids, servings, combo_of = [], [], []
+        for combo_index, combo in enumerate(combos):
+            for recipe_id, recipe_servings in combo.items():
+                if not 0 <= recipe_id < self.recipe_count:
+                    raise IndexError(f"recipe id {recipe_id} out of range")
+                recipe_ids.append(recipe_id)
+                servings.append(recipe_servings)
+                combo_of.append(combo_index)
+        if not recipe_ids:
+            return [[] for _ in combos]
+
+        rows, weights, positions = self._select_rows(recipe_ids, servings)
+        row_combos = np.asarray(combo_of, dtype=np.int64)[positions]
+        # One integer key per (combo, ingredient, unit) group
+        unit_count = max(len(self.units), 1)
+        group_span = len(self.ingredients) * unit_count
+        keys = row_combos * group_span + self.ingredient_ids[rows].astype(np.int64) * unit_count + self.unit_ids[rows]
+        group_keys, group_of_row = np.unique(keys, return_inverse=True)
+        amounts = np.bincount(group_of_row, weights=self.amounts[rows] * weights)
+        mins = np.bincount(group_of_row, weights=self.mins[rows] * weights)
+        maxs = np.bincount(group_of_row, weights=self.maxs[rows] * weights)
+
+        group_combos = group_keys // group_span
+        ingredient_ids = (group_keys % group_span) // unit_count
+        unit_ids = group_keys % unit_count
+        # Keys are sorted, so each combo's groups are one contiguous run
+        bounds = np.searchsorted(group_combos, np.arange(len(combos) + 1))
+        return [
+            self._items(ingredient_ids[start:end], unit_ids[start:end],
+                        amounts[start:end], mins[start:end], maxs[start:end])
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+
+    def shopping_list(self, servings_by_recipe):
+        """Aggregated shopping list for one {recipe id: servings} combo."""
+        return self.shopping_lists([servings_by_recipe])[0]
@@ -0,0 +1,51 @@
+import json
+# The fields the API serves (and accepts in fields=)
+from recipe_model import RECIPE_FIELDS, json_default
+
+
+def encode_json(value):
+    """Compact UTF-8 JSON bytes; the encoding of every cached fragment (and of snapshot fields)."""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=json_default).encode('utf-8')
+
+
+class RecipeJSONCache:
+    """
+    Serialized JSON of one data version's recipes, field by field.
+
+    Each field of each recipe is encoded once, as its `"name":value` object member. A recipe
+    object, with any projection of fields, is then a join of cached members, and an API response
+    a join of objects, so requests only concatenate bytes. Snapshot-backed recipes (LazyRecipe)
+    already hold each field's JSON, which is used as is without decoding it.
+    """
+
+    def __init__(self, recipes):
+        self.recipes = recipes
+        self._members = {} # (recipe id, field) -> b'"field":value'
+        self._names = {field: encode_json(field) + b":" for field in RECIPE_FIELDS}
+
+    def member(self, recipe_id, field):
+        """The `"field":value` bytes of a recipe, or None when the recipe has no such field."""
+        key = (recipe_id, field)
+        member = self._members.get(key)
+        if member is None:
+            recipe = self.recipes[recipe_id]
+            if field not in recipe:
+                return None
+            raw = getattr(recipe, 'raw', None)
+            value = bytes(raw(field)) if raw is not None else encode_json(recipe[field])
+            # Concurrent first requests may both encode it; they store identical bytes
+            member = self._members[key] = self._names[field] + value
+        return member
+
+    def object(self, recipe_id, fields=RECIPE_FIELDS):
+        """A recipe as a JSON object with its "id" and the given fields (those it has), as bytes."""
+        members = [b'"id":%d' % recipe_id]
+        for field in fields:
+            member = self.member(recipe_id, field)
+            if member is not None:
+                members.append(member)
+        return b"{" + b",".join(members) + b"}"
+
+    def array(self, recipe_ids, fields=RECIPE_FIELDS):
+        """A JSON array of recipe objects, as bytes."""
+        return b"[" + b",".join(self.object(recipe_id, fields) for recipe_id in recipe_ids) + b"]"
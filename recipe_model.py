@@ -0,0 +1,163 @@
+import sys
+from collections.abc import Mapping, MutableMapping
+
+# Recipe fields in parser.py's output order, which is also the order they are serialized in
+RECIPE_FIELDS = ("title", "description", "difficulty", "ingredients", "calculations", "quantities",
+                 "instructions", "image_paths", "category", "source_file")
+QUANTITY_FIELDS = ("ingredient", "amount", "min", "max", "unit")
+
+
+def intern(value):
+    """
+    The shared copy of a string: category names, difficulties, ingredient names and units repeat
+    across thousands of recipes, interned they are stored once. Anything else is returned as is.
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+class Record(MutableMapping):
+    """
+    A fixed set of named fields kept in __slots__ instead of a per-object dict, so a record is a few
+    pointers and attribute access (recipe.title, including from templates) needs no hashing.
+    It still behaves like the dict it replaces: r['title'], r.get(...), iteration in field order,
+    equality with dicts. Keys outside FIELDS, which parser.py never writes, go to a small dict.
+    """
+
+    __slots__ = ('_extra',)
+    FIELDS = ()
+    _FIELD_SET = frozenset()
+
+    def __init__(self, fields=()):
+        self._extra = None
+        field_set = self._FIELD_SET
+        for key, value in (fields.items() if isinstance(fields, Mapping) else fields):
+            if key in field_set:
+                setattr(self, key, value)
+            else:
+                self[key] = value
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def get(self, key, default=None):
+        if key in self._FIELD_SET:
+            return getattr(self, key, default)
+        return default if self._extra is None else self._extra.get(key, default)
+
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self._FIELD_SET:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self):
+        return type(self)(self)
+
+    def to_dict(self):
+        return dict(self)
+
+    def __reduce__(self):
+        # Pickled (process pools, copy) as its items, like a dict
+        return type(self), (list(self.items()),)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class Quantity(Record):
+    """One row of a recipe's "quantities": ingredient, amount, min, max, unit."""
+
+    __slots__ = QUANTITY_FIELDS
+    FIELDS = QUANTITY_FIELDS
+    _FIELD_SET = frozenset(QUANTITY_FIELDS)
+
+    @classmethod
+    def from_dict(cls, row):
+        if row.keys() == cls._FIELD_SET:
+            # Every row parser.py writes; a large corpus has millions of them, so no generic field loop
+            quantity = cls.__new__(cls)
+            quantity._extra = None
+            quantity.ingredient = intern(row["ingredient"])
+            quantity.amount = amount = row["amount"]
+            minimum, maximum = row["min"], row["max"]
+            quantity.min = amount if minimum == amount else minimum
+            quantity.max = amount if maximum == amount else maximum
+            quantity.unit = intern(row["unit"])
+            return quantity
+        quantity = cls(row)
+        for name in ("ingredient", "unit"):
+            if name in quantity:
+                quantity[name] = intern(quantity[name])
+        # Most rows are exact amounts: one float object for all three
+        amount = quantity.get("amount")
+        if amount is not None:
+            for name in ("min", "max"):
+                if quantity.get(name) == amount:
+                    quantity[name] = amount
+        return quantity
+
+
+class Recipe(Record):
+    """
+    A parsed recipe: what parser.py writes to recipes.json for one Markdown file, and what the app
+    serves. Error records (category "error") also carry an "error" message.
+    """
+
+    __slots__ = RECIPE_FIELDS + ("error",)
+    FIELDS = RECIPE_FIELDS + ("error",)
+    _FIELD_SET = frozenset(FIELDS)
+
+    @classmethod
+    def from_dict(cls, fields):
+        """A Recipe from a recipe dict (parser output or decoded JSON), with its repeated strings interned."""
+        recipe = cls(fields)
+        for name in ("category", "difficulty"):
+            if name in recipe:
+                recipe[name] = intern(recipe[name])
+        if recipe.get("ingredients"):
+            recipe.ingredients = [intern(line) for line in recipe.ingredients]
+        if recipe.get("quantities"):
+            recipe.quantities = [Quantity.from_dict(row) for row in recipe.quantities]
+        return recipe
+
+
+def json_default(value):
+    """json.dumps(default=...) hook: records are encoded as the objects they stand for."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
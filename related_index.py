@@ -0,0 +1,174 @@
+import heapq
+import json
+import os
+import zlib
+from collections import Counter
+import numpy as np
+from ingredient_index import required_ingredients
+from search_index import tokenize, recipe_fields
+
+RELATED_INDEX_VERSION = 1
+RELATED_COUNT = 5 # Neighbors stored per recipe
+# Below this Jaccard similarity two recipes are not shown as related
+MIN_SIMILARITY = 0.1
+# 64 bands of 2 rows: pairs with a Jaccard similarity of 0.1 become candidates about half the time, 0.2 about 93%
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 64
+# A bucket this full holds recipes sharing only a very common feature; pairing all of them is quadratic
+MAX_BUCKET_SIZE = 100
+# Candidates compared exactly per recipe, those sharing the most buckets (the best similarity estimates)
+MAX_CANDIDATES = 50
+MINHASH_SEED = 1
+# Hash values computed at once while building signatures (8 bytes each)
+SIGNATURE_CHUNK_VALUES = 1 << 22
+
+
+def recipe_features(recipe):
+    """
+    The set MinHash compares: the recipe's required ingredients (normalized, kitchen basics left out)
+    and the word/bigram shingles of its title. Prefixes keep an ingredient apart from a title bigram.
+    """
+    features = {f"i:{name}" for name in required_ingredients(recipe.get("ingredients"))}
+    features.update(f"t:{token}" for token in tokenize(recipe_fields(recipe)["title"], unigrams=False))
+    return features
+
+def jaccard(a, b):
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+def minhash_signatures(feature_sets, num_permutations=NUM_PERMUTATIONS, seed=MINHASH_SEED):
+    """
+    (recipes x num_permutations) uint64 array of MinHash signatures. Each permutation is a
+    multiply-shift hash of the feature's CRC32; rows of empty feature sets are all ones and never match.
+    """
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(0, 1 << 64, num_permutations, dtype=np.uint64, endpoint=False) | np.uint64(1)
+    increments = rng.integers(0, 1 << 64, num_permutations, dtype=np.uint64, endpoint=False)
+    signatures = np.full((len(feature_sets), num_permutations), np.iinfo(np.uint64).max, dtype=np.uint64)
+    shift = np.uint64(32)
+
+    def flush(recipe_ids, hashes, starts):
+        values = (multipliers[:, None] * np.array(hashes, dtype=np.uint64)[None, :] + increments[:, None]) >> shift
+        signatures[recipe_ids] = np.minimum.reduceat(values, starts, axis=1).T
+
+    recipe_ids, hashes, starts = [], [], []
+    for recipe_id, features in enumerate(feature_sets):
+        if not features:
+            continue
+        recipe_ids.append(recipe_id)
+        starts.append(len(hashes))
+        hashes.extend(zlib.crc32(feature.encode('utf-8')) for feature in features)
+        if len(hashes) * num_permutations >= SIGNATURE_CHUNK_VALUES:
+            flush(recipe_ids, hashes, starts)
+            recipe_ids, hashes, starts = [], [], []
+    if recipe_ids:
+        flush(recipe_ids, hashes, starts)
+    return signatures
+
+def lsh_candidates(signatures, has_features, bands=LSH_BANDS):
+    """
+    Per recipe, a Counter of the other recipes whose signatures agree on all rows of at least one band:
+    recipe id -> number of such bands, which grows with their similarity.
+    """
+    candidates = [Counter() for _ in range(len(signatures))]
+    ids = np.flatnonzero(has_features)
+    if len(ids) < 2:
+        return candidates
+    rows = signatures.shape[1] // bands
+    for band in range(bands):
+        block = signatures[ids, band * rows:(band + 1) * rows]
+        _, bucket_of = np.unique(block, axis=0, return_inverse=True)
+        order = np.argsort(bucket_of.ravel(), kind='stable')
+        sorted_buckets = bucket_of.ravel()[order]
+        boundaries = np.flatnonzero(np.diff(sorted_buckets)) + 1
+        for members in np.split(ids[order], boundaries):
+            if 2 <= len(members) <= MAX_BUCKET_SIZE:
+                members = members.tolist()
+                for recipe_id in members:
+                    candidates[recipe_id].update(members)
+    for recipe_id, recipe_candidates in enumerate(candidates):
+        recipe_candidates.pop(recipe_id, None)
+    return candidates
+
+
+class RelatedIndex:
+    """
+    The most similar recipes of every recipe, computed ahead of time.
+
+    Comparing every pair is quadratic in the corpus size, so candidates come from MinHash signatures
+    bucketed with locality-sensitive hashing (LSH): only recipes sharing a bucket are compared, by the
+    exact Jaccard similarity of their feature sets. A page then looks its neighbors up by recipe id.
+    """
+
+    def __init__(self, neighbors):
+        self.neighbors = neighbors # recipe id -> [(recipe id, similarity)], most similar first
+
+    @classmethod
+    def build(cls, recipes, count=RELATED_COUNT):
+        feature_sets = [recipe_features(recipe) for recipe in recipes]
+        signatures = minhash_signatures(feature_sets)
+        candidates = lsh_candidates(signatures, np.array([bool(features) for features in feature_sets], dtype=bool))
+        neighbors = []
+        for recipe_id, features in enumerate(feature_sets):
+            scored = ((jaccard(features, feature_sets[other]), other)
+                      for other, _ in candidates[recipe_id].most_common(MAX_CANDIDATES))
+            # Ties go to the lower recipe id so results are stable
+            best = heapq.nlargest(count, ((score, -other) for score, other in scored if score >= MIN_SIMILARITY))
+            neighbors.append([(-neg_other, round(score, 4)) for score, neg_other in best])
+        return cls(neighbors)
+
+    @classmethod
+    def build_exact(cls, recipes, count=RELATED_COUNT):
+        """Neighbors from comparing every pair, for checking the recall of build()."""
+        feature_sets = [recipe_features(recipe) for recipe in recipes]
+        neighbors = []
+        for recipe_id, features in enumerate(feature_sets):
+            scored = ((jaccard(features, other_features), other)
+                      for other, other_features in enumerate(feature_sets) if other != recipe_id)
+            best = heapq.nlargest(count, ((score, -other) for score, other in scored if score >= MIN_SIMILARITY))
+            neighbors.append([(-neg_other, round(score, 4)) for score, neg_other in best])
+        return cls(neighbors)
+
+    def related(self, recipe_id):
+        """[(recipe id, Jaccard similarity)] of the recipe's neighbors, most similar first."""
+        if 0 <= recipe_id < len(self.neighbors):
+            return self.neighbors[recipe_id]
+        return []
+
+    def recall(self, exact):
+        """
+        Share of the exact index's neighbors found, counting a neighbor as found when one at least as
+        similar was returned in its place (ties between equally similar recipes are arbitrary).
+        """
+        found = total = 0
+        for recipe_id, expected in enumerate(exact.neighbors):
+            if not expected:
+                continue
+            cutoff = expected[-1][1]
+            found += min(len(expected), sum(1 for _, score in self.related(recipe_id) if score >= cutoff))
+            total += len(expected)
+        return found / total if total else 1.0
+
+    def save(self, path, recipes_digest):
+        """Writes the neighbors next to recipes.json, tagged with the digest of the recipes they were built from."""
+        data = {
+            "version": RELATED_INDEX_VERSION,
+            "recipes_digest": recipes_digest,
+            "neighbors": self.neighbors,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, recipes_digest):
+        """Loads saved neighbors, or returns None if they are missing or were built from other recipes."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        if data.get("version") != RELATED_INDEX_VERSION or data.get("recipes_digest") != recipes_digest:
+            return None
+        return cls([[(recipe_id, score) for recipe_id, score in neighbors] for neighbors in data["neighbors"]])
@@ -0,0 +1,70 @@
+import os
+import threading
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+def scan_markdown_tree(root):
+    """Returns {path relative to root: (mtime_ns, size)} for every .md file under root."""
+    state = {}
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(entry.path)
+            elif entry.name.endswith('.md'):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue # Deleted while scanning
+                state[os.path.relpath(entry.path, root)] = (st.st_mtime_ns, st.st_size)
+    return state
+
+def diff_trees(old, new):
+    """Returns (added, modified, removed) relative paths between two scan_markdown_tree results."""
+    added = sorted(set(new) - set(old))
+    removed = sorted(set(old) - set(new))
+    modified = sorted(path for path in set(old) & set(new) if old[path] != new[path])
+    return added, modified, removed
+
+
+class RecipeWatcher(threading.Thread):
+    """
+    Polls a directory tree for added, modified or removed Markdown files and calls
+    on_change(added, modified, removed) from this (daemon) thread. Polling needs no extra
+    dependency and a stat() per file every few seconds is negligible at this corpus size.
+    """
+
+    def __init__(self, root, on_change, interval=DEFAULT_POLL_INTERVAL):
+        super().__init__(name="recipe-watcher", daemon=True)
+        self.root = root
+        self.on_change = on_change
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._state = scan_markdown_tree(root)
+
+    def check(self):
+        """Scans once; calls on_change and returns True if anything changed since the last scan."""
+        new_state = scan_markdown_tree(self.root)
+        added, modified, removed = diff_trees(self._state, new_state)
+        if not (added or modified or removed):
+            return False
+        self._state = new_state
+        self.on_change(added, modified, removed)
+        return True
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # Keep watching, the next change may well parse fine
+                print(f"ERROR: reloading recipes failed: {e}")
+
+    def stop(self):
+        self._stop_event.set()
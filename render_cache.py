@@ -0,0 +1,79 @@
+import gzip
+import hashlib
+import threading
+
+try:
+    import brotli
+except ImportError: # Optional, pages are still served gzip-compressed without it
+    brotli = None
+
+GZIP_LEVEL = 9
+# Pages are compressed on first request, so stay below brotli's slowest levels
+BROTLI_QUALITY = 9
+
+
+class CachedPage:
+    """A rendered page kept as bytes, with its compressed variants and strong ETags precomputed."""
+
+    def __init__(self, body, mimetype='text/html'):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        # encoding -> (bytes, etag); every representation gets its own strong ETag
+        self.variants = {None: (body, self.etag)}
+        # mtime=0 keeps the gzip bytes (and so the ETag) identical across processes
+        self.variants['gzip'] = (gzip.compress(body, GZIP_LEVEL, mtime=0), f"{self.etag}-gz")
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(body, quality=BROTLI_QUALITY), f"{self.etag}-br")
+
+    @property
+    def body(self):
+        return self.variants[None][0]
+
+    def negotiate(self, accept_encodings):
+        """Picks the best variant for a werkzeug Accept-Encoding header: returns (encoding, bytes, etag)."""
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accept_encodings[encoding] > 0:
+                return (encoding,) + self.variants[encoding]
+        return (None,) + self.variants[None]
+
+
+class RenderCache:
+    """
+    Rendered pages of one data version, keyed by page (e.g. ("recipe", 3)).
+    Each page is rendered at most once; concurrent first requests for a page wait for one render,
+    while requests for other pages go ahead (the render and compression hold only that page's lock).
+    """
+
+    def __init__(self):
+        self._pages = {}
+        self._building = {} # key -> lock held while that page is rendered
+        self._lock = threading.Lock() # Guards _building only
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render, mimetype='text/html'):
+        """Returns the CachedPage for key, calling render() to produce its body on first use."""
+        page = self._pages.get(key)
+        if page is not None:
+            self.hits += 1
+            return page
+        with self._lock:
+            page_lock = self._building.setdefault(key, threading.Lock())
+        with page_lock:
+            page = self._pages.get(key)
+            if page is None:
+                self.misses += 1
+                try:
+                    page = self._pages[key] = CachedPage(render(), mimetype)
+                finally:
+                    # Also when render() raises, so failing keys do not pile up
+                    with self._lock:
+                        self._building.pop(key, None)
+            else:
+                self.hits += 1
+        return page
+
+    def __len__(self):
+        return len(self._pages)
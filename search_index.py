@@ -0,0 +1,132 @@
+import heapq
+import json
+import math
+import os
+import re
+from collections import defaultdict
+
+SEARCH_INDEX_VERSION = 1
+
+# Runs of CJK ideographs, or ASCII words/numbers
+TOKEN_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]+|[A-Za-z0-9]+')
+# How much a token occurrence counts in each field (BM25F-style field weighting)
+FIELD_WEIGHTS = {"title": 3.0, "ingredients": 2.0, "description": 1.0, "instructions": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Every title ends with this, indexing it would only add a posting to every recipe
+TITLE_SUFFIX = "的做法"
+
+
+def tokenize(text, unigrams=True):
+    """
+    Splits text into search tokens: lowercased ASCII words and, for Chinese, overlapping
+    character bigrams. With `unigrams`, single CJK characters are emitted as well so that
+    one-character queries (e.g. "鱼") can match; queries only use them for one-character runs.
+    """
+    tokens = []
+    for run in TOKEN_RE.findall(text or ""):
+        if run.isascii():
+            tokens.append(run.lower())
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            if unigrams:
+                tokens.extend(run)
+    return tokens
+
+def recipe_fields(recipe):
+    """Returns {field: text} for the searchable fields of a recipe dict."""
+    title = recipe.get("title") or ""
+    if title.endswith(TITLE_SUFFIX):
+        title = title[:-len(TITLE_SUFFIX)]
+    return {
+        "title": title,
+        "description": recipe.get("description") or "",
+        "ingredients": "\n".join(recipe.get("ingredients") or []),
+        "instructions": "\n".join(recipe.get("instructions") or []),
+    }
+
+
+class SearchIndex:
+    """
+    Inverted index over recipe titles, descriptions, ingredients and instructions.
+    Each posting stores the precomputed BM25 score of its token for that recipe, so a query only
+    has to add up the postings of its own tokens.
+    """
+
+    def __init__(self, postings, doc_count):
+        # token -> (recipe ids, scores), both in ascending recipe id order
+        self.postings = postings
+        self.doc_count = doc_count
+
+    @classmethod
+    def build(cls, recipes):
+        term_frequencies = [] # per recipe: {token: weighted frequency}
+        doc_lengths = []
+        for recipe in recipes:
+            frequencies = defaultdict(float)
+            for field, text in recipe_fields(recipe).items():
+                weight = FIELD_WEIGHTS[field]
+                for token in tokenize(text):
+                    frequencies[token] += weight
+            term_frequencies.append(frequencies)
+            doc_lengths.append(sum(frequencies.values()))
+
+        doc_count = len(recipes)
+        average_length = (sum(doc_lengths) / doc_count if doc_count else 0.0) or 1.0
+        document_frequency = defaultdict(int)
+        for frequencies in term_frequencies:
+            for token in frequencies:
+                document_frequency[token] += 1
+
+        postings = defaultdict(lambda: ([], []))
+        for recipe_id, frequencies in enumerate(term_frequencies):
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[recipe_id] / average_length)
+            for token, frequency in frequencies.items():
+                df = document_frequency[token]
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                score = idf * frequency * (BM25_K1 + 1) / (frequency + length_norm)
+                recipe_ids, scores = postings[token]
+                recipe_ids.append(recipe_id)
+                scores.append(round(score, 4))
+        return cls(dict(postings), doc_count)
+
+    def search(self, query, limit=20):
+        """Returns [(recipe id, score)] for the best `limit` matches, highest score first."""
+        scores = defaultdict(float)
+        for token in set(tokenize(query, unigrams=False)):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            for recipe_id, score in zip(*posting):
+                scores[recipe_id] += score
+        # Ties go to the lower recipe id so results are stable
+        best = heapq.nsmallest(limit, ((-score, recipe_id) for recipe_id, score in scores.items()))
+        return [(recipe_id, round(-neg_score, 4)) for neg_score, recipe_id in best]
+
+    def save(self, path, recipes_digest):
+        """Writes the index next to recipes.json, tagged with the digest of the recipes it was built from."""
+        data = {
+            "version": SEARCH_INDEX_VERSION,
+            "recipes_digest": recipes_digest,
+            "doc_count": self.doc_count,
+            "postings": {token: [recipe_ids, scores] for token, (recipe_ids, scores) in self.postings.items()},
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, recipes_digest):
+        """Loads a saved index, or returns None if it is missing or was built from other recipes."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        if data.get("version") != SEARCH_INDEX_VERSION or data.get("recipes_digest") != recipes_digest:
+            return None
+        postings = {token: (recipe_ids, scores) for token, (recipe_ids, scores) in data["postings"].items()}
+        return cls(postings, data["doc_count"])
@@ -0,0 +1,125 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Leaves out the per-request access log line (errors are still logged)."""
+
+    def log_request(self, code="-", size="-"):
+        pass
+
+
+def open_listener(host, port, backlog=1024):
+    """The listening socket every worker accepts on; the kernel hands each connection to one of them."""
+    listener = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    listener.set_inheritable(True)
+    return listener
+
+def load_application(warm):
+    """Imports the app (loading the recipes) and, with `warm`, builds every derived structure now."""
+    import app as application
+    if warm:
+        application.current_version().warm()
+    return application
+
+def run_worker(listener, host, port, application, watch, access_log):
+    """Worker process body: serves requests on the inherited socket until terminated."""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if application is None:
+        application = load_application(warm=False)
+    if watch:
+        # Threads do not survive fork(), so every worker runs its own watcher
+        application.start_watcher()
+    server = make_server(host, port, application.app, fd=listener.fileno(),
+                         request_handler=None if access_log else QuietRequestHandler)
+    server.serve_forever()
+
+def spawn_worker(listener, host, port, application, watch, access_log):
+    pid = os.fork()
+    if pid == 0:
+        # The child never returns into the master's code, whatever happens
+        try:
+            run_worker(listener, host, port, application, watch, access_log)
+        except SystemExit as e:
+            os._exit(e.code if isinstance(e.code, int) else 0)
+        except BaseException:
+            traceback.print_exc()
+            os._exit(1)
+        os._exit(0)
+    return pid
+
+def serve(host="127.0.0.1", port=8000, workers=2, preload=True, watch=False, access_log=False):
+    """
+    Pre-forking server. With `preload` the master process loads the recipes (memory-mapped from
+    recipes.snapshot when present) and builds every index before forking, then freezes the garbage
+    collector's view of those objects (gc.freeze), so the workers share them copy-on-write instead
+    of each building a private copy. Without `preload` each worker loads the app itself.
+    Crashed workers are replaced; SIGTERM/SIGINT stop them all.
+    """
+    listener = open_listener(host, port)
+    application = None
+    if preload:
+        start = time.perf_counter()
+        application = load_application(warm=True)
+        print(f"Loaded {len(application.recipes_data)} recipes and their indexes in "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms", file=sys.stderr)
+        # Moves everything allocated so far to a permanent generation: collections in the workers
+        # no longer write to these objects' headers, which would copy their pages into each worker
+        gc.freeze()
+
+    children = {spawn_worker(listener, host, port, application, watch, access_log) for _ in range(workers)}
+    print(f"Serving on http://{host}:{port} with {workers} worker processes "
+          f"({'preloaded' if preload else 'each loading its own copy'})", file=sys.stderr)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}, starting a new one", file=sys.stderr)
+            children.add(spawn_worker(listener, host, port, application, watch, access_log))
+    listener.close()
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Serve the recipe app with several worker processes "
+                                                     "sharing one loaded copy of the recipes and indexes")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8000)
+    arg_parser.add_argument("-w", "--workers", type=int, default=0,
+                            help="Number of worker processes, 0 for one per CPU (default: 0)")
+    arg_parser.add_argument("--no-preload", action="store_true",
+                            help="Load the app in every worker instead of once before forking")
+    arg_parser.add_argument("--watch", action="store_true",
+                            help="Reload the recipes in every worker when files under dishes/ change")
+    arg_parser.add_argument("--access-log", action="store_true", help="Log every request")
+    args = arg_parser.parse_args()
+    # The master must not start a watcher thread when it imports the app, the workers start their own
+    watch = args.watch or bool(os.environ.pop('RECIPES_WATCH', None))
+    serve(args.host, args.port, args.workers or os.cpu_count() or 1, preload=not args.no_preload,
+          watch=watch, access_log=args.access_log)
@@ -0,0 +1,177 @@
+import json
+import mmap
+import os
+import struct
+from collections.abc import Mapping, Sequence
+from recipe_model import Recipe, json_default
+
+# Layout of a snapshot file (all integers little-endian):
+#   magic (8 bytes) | header length (uint32) | header JSON
+#   record offset table: count + 1 uint64, relative to the start of the body
+#   body: one record per recipe
+# A record is: field count (uint8), then per field its key index (uint8, into header["keys"]) and
+# value length (uint32), then the values themselves, each one compact UTF-8 JSON.
+SNAPSHOT_MAGIC = b"RCPSNAP1"
+SNAPSHOT_VERSION = 1
+_HEADER_LENGTH = struct.Struct("<I")
+_FIELD_COUNT = struct.Struct("<B")
+_FIELD_ENTRY = struct.Struct("<BI")
+
+
+def write_snapshot(path, recipes, recipes_digest=None):
+    """Writes recipes (a list of dicts or Recipes) to a snapshot file, atomically."""
+    keys = []
+    key_index = {}
+    records = []
+    for recipe in recipes:
+        directory = [_FIELD_COUNT.pack(len(recipe))]
+        values = []
+        for key, value in recipe.items():
+            if key not in key_index:
+                key_index[key] = len(keys)
+                keys.append(key)
+            encoded = json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=json_default).encode('utf-8')
+            directory.append(_FIELD_ENTRY.pack(key_index[key], len(encoded)))
+            values.append(encoded)
+        records.append(b"".join(directory + values))
+
+    header = json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "count": len(records),
+        "keys": keys,
+        "recipes_digest": recipes_digest,
+    }, ensure_ascii=False).encode('utf-8')
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        for record in records:
+            f.write(record)
+    os.replace(tmp_path, path)
+
+
+class LazyRecipe(Mapping):
+    """
+    One recipe of a snapshot, read-only. Nothing is decoded until a field is accessed, and then
+    only that field. Behaves like the recipe dict (r['title'], r.get(...), r.copy(), templates) and,
+    like Recipe, has its fields as attributes (r.title): once decoded, a field is a slot read.
+    """
+
+    __slots__ = ('_snapshot', '_start', '_fields', '_values') + Recipe.FIELDS
+
+    def __init__(self, snapshot, start):
+        self._snapshot = snapshot
+        self._start = start
+        self._fields = None # key -> (value offset, value length), in record order
+        self._values = {}
+
+    def _directory(self):
+        if self._fields is None:
+            buffer = self._snapshot.buffer
+            keys = self._snapshot.keys
+            (count,) = _FIELD_COUNT.unpack_from(buffer, self._start)
+            position = self._start + _FIELD_COUNT.size
+            value_offset = position + count * _FIELD_ENTRY.size
+            fields = {}
+            for key_id, length in _FIELD_ENTRY.iter_unpack(buffer[position:value_offset]):
+                fields[keys[key_id]] = (value_offset, length)
+                value_offset += length
+            self._fields = fields
+        return self._fields
+
+    def raw(self, key):
+        """The field's JSON encoding, as stored in the snapshot (bytes)."""
+        offset, length = self._directory()[key]
+        return self._snapshot.buffer[offset:offset + length]
+
+    def __getattr__(self, name):
+        # Only called while the field's slot is empty: decode it, then keep it in the slot
+        if name not in Recipe._FIELD_SET:
+            raise AttributeError(name)
+        try:
+            value = self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        setattr(self, name, value)
+        return value
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        value = self._values[key] = json.loads(self.raw(key))
+        return value
+
+    def get(self, key, default=None):
+        # Mapping.get goes through __getitem__ and a KeyError; decoded fields are one dict lookup
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        return self[key] if key in self._directory() else default
+
+    def __iter__(self):
+        return iter(self._directory())
+
+    def __len__(self):
+        return len(self._directory())
+
+    def __contains__(self, key):
+        return key in self._directory()
+
+    def copy(self):
+        return dict(self)
+
+    def __repr__(self):
+        return f"LazyRecipe({dict(self)!r})"
+
+
+class RecipeSnapshot(Sequence):
+    """
+    A snapshot file mapped into memory. Indexing returns LazyRecipe objects, created on first use.
+    Opening it only reads the header and the offset table, however large the corpus is.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            # The mapping stays valid after the file is closed, and is shared by every process mapping it
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buffer[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a recipe snapshot")
+        position = len(SNAPSHOT_MAGIC)
+        (header_length,) = _HEADER_LENGTH.unpack_from(self.buffer, position)
+        position += _HEADER_LENGTH.size
+        header = json.loads(self.buffer[position:position + header_length])
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} has unsupported snapshot version {header.get('version')}")
+        position += header_length
+
+        self.path = path
+        self.keys = header["keys"]
+        self.recipes_digest = header.get("recipes_digest")
+        self._count = header["count"]
+        self._offsets = memoryview(self.buffer)[position:position + (self._count + 1) * 8].cast('Q')
+        self._body_start = position + (self._count + 1) * 8
+        self._recipes = [None] * self._count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("recipe index out of range")
+        recipe = self._recipes[index]
+        if recipe is None:
+            recipe = self._recipes[index] = LazyRecipe(self, self._body_start + self._offsets[index])
+        return recipe
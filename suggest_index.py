@@ -0,0 +1,88 @@
+import bisect
+import heapq
+from collections import Counter
+from ingredient_index import required_ingredients
+from search_index import TITLE_SUFFIX
+
+SUGGEST_COUNT = 10 # Completions kept per prefix, the most a request can ask for
+# Prefixes matching more entries than this get their completions precomputed, the others scan their range
+SCAN_LIMIT = 256
+# Sorts after every character, so [prefix, prefix + PREFIX_END) holds exactly the keys starting with prefix
+PREFIX_END = "\U0010ffff"
+
+
+def suggestion_key(text):
+    """What prefixes are matched against: case-insensitive for Latin letters, Chinese as is."""
+    return text.casefold()
+
+
+class SuggestIndex:
+    """
+    Completions of a typed prefix, over recipe titles (without the trailing "的做法") and ingredient names.
+
+    Entries are sorted by key, so the entries starting with a prefix are one contiguous range found
+    by binary search. Every entry has a rank (ingredients used by more recipes first, then shorter
+    text); a prefix's completions are the best ranks of its range. Short ranges are scanned on each
+    request, and the few prefixes with long ranges ("鸡", "红") have theirs precomputed, so a lookup
+    costs two bisections plus at most SCAN_LIMIT integers.
+    """
+
+    def __init__(self, keys, ranks, suggestions, top):
+        self.keys = keys # sorted suggestion keys
+        self.ranks = ranks # rank of the entry at the same position
+        self.suggestions = suggestions # rank -> suggestion dict, as served
+        self.top = top # prefix -> best ranks, for prefixes matching more than SCAN_LIMIT entries
+
+    @classmethod
+    def build(cls, recipes, count=SUGGEST_COUNT):
+        entries = [] # (text, kind, recipe id or number of recipes)
+        usage = Counter()
+        for recipe_id, recipe in enumerate(recipes):
+            title = (recipe.get('title') or "").strip()
+            if title.endswith(TITLE_SUFFIX):
+                title = title[:-len(TITLE_SUFFIX)].strip()
+            if title:
+                entries.append((title, "recipe", recipe_id))
+            usage.update(required_ingredients(recipe.get('ingredients')))
+        entries.extend((name, "ingredient", recipes_using) for name, recipes_using in usage.items())
+
+        # A title leads to one recipe, an ingredient to every recipe using it
+        def rank_key(entry):
+            text, kind, value = entry
+            weight = value if kind == "ingredient" else 1
+            return (-weight, len(text), kind != "recipe", text, value)
+
+        entries.sort(key=rank_key)
+        suggestions = []
+        for text, kind, value in entries:
+            if kind == "recipe":
+                suggestions.append({"text": text, "type": kind, "id": value})
+            else:
+                suggestions.append({"text": text, "type": kind, "recipes": value})
+        by_key = sorted((suggestion_key(text), rank) for rank, (text, _, _) in enumerate(entries))
+        keys = [key for key, _ in by_key]
+        ranks = [rank for _, rank in by_key]
+
+        # Only prefixes of long ranges are extended by one more character, so this visits few of them
+        top = {}
+        pending = list({key[:1] for key in keys})
+        while pending:
+            prefix = pending.pop()
+            start = bisect.bisect_left(keys, prefix)
+            end = bisect.bisect_left(keys, prefix + PREFIX_END, start)
+            if end - start > SCAN_LIMIT:
+                top[prefix] = heapq.nsmallest(count, ranks[start:end])
+                pending.extend({key[:len(prefix) + 1] for key in keys[start:end] if len(key) > len(prefix)})
+        return cls(keys, ranks, suggestions, top)
+
+    def suggest(self, prefix, limit=SUGGEST_COUNT):
+        """The best `limit` suggestions for a prefix, as [{"text", "type", "id" or "recipes"}]."""
+        key = suggestion_key(prefix.strip())
+        if not key:
+            return []
+        best = self.top.get(key)
+        if best is None:
+            start = bisect.bisect_left(self.keys, key)
+            end = bisect.bisect_left(self.keys, key + PREFIX_END, start)
+            best = heapq.nsmallest(limit, self.ranks[start:end])
+        return [self.suggestions[rank] for rank in best[:limit]]
@@ -1,11 +1,17 @@
 import unittest
 import os
 import json
+import hashlib
+import gzip
+import io
 import shutil
 import tempfile
 from pathlib import Path
 from app import app # Import the Flask app instance from your app.py
 
+# What the media manifest hashes the dummy image to
+DUMMY_IMAGE_HASH = hashlib.sha256(b"dummy jpeg data").hexdigest()[:16]
+
 class TestApp(unittest.TestCase):
 
     def setUp(self):
@@ -26,6 +32,7 @@ class TestApp(unittest.TestCase):
                 "difficulty": "Easy",
                 "ingredients": ["Ing1", "Ing2"],
                 "calculations": {"Time": "30 mins"},
+                "quantities": [{"ingredient": "Ing1", "amount": 100.0, "min": 100.0, "max": 100.0, "unit": "g"}],
                 "instructions": ["Step1", "Step2"],
                 "image_paths": ["image1.jpg"], # Path relative to the MD file itself
                 "category": "cat1",
@@ -37,6 +44,7 @@ class TestApp(unittest.TestCase):
                 "difficulty": "Medium",
                 "ingredients": ["Ing3", "Ing4"],
                 "calculations": {},
+                "quantities": [{"ingredient": "Ing1", "amount": 15.0, "min": 10.0, "max": 20.0, "unit": "g"}],
                 "instructions": ["Step3", "Step4"],
                 "image_paths": [],
                 "category": "cat2",
@@ -64,6 +72,8 @@ class TestApp(unittest.TestCase):
         import app as current_app_module
         self.original_dishes_directory = current_app_module.DISHES_DIRECTORY
         current_app_module.DISHES_DIRECTORY = str(self.mock_dishes_dir)
+        self.original_image_cache_directory = current_app_module.IMAGE_CACHE_DIRECTORY
+        current_app_module.IMAGE_CACHE_DIRECTORY = str(Path(self.test_dir) / "image_cache")
 
 
     def tearDown(self):
@@ -71,6 +81,7 @@ class TestApp(unittest.TestCase):
         # Restore original DISHES_DIRECTORY and recipes_data in the app module
         import app as current_app_module
         current_app_module.DISHES_DIRECTORY = self.original_dishes_directory
+        current_app_module.IMAGE_CACHE_DIRECTORY = self.original_image_cache_directory
         current_app_module.recipes_data = self.original_recipes_data
 
 
@@ -81,12 +92,46 @@ class TestApp(unittest.TestCase):
         self.assertIn(b"Test Recipe 1", response.data)
         self.assertIn(b"Test Recipe 2", response.data)
 
+    def test_index_filters_and_pages(self):
+        import app as current_app_module
+        original_page_size = current_app_module.INDEX_PAGE_SIZE
+        current_app_module.INDEX_PAGE_SIZE = 1
+        try:
+            response = self.client.get('/')
+            self.assertIn(b"Test Recipe 1", response.data)
+            self.assertNotIn(b"Test Recipe 2", response.data)
+            self.assertIn(b"Page 1 of 2", response.data)
+            self.assertIn(b'href="/index?page=2"', response.data)
+
+            response = self.client.get('/?page=2')
+            self.assertIn(b'href="/recipe/1">Test Recipe 2', response.data)
+
+            response = self.client.get('/?category=cat2')
+            self.assertIn(b"Test Recipe 2", response.data)
+            self.assertNotIn(b"Test Recipe 1", response.data)
+            self.assertIn(b"cat1 (1)", response.data)
+
+            self.assertEqual(self.client.get('/?category=nope').status_code, 404)
+            self.assertEqual(self.client.get('/?difficulty=5').status_code, 404)
+            self.assertEqual(self.client.get('/?page=3').status_code, 404)
+            for query in ('difficulty=abc', 'page=x', 'page=', 'page=01', 'page=+1', 'difficulty=%201'):
+                self.assertEqual(self.client.get(f'/?{query}').status_code, 404, query)
+        finally:
+            current_app_module.INDEX_PAGE_SIZE = original_page_size
+
     def test_recipe_detail_route_valid(self):
         response = self.client.get('/recipe/0') # First recipe
         self.assertEqual(response.status_code, 200)
         self.assertIn(b"Test Recipe 1", response.data)
         self.assertIn(b"Ing1", response.data)
-        self.assertIn(b'src="/images/cat1/recipe1/image1.jpg"', response.data)
+        # Linked under the image's content hash, see test_serve_versioned_image
+        self.assertIn(f'src="/media/{DUMMY_IMAGE_HASH}/cat1/recipe1/image1.jpg"'.encode(), response.data)
+
+    def test_recipe_detail_related_recipes(self):
+        # The two recipes share the "test" and "recipe" title words
+        response = self.client.get('/recipe/0')
+        self.assertIn(b"Related recipes", response.data)
+        self.assertIn(b'<a href="/recipe/1">Test Recipe 2</a>', response.data)
 
     def test_recipe_detail_route_invalid(self):
         response = self.client.get('/recipe/99') # Out of bounds
@@ -112,5 +157,277 @@ class TestApp(unittest.TestCase):
         self.assertIn(b"Test Recipe 2", response.data)
         self.assertNotIn(b"<img src", response.data)
 
+    def test_shopping_list_route(self):
+        response = self.client.get('/shopping-list?recipes=0:2,1&servings=3')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["recipes"], [{"id": 0, "servings": 2.0}, {"id": 1, "servings": 3.0}])
+        self.assertEqual(data["items"], [{"ingredient": "Ing1", "amount": 245.0, "min": 230.0, "max": 260.0, "unit": "g"}])
+
+    def test_shopping_list_route_invalid(self):
+        self.assertEqual(self.client.get('/shopping-list').status_code, 400)
+        self.assertEqual(self.client.get('/shopping-list?recipes=abc').status_code, 400)
+        self.assertEqual(self.client.get('/shopping-list?recipes=99').status_code, 404)
+        for query in ('recipes=0&servings=nan', 'recipes=0:nan', 'recipes=1:inf', 'recipes=0:-inf', 'recipes=0:1e308,0:1e308'):
+            self.assertEqual(self.client.get(f'/shopping-list?{query}').status_code, 400, query)
+
+    def test_search_route(self):
+        response = self.client.get('/search?q=Ing3')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual([result["id"] for result in data["results"]], [1])
+        self.assertEqual(data["results"][0]["title"], "Test Recipe 2")
+        self.assertEqual(self.client.get('/search?q=').get_json()["results"], [])
+        self.assertEqual(self.client.get('/search?q=x&limit=abc').status_code, 400)
+
+    def test_guide_pages_and_backlinks(self):
+        import app as current_app_module
+        content = ("# Guide\n\n| a | b |\n|---|---|\n| 1 | 2 |\n\n"
+                   "[Recipe 1](../dishes/cat1/recipe1/recipe1.md) [gone](../nope.md) [web](https://example.com)\n")
+        original = current_app_module.pages_data, current_app_module.document_links
+        current_app_module.pages_data = [{"title": "Guide", "source_file": "tips/guide.md", "content": content}]
+        current_app_module.document_links = {
+            "tips/guide.md": ["../dishes/cat1/recipe1/recipe1.md", "../nope.md", "https://example.com"],
+            "dishes/cat2/recipe2/recipe2.md": ["../../../tips/guide.md"],
+        }
+        try:
+            response = self.client.get('/page/0')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'<a href="/recipe/0">Recipe 1</a>', response.data) # Rewritten to the app's URL
+            self.assertIn(b'<a href="../nope.md">gone</a>', response.data) # Dangling, left as written
+            self.assertIn(b'<a href="https://example.com">web</a>', response.data)
+            self.assertIn(b'<table>', response.data)
+            self.assertIn(b'<a href="/recipe/1">Test Recipe 2</a>', response.data) # Linked from
+            self.assertEqual(self.client.get('/page/1').status_code, 404)
+            self.assertIn(b'<a href="/page/0">Guide</a>', self.client.get('/pages').data)
+            recipe_page = self.client.get('/recipe/0').data
+            self.assertIn(b"Linked from", recipe_page)
+            self.assertIn(b'<a href="/page/0">Guide</a>', recipe_page)
+        finally:
+            current_app_module.pages_data, current_app_module.document_links = original
+
+    def test_suggest_route(self):
+        response = self.client.get('/suggest?prefix=test')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {"prefix": "test", "suggestions": [
+            {"text": "Test Recipe 1", "type": "recipe", "id": 0},
+            {"text": "Test Recipe 2", "type": "recipe", "id": 1},
+        ]})
+        suggestions = self.client.get('/suggest?prefix=Ing&limit=2').get_json()["suggestions"]
+        self.assertEqual([suggestion["text"] for suggestion in suggestions], ["Ing1", "Ing2"])
+        self.assertEqual(self.client.get('/suggest?prefix=').get_json()["suggestions"], [])
+        self.assertEqual(self.client.get('/suggest?prefix=x&limit=abc').status_code, 400)
+
+    def test_cook_with_route(self):
+        response = self.client.get('/cook-with?have=Ing1,Ing2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["results"], [{"id": 0, "title": "Test Recipe 1", "missing": []}])
+        results = self.client.get('/cook-with?have=Ing1,Ing3&missing=1').get_json()["results"]
+        self.assertEqual(results, [
+            {"id": 0, "title": "Test Recipe 1", "missing": ["Ing2"]},
+            {"id": 1, "title": "Test Recipe 2", "missing": ["Ing4"]},
+        ])
+        self.assertEqual(self.client.get('/cook-with').status_code, 400)
+        self.assertEqual(self.client.get('/cook-with?have=Ing1&missing=x').status_code, 400)
+
+    def test_pages_are_cached_with_etags(self):
+        first = self.client.get('/recipe/0')
+        etag = first.headers['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Accept-Encoding', first.headers['Vary'])
+
+        not_modified = self.client.get('/recipe/0', headers={'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.data, b"")
+        self.assertEqual(not_modified.headers['ETag'], etag)
+
+        compressed = self.client.get('/recipe/0', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertNotEqual(compressed.headers['ETag'], etag)
+        self.assertEqual(gzip.decompress(compressed.data), first.data)
+
+        # A new recipe list is a new data version, pages are rendered again
+        import app as current_app_module
+        current_app_module.recipes_data = [dict(self.dummy_recipes[0], title="Renamed Recipe")]
+        changed = self.client.get('/recipe/0', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertIn(b"Renamed Recipe", changed.data)
+
+    def test_serve_image_derivative(self):
+        from image_cache import Image
+        if Image is None:
+            self.skipTest("Pillow is not installed")
+        Image.new("RGB", (1000, 500)).save(self.image_cat_dir / "photo.jpg", "JPEG")
+        response = self.client.get('/images/cat1/recipe1/photo.jpg?w=300&fmt=webp')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, 'image/webp')
+        with Image.open(io.BytesIO(response.data)) as image:
+            self.assertEqual(image.size, (320, 160)) # Width snapped to 320
+        response.close()
+        self.assertEqual(self.client.get('/images/cat1/recipe1/photo.jpg?fmt=tiff').status_code, 400)
+        self.assertEqual(self.client.get('/images/cat1/recipe1/missing.jpg?w=320').status_code, 404)
+        # Not a decodable image: the original is served
+        self.assertEqual(self.client.get('/images/cat1/recipe1/image1.jpg?w=320').data, b"dummy jpeg data")
+
+    def test_recipe_detail_srcset(self):
+        response = self.client.get('/recipe/0')
+        self.assertIn(f'/media/{DUMMY_IMAGE_HASH}/cat1/recipe1/image1.jpg?w=320&amp;fmt=webp 320w'.encode(), response.data)
+
+    def test_serve_versioned_image(self):
+        response = self.client.get(f'/media/{DUMMY_IMAGE_HASH}/cat1/recipe1/image1.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b"dummy jpeg data")
+        self.assertTrue(response.cache_control.immutable)
+        self.assertEqual(response.cache_control.max_age, 365 * 24 * 3600)
+        self.assertFalse(response.cache_control.no_cache)
+        response.close()
+        # A hash the file no longer has, or a file missing from the manifest: the plain URL, not cached for good
+        response = self.client.get('/media/0123456789abcdef/cat1/recipe1/image1.jpg?w=320')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.location, '/images/cat1/recipe1/image1.jpg?w=320')
+        self.assertEqual(self.client.get(f'/media/{DUMMY_IMAGE_HASH}/cat1/recipe1/other.jpg').status_code, 302)
+        # Query keys url_for reserves, and ones serve_image does not take, are not passed on
+        for query in ('filename=1', '_method=POST', '_anchor=x', '_external=1', 'w=320&w=640'):
+            response = self.client.get(f'/media/0123456789abcdef/cat1/recipe1/image1.jpg?{query}')
+            self.assertEqual(response.status_code, 302, query)
+            self.assertTrue(response.location.startswith('/images/cat1/recipe1/image1.jpg'), query)
+            self.assertNotIn('#', response.location)
+        self.assertEqual(self.client.get('/media/0123456789abcdef/cat1/recipe1/image1.jpg?w=320&w=640').location,
+                         '/images/cat1/recipe1/image1.jpg?w=320')
+
+    def test_versioned_image_changed_on_disk(self):
+        self.client.get('/recipe/0') # Builds the media manifest
+        with open(self.dummy_image_path, 'wb') as img_f:
+            img_f.write(b"edited jpeg data")
+        response = self.client.get(f'/media/{DUMMY_IMAGE_HASH}/cat1/recipe1/image1.jpg')
+        self.assertEqual(response.status_code, 302)
+
+    def test_reload_recipes_swaps_version(self):
+        import app as current_app_module
+        recipe_dir = self.mock_dishes_dir / "cat1" / "recipe1"
+        (recipe_dir / "recipe1.md").write_text("# Reloaded Recipe\n\nDesc\n\n## 必备原料和工具\n\n* 番茄\n",
+                                               encoding='utf-8')
+        original_cache_path = current_app_module.RELOAD_CACHE_PATH
+        current_app_module.RELOAD_CACHE_PATH = str(Path(self.test_dir) / "reload_cache.json")
+        try:
+            old_version = current_app_module.current_version()
+            stats = current_app_module.reload_recipes()
+            new_version = current_app_module.current_version()
+        finally:
+            current_app_module.RELOAD_CACHE_PATH = original_cache_path
+        self.assertEqual(stats["misses"], 1)
+        self.assertIsNot(new_version, old_version)
+        self.assertIs(current_app_module.recipes_data, new_version.recipes)
+        # Built before the swap, not by the first request
+        self.assertIn('search', new_version._derived)
+        response = self.client.get('/')
+        self.assertIn("Reloaded Recipe".encode('utf-8'), response.data)
+        self.assertNotIn(b"Test Recipe 2", response.data)
+
+    def test_persisted_indexes_load_on_first_use(self):
+        import app as current_app_module
+        from search_index import SearchIndex
+        saved = SearchIndex.build(self.dummy_recipes)
+        loads = []
+        version = current_app_module.DataVersion(self.dummy_recipes, persisted={
+            'search': lambda: loads.append('search') or saved,
+            'related': lambda: loads.append('related'), # Nothing saved: built instead
+        })
+        self.assertEqual(loads, []) # Nothing read until a request needs it
+        self.assertIs(version.derived('search'), saved)
+        self.assertIs(version.derived('search'), saved)
+        self.assertIsNotNone(version.derived('related'))
+        self.assertEqual(loads, ['search', 'related'])
+
+    def test_slow_derived_build_does_not_block_others(self):
+        import threading
+        import app as current_app_module
+        version = current_app_module.DataVersion(self.dummy_recipes)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_build(recipes):
+            started.set()
+            release.wait(5)
+            return "slow"
+
+        slow = threading.Thread(target=version.derived, args=('slow', slow_build))
+        slow.start()
+        self.assertTrue(started.wait(5))
+        other = threading.Thread(target=version.derived, args=('facets',))
+        other.start()
+        other.join(2)
+        self.assertFalse(other.is_alive()) # Built while 'slow' is still building
+        self.assertFalse(release.is_set())
+        release.set()
+        slow.join(5)
+        self.assertEqual(version.derived('slow'), "slow")
+
+    def test_ndjson_recipes(self):
+        import app as current_app_module
+        ndjson_path = Path(self.test_dir) / "recipes.ndjson"
+        lines = [json.dumps(recipe, ensure_ascii=False) + "\n" for recipe in self.dummy_recipes]
+        ndjson_path.write_text(lines[0] + "\n" + lines[1], encoding='utf-8')
+
+        # Consumed lazily, from str or bytes lines
+        recipes = current_app_module.iter_ndjson_recipes(iter(lines))
+        self.assertEqual(next(recipes)["title"], "Test Recipe 1")
+        with open(ndjson_path, 'rb') as f:
+            self.assertEqual(list(current_app_module.iter_ndjson_recipes(f)), self.dummy_recipes)
+
+        originals = (current_app_module.RECIPES_JSON_PATH, current_app_module.RECIPES_NDJSON_PATH,
+                     current_app_module.RECIPES_SNAPSHOT_PATH)
+        current_app_module.RECIPES_JSON_PATH = str(Path(self.test_dir) / "missing.json")
+        current_app_module.RECIPES_NDJSON_PATH = str(ndjson_path)
+        current_app_module.RECIPES_SNAPSHOT_PATH = ''
+        try:
+            recipes, digest = current_app_module.load_recipes()
+        finally:
+            (current_app_module.RECIPES_JSON_PATH, current_app_module.RECIPES_NDJSON_PATH,
+             current_app_module.RECIPES_SNAPSHOT_PATH) = originals
+        self.assertEqual(recipes, self.dummy_recipes)
+        self.assertEqual(digest, hashlib.sha256(ndjson_path.read_bytes()).hexdigest())
+
+    def test_api_recipes(self):
+        response = self.client.get('/api/recipes?per_page=1&page=2&fields=title,category')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(json.loads(response.data), {
+            "page": 2, "per_page": 1, "total": 2,
+            "recipes": [{"id": 1, "title": "Test Recipe 2", "category": "cat2"}],
+        })
+
+        response = self.client.get('/api/recipes/0')
+        self.assertEqual(json.loads(response.data), {"id": 0, **self.dummy_recipes[0]})
+        self.assertEqual(self.client.get('/api/recipes/0', headers={'If-None-Match': response.headers['ETag']}).status_code, 304)
+
+        response = self.client.get('/api/recipes?ids=1,0&fields=title')
+        self.assertEqual(json.loads(response.data), {"recipes": [{"id": 1, "title": "Test Recipe 2"},
+                                                                 {"id": 0, "title": "Test Recipe 1"}]})
+        response = self.client.get('/api/recipes?category=cat1&fields=title')
+        self.assertEqual(json.loads(response.data)["recipes"], [{"id": 0, "title": "Test Recipe 1"}])
+
+        self.assertEqual(self.client.get('/api/recipes/2').status_code, 404)
+        self.assertEqual(self.client.get('/api/recipes?ids=0,2').status_code, 404)
+        self.assertEqual(self.client.get('/api/recipes?ids=a').status_code, 400)
+        self.assertEqual(self.client.get('/api/recipes?fields=secret').status_code, 400)
+        self.assertEqual(self.client.get('/api/recipes?per_page=0').status_code, 400)
+
+    def test_metrics_endpoint(self):
+        self.client.get('/')
+        self.client.get('/')
+        self.client.get('/recipe/99')
+        self.client.get('/images/cat1/recipe1/image1.jpg').close()
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        text = response.data.decode('utf-8')
+        self.assertIn('recipe_app_requests_total{route="index",status="200"}', text)
+        self.assertIn('recipe_app_requests_total{route="recipe_detail",status="404"}', text)
+        self.assertIn('recipe_app_request_duration_seconds_bucket{route="index",le="+Inf"}', text)
+        self.assertIn('recipe_app_request_phase_seconds_count{route="index",phase="render"}', text)
+        self.assertIn('recipe_app_page_cache_requests_total{result="hit"}', text)
+        self.assertIn('recipe_app_image_bytes_served_total{variant="original"}', text)
+        self.assertIn('recipe_app_recipes 2\n', text)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import shutil
+import tempfile
+from pathlib import Path
+from export import export_site, index_page_path, recipe_page_path
+
+RECIPE_TEMPLATE = """# {title}的做法
+
+![成品](./{title}.jpg)
+
+预估烹饪难度：{stars}
+
+## 必备原料和工具
+
+- 鸡蛋
+
+## 操作
+
+- 打散鸡蛋
+"""
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.dishes_dir = Path(self.test_dir) / "dishes"
+        self.output_dir = Path(self.test_dir) / "site"
+        self._write_recipe("soup", "番茄蛋汤", "★★")
+        self._write_recipe("soup", "紫菜汤", "★")
+        self._write_recipe("staple", "蛋炒饭", "★★")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write_recipe(self, category, title, stars):
+        recipe_dir = self.dishes_dir / category / title
+        recipe_dir.mkdir(parents=True, exist_ok=True)
+        (recipe_dir / f"{title}.md").write_text(RECIPE_TEMPLATE.format(title=title, stars=stars), encoding='utf-8')
+        (recipe_dir / f"{title}.jpg").write_bytes(b"dummy jpeg data")
+
+    def _export(self, **kwargs):
+        return export_site(self.output_dir, self.dishes_dir, **kwargs)
+
+    def test_full_export_writes_pages_images_and_static_files(self):
+        stats = self._export()
+        # index, 2 categories, 2 difficulties, 3 category+difficulty combinations, 3 recipes
+        self.assertEqual(stats["rendered"], 11)
+        self.assertEqual(stats["copied"], 4) # 3 images and style.css
+        for path in (index_page_path(), index_page_path("soup"), index_page_path("soup", 2), index_page_path(None, 1),
+                     recipe_page_path(0), "images/soup/番茄蛋汤/番茄蛋汤.jpg", "static/style.css"):
+            self.assertTrue((self.output_dir / path).is_file(), path)
+
+        index_html = (self.output_dir / "index.html").read_text(encoding='utf-8')
+        self.assertIn('href="/recipe/0.html"', index_html)
+        self.assertIn('href="/category/soup/index.html"', index_html)
+        self.assertIn('href="/static/style.css"', index_html)
+        recipe_html = (self.output_dir / recipe_page_path(0)).read_text(encoding='utf-8')
+        self.assertIn("/images/staple/", recipe_html)
+        self.assertNotIn("srcset", recipe_html) # No resized copies in the export
+
+    def test_unchanged_rebuild_skips_everything(self):
+        self._export()
+        stats = self._export()
+        self.assertEqual((stats["rendered"], stats["copied"], stats["deleted"]), (0, 0, 0))
+        self.assertEqual(stats["skipped"], 15)
+
+    def test_build_state_is_not_exported(self):
+        (self.output_dir).mkdir()
+        (self.output_dir / ".build_manifest.json").write_text("{}", encoding='utf-8') # From an older build
+        self._export()
+        self.assertEqual([path for path in self.output_dir.rglob(".*")], [])
+        state_dir = Path(self.test_dir) / ".site.build"
+        self.assertTrue((state_dir / ".build_manifest.json").is_file())
+        self.assertTrue((state_dir / ".parse_cache.json").is_file())
+        with self.assertRaises(ValueError):
+            self._export(state_dir=self.output_dir / "state")
+
+    def test_changed_recipe_rerenders_only_affected_pages(self):
+        self._export()
+        recipe_path = self.dishes_dir / "staple" / "蛋炒饭" / "蛋炒饭.md"
+        recipe_path.write_text(recipe_path.read_text(encoding='utf-8') + "- 撒葱花\n", encoding='utf-8')
+        stats = self._export()
+        # Only the recipe's own page: its title and category, which the index pages show, did not change
+        self.assertEqual((stats["rendered"], stats["copied"]), (1, 0))
+
+        recipe_path.write_text(recipe_path.read_text(encoding='utf-8').replace("蛋炒饭的做法", "扬州炒饭的做法"),
+                               encoding='utf-8')
+        stats = self._export()
+        # The recipe page, the index pages listing it (all, staple, 2 stars, staple + 2 stars)
+        # and the pages of the two soups, which link to it as a related recipe
+        self.assertEqual(stats["rendered"], 7)
+
+    def test_removed_recipe_deletes_stale_outputs(self):
+        self._export()
+        shutil.rmtree(self.dishes_dir / "staple")
+        stats = self._export()
+        self.assertEqual(stats["deleted"], 4) # Its recipe page, image and the two staple index pages
+        self.assertFalse((self.output_dir / index_page_path("staple")).exists())
+        self.assertFalse((self.output_dir / recipe_page_path(2)).exists())
+
+    def test_parallel_export_matches_sequential(self):
+        self._export(workers=1)
+        sequential = {path: (self.output_dir / path).read_bytes()
+                      for path in (index_page_path(), recipe_page_path(1))}
+        stats = self._export(workers=2, force=True)
+        self.assertEqual(stats["rendered"], 11)
+        for path, content in sequential.items():
+            self.assertEqual((self.output_dir / path).read_bytes(), content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from facet_index import FacetIndex, difficulty_stars
+
+class TestFacetIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.recipes = [
+            {"category": "meat_dish", "difficulty": "★★★"},
+            {"category": "soup", "difficulty": "★"},
+            {"category": "meat_dish", "difficulty": "★"},
+            {"category": "meat_dish", "difficulty": None},
+            {"category": "soup", "difficulty": "★★★"},
+        ]
+        self.index = FacetIndex.build(self.recipes)
+
+    def test_difficulty_stars(self):
+        self.assertEqual(difficulty_stars("★★★★"), 4)
+        self.assertIsNone(difficulty_stars(None))
+        self.assertIsNone(difficulty_stars("unknown"))
+
+    def test_postings_match_filtering(self):
+        for category in [None] + self.index.categories:
+            for stars in [None] + self.index.difficulties:
+                expected = [recipe_id for recipe_id, recipe in enumerate(self.recipes)
+                            if category in (None, recipe["category"])
+                            and stars in (None, difficulty_stars(recipe["difficulty"]))]
+                self.assertEqual(list(self.index.ids(category, stars)), expected)
+        self.assertEqual(self.index.categories, ["meat_dish", "soup"])
+        self.assertEqual(self.index.difficulties, [1, 3])
+
+    def test_page(self):
+        self.assertEqual(self.index.page(page=1, per_page=2), ([0, 1], 5))
+        self.assertEqual(self.index.page(page=3, per_page=2), ([4], 5))
+        self.assertEqual(self.index.page("meat_dish", 1, page=1, per_page=2), ([2], 1))
+        self.assertEqual(self.index.page("soup", 3, page=2, per_page=2), ([], 1))
+
+    def test_counts(self):
+        self.assertEqual(self.index.counts(), ({"meat_dish": 3, "soup": 2}, {1: 2, 3: 2}))
+        # Each facet is counted with the other filter applied
+        self.assertEqual(self.index.counts("meat_dish", 3), ({"meat_dish": 1, "soup": 1}, {1: 1, 3: 1}))
+        self.assertEqual(self.index.counts("meat_dish", None), ({"meat_dish": 3, "soup": 2}, {1: 1, 3: 1}))
+
+    def test_empty_corpus(self):
+        index = FacetIndex.build([])
+        self.assertEqual(index.page(), ([], 0))
+        self.assertEqual(index.counts(), ({}, {}))
+
+if __name__ == '__main__':
+    unittest.main()
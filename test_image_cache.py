@@ -0,0 +1,95 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+import image_cache
+from image_cache import DerivativeCache, Image, pregenerate, snap_width
+
+@unittest.skipIf(Image is None, "Pillow is not installed")
+class TestImageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.source_root = os.path.join(self.test_dir, "dishes")
+        os.makedirs(os.path.join(self.source_root, "cat1"))
+        for name in ("a.jpg", "b.jpg", "c.jpg"):
+            Image.new("RGB", (1200, 800), (200, 100, 50)).save(os.path.join(self.source_root, "cat1", name), "JPEG")
+        self.cache_dir = os.path.join(self.test_dir, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_snap_width(self):
+        self.assertEqual(snap_width(1), 160)
+        self.assertEqual(snap_width(320), 320)
+        self.assertEqual(snap_width(500), 640)
+        self.assertEqual(snap_width(10000), 1920)
+
+    def test_resize_and_reuse(self):
+        cache = DerivativeCache(self.cache_dir)
+        path = cache.get(self.source_root, "cat1/a.jpg", 320, "webp")
+        with Image.open(path) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (320, 213)))
+        self.assertEqual(cache.get(self.source_root, "cat1/a.jpg", 320, "webp"), path)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # Never upscaled
+        with Image.open(cache.get(self.source_root, "cat1/a.jpg", 1920, "jpeg")) as image:
+            self.assertEqual(image.size, (1200, 800))
+        with self.assertRaises(FileNotFoundError):
+            cache.get(self.source_root, "cat1/missing.jpg", 320, "webp")
+
+    def test_lru_eviction(self):
+        probe = DerivativeCache(os.path.join(self.test_dir, "probe"))
+        size = os.path.getsize(probe.get(self.source_root, "cat1/a.jpg", 160, "webp"))
+        cache = DerivativeCache(self.cache_dir, max_bytes=size * 2)
+        first = cache.get(self.source_root, "cat1/a.jpg", 160, "webp")
+        second = cache.get(self.source_root, "cat1/b.jpg", 160, "webp")
+        cache.get(self.source_root, "cat1/a.jpg", 160, "webp") # a is now more recent than b
+        cache.get(self.source_root, "cat1/c.jpg", 160, "webp")
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        # A new process sees the same bounded state
+        self.assertEqual(len(DerivativeCache(self.cache_dir, max_bytes=size * 2)._entries), 2)
+
+    def test_shared_directory(self):
+        # Two processes (here two caches) serving from one directory
+        first = DerivativeCache(self.cache_dir)
+        second = DerivativeCache(self.cache_dir, rescan_interval=0) # Looks at the directory on every miss
+        path = first.get(self.source_root, "cat1/a.jpg", 160, "webp")
+        with mock.patch.object(image_cache, "render_derivative", side_effect=AssertionError("rendered again")):
+            self.assertEqual(second.get(self.source_root, "cat1/a.jpg", 160, "webp"), path)
+        self.assertEqual((second.hits, second.misses), (1, 0))
+
+        # The bound counts what the other process wrote
+        first.get(self.source_root, "cat1/b.jpg", 160, "webp")
+        first.get(self.source_root, "cat1/c.jpg", 160, "webp")
+        second.max_bytes = os.path.getsize(path) * 2
+        newest = second.get(self.source_root, "cat1/c.jpg", 160, "jpeg")
+        self.assertTrue(os.path.exists(newest))
+        sizes = [entry.stat().st_size for entry in os.scandir(self.cache_dir)]
+        self.assertTrue(sum(sizes) <= second.max_bytes or len(sizes) == 1, sizes)
+
+    def test_misses_do_not_scan_the_directory(self):
+        cache = DerivativeCache(self.cache_dir)
+        with mock.patch.object(image_cache.os, "scandir", side_effect=AssertionError("scanned")):
+            for name in ("a.jpg", "b.jpg", "c.jpg"):
+                cache.get(self.source_root, f"cat1/{name}", 160, "webp")
+        self.assertEqual(cache.misses, 3)
+        cache._last_rescan -= cache.rescan_interval # Due: the next miss rescans
+        with mock.patch.object(image_cache.os, "scandir", wraps=os.scandir) as scandir:
+            cache.get(self.source_root, "cat1/a.jpg", 320, "webp")
+        self.assertEqual(scandir.call_count, 1)
+        self.assertEqual(len(cache._entries), 4)
+
+    def test_pregenerate(self):
+        cache = DerivativeCache(self.cache_dir)
+        failures = pregenerate(cache, self.source_root, ["cat1/a.jpg", "cat1/b.jpg", "cat1/missing.jpg"],
+                               widths=(160, 320), fmt="webp", workers=2)
+        self.assertEqual(len(failures), 2)
+        self.assertEqual(len(cache._entries), 4)
+        cache.get(self.source_root, "cat1/b.jpg", 320, "webp")
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from ingredient_index import IngredientIndex, normalize_ingredient, required_ingredients
+
+class TestIngredientIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.recipes = [
+            {"ingredients": ["鸡蛋", "西红柿", "食盐", "葱（可选）"]},
+            {"ingredients": ["鸡蛋", "盐", "面粉", "食用油"]},
+            {"ingredients": ["五花肉", "冰糖", "生抽", "老抽"]},
+            {"ingredients": []},
+            {"ingredients": ["原料:", "盆、碗、鸡蛋", "锅"]},
+        ]
+        self.index = IngredientIndex.build(self.recipes)
+
+    def test_normalization(self):
+        self.assertEqual(normalize_ingredient("无盐黄油（推荐品牌总统）"), "无盐黄油")
+        self.assertEqual(normalize_ingredient("食用盐"), "盐")
+        self.assertEqual(required_ingredients(self.recipes[0]["ingredients"]), {"鸡蛋", "番茄", "盐"})
+        self.assertEqual(required_ingredients(self.recipes[4]["ingredients"]), {"盆", "鸡蛋"})
+
+    def test_cookable_matches_naive_scan(self):
+        pantries = [["鸡蛋", "番茄", "盐"], ["鸡蛋", "盐", "面粉"], ["五花肉"], ["盆"], [], ["不存在"]]
+        for have in pantries:
+            for max_missing in range(4):
+                pantry = {normalize_ingredient(name) for name in have}
+                expected = sorted(
+                    (len(required - pantry), recipe_id, sorted(required - pantry))
+                    for recipe_id, required in enumerate(self.index.required_sets)
+                    if required and len(required - pantry) <= max_missing
+                )
+                actual = [(len(missing), recipe_id, missing)
+                          for recipe_id, missing in self.index.cookable(have, max_missing)]
+                self.assertEqual(actual, expected, (have, max_missing))
+
+    def test_cookable_examples(self):
+        self.assertEqual(self.index.cookable(["鸡蛋", "西红柿", "精盐"]), [(0, [])])
+        self.assertEqual(self.index.cookable(["鸡蛋", "盐"], max_missing=1),
+                         [(0, ["番茄"]), (1, ["面粉"]), (4, ["盆"])])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from link_graph import LinkGraph, resolve_link
+
+
+class TestLinkGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.sources = [
+            "dishes/breakfast/太阳蛋.md",
+            "dishes/staple/米饭/电饭煲蒸米饭.md",
+            "tips/learn/学习焯水.md",
+            "starsystem/1Star.md",
+        ]
+        self.outgoing = {
+            "dishes/breakfast/太阳蛋.md": ["../../tips/learn/学习焯水.md", "../staple/米饭/电饭煲蒸米饭.md#做法"],
+            "starsystem/1Star.md": ["./../dishes/breakfast/太阳蛋.md", "./../dishes/breakfast/太阳蛋.md",
+                                    "../dishes/aquatic/不存在.md", "https://github.com/", "#top"],
+            "tips/learn/学习焯水.md": ["./学习焯水.md"],
+        }
+        self.graph = LinkGraph.build(self.sources, self.outgoing)
+
+    def test_resolve_link(self):
+        self.assertEqual(resolve_link("starsystem/1Star.md", "./../dishes/breakfast/太阳蛋.md"), "dishes/breakfast/太阳蛋.md")
+        self.assertEqual(resolve_link("dishes/a/b.md", "../c/d.md#step"), "dishes/c/d.md")
+        self.assertEqual(resolve_link("tips/a.md", "/dishes/b.md"), "dishes/b.md")
+        self.assertEqual(resolve_link("tips/a.md", "%E7%B1%B3%E9%A5%AD.md"), "tips/米饭.md")
+        self.assertIsNone(resolve_link("tips/a.md", "https://example.com/b.md"))
+        self.assertIsNone(resolve_link("tips/a.md", "mailto:someone@example.com"))
+        self.assertIsNone(resolve_link("tips/a.md", "#section"))
+
+    def test_links_and_backlinks(self):
+        self.assertEqual(self.graph.links_from(0), [2, 1])
+        self.assertEqual(self.graph.links_from(3), [0]) # Repeated links count once
+        self.assertEqual(self.graph.links_from(2), []) # Links to itself are left out
+        self.assertEqual(self.graph.backlinks_to(0), [3])
+        self.assertEqual(self.graph.backlinks_to(2), [0])
+        self.assertEqual(self.graph.backlinks_to(3), [])
+        self.assertEqual(self.graph.backlinks_to(99), [])
+        self.assertEqual(self.graph.link_count(), 3)
+
+    def test_dangling_and_resolve(self):
+        self.assertEqual(self.graph.dangling, [("starsystem/1Star.md", "../dishes/aquatic/不存在.md")])
+        self.assertEqual(self.graph.resolve("starsystem/1Star.md", "./../dishes/breakfast/太阳蛋.md"), 0)
+        self.assertIsNone(self.graph.resolve("starsystem/1Star.md", "../dishes/aquatic/不存在.md"))
+        self.assertIsNone(self.graph.resolve("starsystem/1Star.md", "https://github.com/"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+import media_manifest
+from media_manifest import MediaManifest
+from parser import broken_image_references, parse_recipe_file, recipe_image_files
+from image_cache import Image
+
+
+class TestMediaManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.root = Path(self.test_dir) / "dishes"
+        (self.root / "soup" / "番茄蛋汤").mkdir(parents=True)
+        (self.root / "soup" / "番茄蛋汤" / "pointer.jpg").write_bytes(b"version https://git-lfs.github.com/spec/v1\n")
+        self.manifest_path = os.path.join(self.test_dir, "media_manifest.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _build(self, paths, **kwargs):
+        return MediaManifest.build(str(self.root), paths, **kwargs)
+
+    def test_entries_and_missing(self):
+        manifest = self._build(["soup/番茄蛋汤/pointer.jpg", "soup/番茄蛋汤/missing.jpg", "../outside.jpg"])
+        entry = manifest.entries["soup/番茄蛋汤/pointer.jpg"]
+        data = b"version https://git-lfs.github.com/spec/v1\n"
+        self.assertEqual(entry["size"], len(data))
+        self.assertEqual(entry["hash"], hashlib.sha256(data).hexdigest()[:16])
+        self.assertEqual((entry["width"], entry["height"]), (None, None)) # Not decodable
+        self.assertEqual(manifest.missing, ["../outside.jpg", "soup/番茄蛋汤/missing.jpg"])
+        self.assertEqual(manifest.undecodable(), ["soup/番茄蛋汤/pointer.jpg"])
+        self.assertIsNone(manifest.hash("soup/番茄蛋汤/missing.jpg"))
+
+    def test_dimensions(self):
+        if Image is None:
+            self.skipTest("Pillow is not installed")
+        Image.new("RGB", (120, 80)).save(self.root / "soup" / "番茄蛋汤" / "photo.png", "PNG")
+        entry = self._build(["soup/番茄蛋汤/photo.png"]).entries["soup/番茄蛋汤/photo.png"]
+        self.assertEqual((entry["width"], entry["height"]), (120, 80))
+
+    def test_unchanged_files_are_not_hashed_again(self):
+        self._build(["soup/番茄蛋汤/pointer.jpg"]).save(self.manifest_path)
+        previous = MediaManifest.load(self.manifest_path, str(self.root))
+        self.assertIsNotNone(previous)
+        with mock.patch.object(media_manifest, "file_hash", side_effect=AssertionError("hashed")):
+            manifest = self._build(["soup/番茄蛋汤/pointer.jpg"], previous=previous)
+        self.assertEqual(manifest.entries, previous.entries)
+
+        (self.root / "soup" / "番茄蛋汤" / "pointer.jpg").write_bytes(b"another version")
+        manifest = self._build(["soup/番茄蛋汤/pointer.jpg"], previous=previous)
+        self.assertEqual(manifest.hash("soup/番茄蛋汤/pointer.jpg"), hashlib.sha256(b"another version").hexdigest()[:16])
+
+    def test_current_entry(self):
+        manifest = self._build(["soup/番茄蛋汤/pointer.jpg"])
+        self.assertIsNotNone(manifest.current_entry("soup/番茄蛋汤/pointer.jpg"))
+        (self.root / "soup" / "番茄蛋汤" / "pointer.jpg").write_bytes(b"edited")
+        self.assertIsNone(manifest.current_entry("soup/番茄蛋汤/pointer.jpg"))
+        self.assertIsNone(manifest.current_entry("soup/番茄蛋汤/missing.jpg"))
+
+    def test_load_rejects_other_directory(self):
+        self._build(["soup/番茄蛋汤/pointer.jpg"]).save(self.manifest_path)
+        self.assertIsNone(MediaManifest.load(self.manifest_path, "/elsewhere/dishes"))
+        self.assertIsNone(MediaManifest.load(os.path.join(self.test_dir, "absent.json"), str(self.root)))
+
+    def test_parallel_build_matches_sequential(self):
+        paths = [f"soup/番茄蛋汤/{i}.jpg" for i in range(6)]
+        for i, path in enumerate(paths):
+            (self.root / path).write_bytes(b"x" * i)
+        self.assertEqual(self._build(paths, workers=2).entries, self._build(paths).entries)
+
+    def test_parenthesised_file_name_is_not_broken(self):
+        recipe_dir = self.root / "drink" / "冰粉"
+        recipe_dir.mkdir(parents=True)
+        (recipe_dir / "石凉粉(冰粉)成品1.jpg").write_bytes(b"jpeg")
+        (recipe_dir / "冰粉.md").write_text("# 冰粉的做法\n\n![石凉粉(冰粉)成品1](./石凉粉(冰粉)成品1.jpg)\n", encoding='utf-8')
+        recipe = parse_recipe_file(str(recipe_dir / "冰粉.md"), str(self.root))
+        manifest = self._build(recipe_image_files(recipe))
+        self.assertEqual(list(manifest.entries), ["drink/冰粉/石凉粉(冰粉)成品1.jpg"])
+        self.assertEqual(broken_image_references([recipe], manifest), [])
+
+    def test_broken_image_references(self):
+        recipes = [
+            {"source_file": "dishes/soup/番茄蛋汤/番茄蛋汤.md", "image_paths": ["./pointer.jpg", "./missing.jpg"]},
+            {"source_file": "dishes/soup/番茄蛋汤/番茄蛋汤.md", "image_paths": ["./missing.jpg", "./missing.jpg"]},
+        ]
+        manifest = self._build(["soup/番茄蛋汤/pointer.jpg", "soup/番茄蛋汤/missing.jpg"])
+        self.assertEqual(broken_image_references(recipes, manifest),
+                         [("dishes/soup/番茄蛋汤/番茄蛋汤.md", "soup/番茄蛋汤/missing.jpg")])
+
+
+if __name__ == '__main__':
+    unittest.main()
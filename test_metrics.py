@@ -0,0 +1,37 @@
+import unittest
+from metrics import MetricsRegistry, format_labels
+
+class TestMetrics(unittest.TestCase):
+
+    def test_counters_and_gauges(self):
+        registry = MetricsRegistry()
+        registry.describe('requests_total', 'counter', "Requests")
+        registry.inc('requests_total', labels=(('route', 'index'),))
+        registry.inc('requests_total', 2, (('route', 'index'),))
+        registry.set('load_seconds', 0.25)
+        text = registry.render()
+        self.assertIn("# HELP requests_total Requests\n# TYPE requests_total counter\n", text)
+        self.assertIn('requests_total{route="index"} 3\n', text)
+        self.assertIn("load_seconds 0.25\n", text)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_histogram(self):
+        registry = MetricsRegistry()
+        for value in (0.001, 0.003, 0.003, 7.0):
+            registry.observe('latency_seconds', value, (('route', 'index'),), buckets=(0.001, 0.005, 1.0))
+        text = registry.render()
+        self.assertIn('latency_seconds_bucket{route="index",le="0.001"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{route="index",le="0.005"} 3\n', text)
+        self.assertIn('latency_seconds_bucket{route="index",le="1"} 3\n', text)
+        self.assertIn('latency_seconds_bucket{route="index",le="+Inf"} 4\n', text)
+        self.assertIn('latency_seconds_count{route="index"} 4\n', text)
+        self.assertAlmostEqual(registry.histogram('latency_seconds', (('route', 'index'),)).sum, 7.007)
+
+    def test_collectors_and_escaping(self):
+        registry = MetricsRegistry()
+        registry.add_collector(lambda: [('cache_hit_ratio', (), 0.5)])
+        self.assertIn("cache_hit_ratio 0.5\n", registry.render())
+        self.assertEqual(format_labels((('path', 'a"b\\c'),)), '{path="a\\"b\\\\c"}')
+
+if __name__ == '__main__':
+    unittest.main()
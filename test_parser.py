@@ -1,10 +1,12 @@
 import unittest
 import os
+import io
 import json
 import shutil
 import tempfile
 from pathlib import Path
-from parser import parse_recipes # Assuming parser.py is in the same directory or accessible via PYTHONPATH
+from recipe_model import json_default
+from parser import parse_recipes, iter_recipes, write_ndjson, tokenize_markdown, extract_section_content, parse_pages # Assuming parser.py is in the same directory or accessible via PYTHONPATH
 
 class TestParser(unittest.TestCase):
 
@@ -160,5 +162,155 @@ No images in this one.
         self.assertEqual(Path(recipe['source_file']), Path(expected_source_file))
 
 
+    def test_parse_cache_reuses_unchanged_files(self):
+        self._create_md_file("cat_a", "a.md", "# Recipe A\nFirst.\n\n## 操作\n1. Step A\n")
+        b_path = self._create_md_file("cat_b", "b.md", "# Recipe B\nSecond.\n")
+        c_path = self._create_md_file("cat_c", "c.md", "# Recipe C\nThird.\n")
+        cache_path = os.path.join(self.test_dir, "parse_cache.json")
+
+        stats = {}
+        cold = parse_recipes(base_dir_override=str(self.mock_dishes_path), cache_path=cache_path, stats=stats)
+        self.assertEqual(stats, {"hits": 0, "misses": 3, "removed": 0})
+
+        warm = parse_recipes(base_dir_override=str(self.mock_dishes_path), cache_path=cache_path, stats=stats)
+        self.assertEqual(stats, {"hits": 3, "misses": 0, "removed": 0})
+        # Serialized as parser.py writes recipes.json
+        self.assertEqual(json.dumps(warm, ensure_ascii=False, indent=4, default=json_default),
+                         json.dumps(cold, ensure_ascii=False, indent=4, default=json_default))
+
+        with open(b_path, 'w', encoding='utf-8') as f:
+            f.write("# Recipe B v2\nChanged.\n")
+        os.remove(c_path)
+        updated = parse_recipes(base_dir_override=str(self.mock_dishes_path), cache_path=cache_path, stats=stats)
+        self.assertEqual(stats, {"hits": 1, "misses": 1, "removed": 1})
+        self.assertEqual(updated, parse_recipes(base_dir_override=str(self.mock_dishes_path)))
+        self.assertIn("Recipe B v2", [r['title'] for r in updated])
+
+
+    def test_parallel_parse_matches_sequential(self):
+        for i in range(12):
+            self._create_md_file(f"cat_{i % 3}", f"recipe_{i}.md", f"# Recipe {i}\nDesc {i}.\n\n## 操作\n1. Step {i}\n")
+        # Invalid UTF-8 must still come back as an error record from the worker
+        with open(self.mock_dishes_path / "cat_0" / "broken.md", 'wb') as f:
+            f.write(b"# \xff\xfe broken\n")
+
+        sequential = parse_recipes(base_dir_override=str(self.mock_dishes_path))
+        parallel = parse_recipes(base_dir_override=str(self.mock_dishes_path), workers=2)
+        self.assertEqual(parallel, sequential)
+        errors = [r for r in parallel if r['category'] == "error"]
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0]['source_file'].endswith("broken.md"))
+
+
+    def test_iter_recipes_streams_like_parse_recipes(self):
+        for i in range(4):
+            self._create_md_file(f"cat_{i % 2}", f"recipe_{i}.md", f"# Recipe {i}\nDesc {i}.\n")
+        cache_path = os.path.join(self.test_dir, "parse_cache.json")
+        parse_recipes(base_dir_override=str(self.mock_dishes_path), cache_path=cache_path)
+        self._create_md_file("cat_0", "recipe_new.md", "# Recipe new\nNew.\n")
+
+        stats = {}
+        recipes = iter_recipes(base_dir_override=str(self.mock_dishes_path), cache_path=cache_path, stats=stats)
+        first = next(recipes)
+        self.assertEqual(stats, {}) # Filled in once the generator is exhausted
+        streamed = [first] + list(recipes)
+        self.assertEqual(stats, {"hits": 4, "misses": 1, "removed": 0})
+        self.assertEqual(streamed, parse_recipes(base_dir_override=str(self.mock_dishes_path)))
+
+        # Only parsed files are profiled, cache hits are not
+        profile = []
+        parse_recipes(base_dir_override=str(self.mock_dishes_path), cache_path=cache_path, profile=profile)
+        self.assertEqual(profile, [])
+        parse_recipes(base_dir_override=str(self.mock_dishes_path), profile=profile)
+        self.assertEqual(sorted(path for path, _, _ in profile),
+                         ["cat_0/recipe_0.md", "cat_0/recipe_2.md", "cat_0/recipe_new.md",
+                          "cat_1/recipe_1.md", "cat_1/recipe_3.md"])
+        self.assertTrue(all(seconds >= 0 and size > 0 for _, seconds, size in profile))
+
+    def test_write_ndjson(self):
+        self._create_md_file("cat_a", "a.md", "# 番茄炒蛋\n简单。\n")
+        self._create_md_file("cat_b", "b.md", "# Recipe B\nSecond.\n")
+        stream = io.BytesIO()
+        count = write_ndjson(iter_recipes(base_dir_override=str(self.mock_dishes_path)), stream)
+        lines = stream.getvalue().decode('utf-8').splitlines()
+        self.assertEqual(count, 2)
+        self.assertEqual(len(lines), 2)
+        self.assertIn("番茄炒蛋", lines[0] + lines[1]) # Not \u-escaped
+        self.assertEqual([json.loads(line) for line in lines], parse_recipes(base_dir_override=str(self.mock_dishes_path)))
+
+
+    def test_inline_difficulty(self):
+        content = """# Test Recipe 4
+A short description.
+
+预估烹饪难度：★★★
+
+## 必备原料和工具
+- Ingredient A
+"""
+        self._create_md_file("test_cat4", "recipe4.md", content)
+        recipes = parse_recipes(base_dir_override=str(self.mock_dishes_path))
+        recipe = recipes[0]
+        self.assertEqual(recipe['difficulty'], "★★★")
+        self.assertEqual(recipe['description'], "A short description.") # The difficulty line is not part of it
+        self.assertListEqual(recipe['ingredients'], ["Ingredient A"])
+
+    def test_tokenize_markdown_sections(self):
+        content = """# Title
+Line one.
+
+Line two.
+![pic](a.jpg)
+## First
+- item ![inline](b.png) ![remote](https://example.com/c.png)
+### Nested
+nested text
+## First
+ignored duplicate
+## Empty
+"""
+        document = tokenize_markdown(content)
+        self.assertEqual(document['title'], "Title")
+        self.assertEqual(document['description'], "Line one.\nLine two.\n![pic](a.jpg)")
+        self.assertEqual(document['sections']['first'], "- item ![inline](b.png) ![remote](https://example.com/c.png)")
+        self.assertEqual(document['sections']['# nested'], "nested text")
+        self.assertIsNone(document['sections']['empty'])
+        self.assertListEqual(document['image_paths'], ["a.jpg", "b.png"])
+        self.assertListEqual(document['links'], [])
+        self.assertEqual(extract_section_content(content, "First"), document['sections']['first'])
+
+    def test_image_paths_with_parentheses(self):
+        content = ("# 冰粉\n\n![石凉粉(冰粉)成品1](./石凉粉(冰粉)成品1.jpg)\n"
+                   "![a](<带 空格.png>) ![b](b.jpg) ![remote](https://example.com/c.png)\n")
+        self.assertListEqual(tokenize_markdown(content)['image_paths'],
+                             ["./石凉粉(冰粉)成品1.jpg", "带 空格.png", "b.jpg"])
+
+    def test_links_collected_with_and_without_cache(self):
+        self._create_md_file("cat_a", "a.md", "# Recipe A\n\n## 操作\n- 先[焯水](../../tips/learn/学习焯水.md)，"
+                                             "再看![图](a.jpg)和[视频](https://example.com/v)\n")
+        self._create_md_file("cat_b", "b.md", "# Recipe B\n")
+        cache_path = os.path.join(self.test_dir, "parse_cache.json")
+        expected = {
+            os.path.join("dishes", "cat_a", "a.md"): ["../../tips/learn/学习焯水.md", "https://example.com/v"],
+            os.path.join("dishes", "cat_b", "b.md"): [],
+        }
+        for _ in range(2): # Parsed, then from the cache
+            links = {}
+            parse_recipes(base_dir_override=str(self.mock_dishes_path), cache_path=cache_path, links=links)
+            self.assertEqual(links, expected)
+
+    def test_parse_pages(self):
+        (self.mock_dishes_path / "tips" / "learn").mkdir(parents=True)
+        (self.mock_dishes_path / "tips" / "learn" / "蒸.md").write_text("# 蒸\n\n见[水蒸蛋](../../dishes/a.md)\n",
+                                                                        encoding='utf-8')
+        (self.mock_dishes_path / "tips" / "untitled.md").write_text("No heading\n", encoding='utf-8')
+        links = {}
+        pages = parse_pages(self.mock_dishes_path, trees=("tips", "starsystem"), links=links)
+        self.assertEqual([(page["title"], page["source_file"]) for page in pages],
+                         [("蒸", "tips/learn/蒸.md"), ("untitled", "tips/untitled.md")])
+        self.assertEqual(pages[0]["content"], "# 蒸\n\n见[水蒸蛋](../../dishes/a.md)\n")
+        self.assertEqual(links, {"tips/learn/蒸.md": ["../../dishes/a.md"], "tips/untitled.md": []})
+
+
 if __name__ == '__main__':
     unittest.main()
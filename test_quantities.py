@@ -0,0 +1,64 @@
+import unittest
+from quantities import parse_quantity_line, extract_quantities, QuantityTable
+
+class TestQuantities(unittest.TestCase):
+
+    def test_parse_quantity_line(self):
+        self.assertEqual(parse_quantity_line("- 咖喱块 115g"),
+                         {"ingredient": "咖喱块", "amount": 115.0, "min": 115.0, "max": 115.0, "unit": "g"})
+        self.assertEqual(parse_quantity_line("* 辣椒油 (0-10ml)"),
+                         {"ingredient": "辣椒油", "amount": 5.0, "min": 0.0, "max": 10.0, "unit": "ml"})
+        self.assertEqual(parse_quantity_line("- 土豆 2 个（每个土豆大约重 120g，共约 240g）"),
+                         {"ingredient": "土豆", "amount": 2.0, "min": 2.0, "max": 2.0, "unit": "个"})
+        self.assertEqual(parse_quantity_line("* 3 个鸡蛋")["ingredient"], "鸡蛋")
+        self.assertEqual(parse_quantity_line("- 盐的用量为 1 g 每个鸡蛋。")["ingredient"], "盐")
+        self.assertEqual(parse_quantity_line("* 甜面酱 = 份数 * 15g")["amount"], 15.0)
+        # Units are normalized to grams / millilitres
+        self.assertEqual(parse_quantity_line("- 牛腩 1.5kg")["amount"], 1500.0)
+        self.assertEqual(parse_quantity_line("- 啤酒 1 升")["unit"], "ml")
+        self.assertIsNone(parse_quantity_line("- 白糖 适量"))
+
+    def test_parse_quantity_line_names(self):
+        # Lines from the recipes that have no ingredient name to file the quantity under
+        for line in ("- 2 人 1 顿 520g（以半成品为准）", "- 1 汤匙 = 15ml", "- 100°C 沸水 1500ml",
+                     "* 中断大火加热的最晚时间 T1：1.5  分钟/500ml * 水体积", "- 淀粉 = 面粉 / 4 克",
+                     "- 6 寸：大小为 3 份（即三个鸡蛋）。面积 36 个单位。"):
+            self.assertIsNone(parse_quantity_line(line), line)
+        self.assertEqual(parse_quantity_line("* 如果觉得酱料较为清淡，可以加入 2 至 5 克盐")["ingredient"], "盐")
+        self.assertEqual(parse_quantity_line("- 🥛 牛奶 280ml/per")["ingredient"], "牛奶")
+        self.assertEqual(parse_quantity_line("- 大蒜 2 瓣")["ingredient"], "蒜") # Normalized like the ingredient index
+        self.assertEqual(parse_quantity_line("- 油 20ml（花生油或芝麻油更好）")["ingredient"], "食用油")
+        self.assertEqual(parse_quantity_line("- 食用油的用量为 10 - 18 ml / 人。")["ingredient"], "食用油")
+
+    def test_parse_quantity_line_fractions(self):
+        self.assertEqual(parse_quantity_line("- 盐 1/4 茶匙"),
+                         {"ingredient": "盐", "amount": 0.25, "min": 0.25, "max": 0.25, "unit": "茶匙"})
+        self.assertEqual(parse_quantity_line("- 生粉 2 1/2 茶匙")["amount"], 2.5)
+
+    def test_extract_quantities_skips_prose(self):
+        text = "每次制作前需要确定计划做几份。一份正好够 2 个人吃。\n\n每份：\n\n- 咖喱块 115g\n- 食用油 10-15ml\n"
+        quantities = extract_quantities(text)
+        self.assertEqual([q["ingredient"] for q in quantities], ["咖喱块", "食用油"])
+        self.assertEqual(extract_quantities(None), [])
+
+    def test_shopping_lists(self):
+        recipes = [
+            {"quantities": [extract_quantities("- 盐 2g")[0], extract_quantities("- 鸡蛋 2 个")[0]]},
+            {"quantities": []},
+            {"quantities": [extract_quantities("- 盐 1-3g")[0], extract_quantities("- 酱油 5ml")[0]]},
+        ]
+        table = QuantityTable.from_recipes(recipes)
+        self.assertEqual(table.shopping_list({0: 2, 2: 1}), [
+            {"ingredient": "盐", "amount": 6.0, "min": 5.0, "max": 7.0, "unit": "g"},
+            {"ingredient": "酱油", "amount": 5.0, "min": 5.0, "max": 5.0, "unit": "ml"},
+            {"ingredient": "鸡蛋", "amount": 4.0, "min": 4.0, "max": 4.0, "unit": "个"},
+        ])
+        # A batch gives the same answer as one call per combo, empty recipes included
+        combos = [{2: 3}, {1: 1}, {0: 1, 1: 4}, {}]
+        self.assertEqual(table.shopping_lists(combos), [table.shopping_list(combo) for combo in combos])
+        self.assertEqual(table.scale(2, 2)[0]["amount"], 4.0)
+        with self.assertRaises(IndexError):
+            table.shopping_list({3: 1})
+
+if __name__ == '__main__':
+    unittest.main()
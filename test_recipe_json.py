@@ -0,0 +1,47 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from recipe_json import RecipeJSONCache, RECIPE_FIELDS
+from snapshot import RecipeSnapshot, write_snapshot
+
+class TestRecipeJSONCache(unittest.TestCase):
+
+    def setUp(self):
+        self.recipes = [
+            {"title": "番茄炒蛋的做法", "difficulty": "★★", "ingredients": ["鸡蛋", "番茄"],
+             "calculations": {"鸡蛋": "2个"}, "category": "vegetable_dish"},
+            {"title": "Error parsing file", "error": "boom", "category": "error", "description": None},
+        ]
+
+    def test_objects_match_json_dumps(self):
+        cache = RecipeJSONCache(self.recipes)
+        for recipe_id, recipe in enumerate(self.recipes):
+            expected = {"id": recipe_id, **{field: recipe[field] for field in RECIPE_FIELDS if field in recipe}}
+            self.assertEqual(json.loads(cache.object(recipe_id)), expected)
+        self.assertIn("番茄".encode('utf-8'), cache.object(0)) # Not \\u-escaped
+        self.assertEqual(json.loads(cache.array([1, 0], fields=("category", "title"))), [
+            {"id": 1, "category": "error", "title": "Error parsing file"},
+            {"id": 0, "category": "vegetable_dish", "title": "番茄炒蛋的做法"},
+        ])
+        self.assertEqual(cache.array([]), b"[]")
+        self.assertIs(cache.member(0, "title"), cache.member(0, "title")) # Encoded once
+        self.assertIsNone(cache.member(0, "instructions"))
+
+    def test_snapshot_fields_are_used_as_stored(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, "recipes.snapshot")
+            write_snapshot(path, self.recipes)
+            snapshot = RecipeSnapshot(path)
+            from_snapshot = RecipeJSONCache(snapshot)
+            from_dicts = RecipeJSONCache(self.recipes)
+            self.assertEqual(from_snapshot.array([0, 1]), from_dicts.array([0, 1]))
+            self.assertEqual(snapshot[0]._values, {}) # Nothing was decoded
+            del snapshot, from_snapshot
+        finally:
+            shutil.rmtree(test_dir)
+
+if __name__ == '__main__':
+    unittest.main()
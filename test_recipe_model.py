@@ -0,0 +1,80 @@
+import unittest
+import json
+import pickle
+from jinja2 import Environment
+from recipe_model import Recipe, Quantity, json_default
+
+RECIPE = {
+    "title": "番茄炒蛋的做法",
+    "description": "家常菜",
+    "difficulty": "★★",
+    "ingredients": ["番茄", "鸡蛋"],
+    "calculations": {"番茄": "2 个"},
+    "quantities": [{"ingredient": "番茄", "amount": 2.0, "min": 2.0, "max": 2.0, "unit": "个"},
+                   {"ingredient": "盐", "amount": 3.0, "min": 2.0, "max": 4.0, "unit": "g"}],
+    "instructions": ["番茄切块", "鸡蛋打散"],
+    "image_paths": [],
+    "category": "vegetable_dish",
+    "source_file": "dishes/vegetable_dish/番茄炒蛋/番茄炒蛋.md",
+}
+
+
+class TestRecipeModel(unittest.TestCase):
+
+    def setUp(self):
+        self.recipe = Recipe.from_dict(json.loads(json.dumps(RECIPE)))
+
+    def test_behaves_like_the_dict(self):
+        self.assertEqual(self.recipe, RECIPE)
+        self.assertEqual(RECIPE, self.recipe)
+        self.assertEqual(list(self.recipe), list(RECIPE))
+        self.assertEqual(len(self.recipe), len(RECIPE))
+        self.assertEqual(self.recipe["title"], "番茄炒蛋的做法")
+        self.assertEqual(self.recipe.title, "番茄炒蛋的做法")
+        self.assertEqual(self.recipe.quantities[1]["max"], 4.0)
+        self.assertIsNone(self.recipe.get("error"))
+        self.assertNotIn("error", self.recipe)
+        with self.assertRaises(KeyError):
+            self.recipe["error"]
+
+    def test_json_output_is_unchanged(self):
+        self.assertEqual(json.dumps([self.recipe], ensure_ascii=False, indent=4, default=json_default),
+                         json.dumps([RECIPE], ensure_ascii=False, indent=4))
+
+    def test_copy_and_extra_keys(self):
+        copy = self.recipe.copy()
+        copy["image_paths"] = ["vegetable_dish/番茄炒蛋/1.jpg"]
+        copy["rating"] = 5 # Not a Recipe field
+        self.assertEqual(self.recipe["image_paths"], [])
+        self.assertEqual(list(copy)[-1], "rating")
+        del copy["rating"]
+        del copy["description"]
+        self.assertNotIn("description", copy)
+        self.assertEqual(dict(copy), {key: value for key, value in RECIPE.items() if key != "description"}
+                         | {"image_paths": ["vegetable_dish/番茄炒蛋/1.jpg"]})
+
+    def test_error_record(self):
+        error = Recipe.from_dict({"title": "Error parsing file", "source_file": "x.md", "error": "boom",
+                                  "category": "error", "quantities": []})
+        self.assertEqual(error["error"], "boom")
+        self.assertEqual(error.get("description", "none"), "none")
+
+    def test_repeated_strings_are_shared(self):
+        other = Recipe.from_dict(json.loads(json.dumps(RECIPE)))
+        self.assertIs(other.category, self.recipe.category)
+        self.assertIs(other.ingredients[0], self.recipe.ingredients[0])
+        self.assertIs(other.quantities[0].unit, self.recipe.quantities[0].unit)
+        quantity = self.recipe.quantities[0]
+        self.assertIsInstance(quantity, Quantity)
+        self.assertIs(quantity.min, quantity.amount)
+
+    def test_pickle(self):
+        self.assertEqual(pickle.loads(pickle.dumps(self.recipe)), RECIPE)
+        self.assertIsInstance(pickle.loads(pickle.dumps(self.recipe)), Recipe)
+
+    def test_templates(self):
+        template = Environment().from_string("{{ recipe.title }} {{ recipe.category }} [{{ recipe.error }}]")
+        self.assertEqual(template.render(recipe=self.recipe), "番茄炒蛋的做法 vegetable_dish []")
+
+if __name__ == '__main__':
+    unittest.main()
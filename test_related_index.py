@@ -0,0 +1,63 @@
+import unittest
+import os
+import random
+import shutil
+import tempfile
+from related_index import RelatedIndex, recipe_features, jaccard, MIN_SIMILARITY
+
+INGREDIENTS = ["鸡蛋", "番茄", "土豆", "五花肉", "豆腐", "青椒", "洋葱", "茄子", "黄瓜", "虾仁", "牛腩", "排骨",
+               "白菜", "胡萝卜", "香菇", "木耳", "鸡胸肉", "鲈鱼", "面粉", "大米"]
+
+
+class TestRelatedIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.recipes = [
+            {"title": "番茄炒蛋的做法", "ingredients": ["番茄", "鸡蛋", "食用油"]},
+            {"title": "番茄蛋汤的做法", "ingredients": ["番茄", "鸡蛋", "小葱"]},
+            {"title": "红烧排骨的做法", "ingredients": ["排骨", "冰糖", "生抽"]},
+            {"title": "糖醋排骨的做法", "ingredients": ["排骨", "冰糖", "醋"]},
+            {"title": "清蒸鲈鱼的做法", "ingredients": ["鲈鱼", "蒸鱼豉油"]},
+            {"title": "", "ingredients": []},
+        ]
+        self.index = RelatedIndex.build(self.recipes)
+
+    def test_recipe_features(self):
+        # Kitchen basics (食用油) are left out, "的做法" is not part of the title shingles
+        self.assertEqual(recipe_features(self.recipes[0]), {"i:番茄", "i:鸡蛋", "t:番茄", "t:茄炒", "t:炒蛋"})
+        self.assertEqual(recipe_features(self.recipes[5]), set())
+
+    def test_related(self):
+        self.assertEqual([recipe_id for recipe_id, _ in self.index.related(0)], [1])
+        self.assertEqual([recipe_id for recipe_id, _ in self.index.related(3)], [2])
+        self.assertEqual(self.index.related(4), []) # Nothing similar enough
+        self.assertEqual(self.index.related(5), [])
+        self.assertEqual(self.index.related(99), [])
+        recipe_id, similarity = self.index.related(1)[0]
+        self.assertEqual(similarity, round(jaccard(recipe_features(self.recipes[1]), recipe_features(self.recipes[0])), 4))
+
+    def test_recall_against_exact_jaccard(self):
+        rng = random.Random(7)
+        recipes = []
+        for number in range(400):
+            ingredients = rng.sample(INGREDIENTS, rng.randint(2, 6))
+            recipes.append({"title": f"{ingredients[0]}{ingredients[-1]}{number}", "ingredients": ingredients})
+        exact = RelatedIndex.build_exact(recipes)
+        for neighbors in exact.neighbors:
+            self.assertTrue(all(similarity >= MIN_SIMILARITY for _, similarity in neighbors))
+        self.assertGreater(RelatedIndex.build(recipes).recall(exact), 0.8)
+        self.assertEqual(exact.recall(exact), 1.0)
+
+    def test_save_and_load(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, "related_recipes.json")
+            self.index.save(path, "digest-a")
+            self.assertIsNone(RelatedIndex.load(path, "digest-b"))
+            self.assertEqual(RelatedIndex.load(path, "digest-a").neighbors, self.index.neighbors)
+            self.assertIsNone(RelatedIndex.load(os.path.join(test_dir, "missing.json"), "digest-a"))
+        finally:
+            shutil.rmtree(test_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from reloader import scan_markdown_tree, diff_trees, RecipeWatcher
+
+class TestReloader(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.root = Path(self.test_dir)
+        (self.root / "cat1").mkdir()
+        (self.root / "cat1" / "a.md").write_text("# A\n", encoding='utf-8')
+        (self.root / "cat1" / "a.jpg").write_bytes(b"not markdown")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_scan_only_markdown(self):
+        state = scan_markdown_tree(self.test_dir)
+        self.assertEqual(list(state), [os.path.join("cat1", "a.md")])
+
+    def test_diff_trees(self):
+        old = {"a.md": (1, 10), "b.md": (1, 10), "c.md": (1, 10)}
+        new = {"a.md": (1, 10), "b.md": (2, 10), "d.md": (1, 10)}
+        self.assertEqual(diff_trees(old, new), (["d.md"], ["b.md"], ["c.md"]))
+
+    def test_watcher_check(self):
+        changes = []
+        watcher = RecipeWatcher(self.test_dir, lambda *change: changes.append(change))
+        self.assertFalse(watcher.check())
+
+        (self.root / "cat1" / "b.md").write_text("# B\n", encoding='utf-8')
+        path_a = self.root / "cat1" / "a.md"
+        path_a.write_text("# A, longer\n", encoding='utf-8')
+        self.assertTrue(watcher.check())
+        self.assertEqual(changes, [([os.path.join("cat1", "b.md")], [os.path.join("cat1", "a.md")], [])])
+
+        path_a.unlink()
+        self.assertTrue(watcher.check())
+        self.assertEqual(changes[-1], ([], [], [os.path.join("cat1", "a.md")]))
+        self.assertFalse(watcher.check())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import gzip
+import threading
+from werkzeug.http import parse_accept_header
+from render_cache import CachedPage, RenderCache, brotli
+
+class TestRenderCache(unittest.TestCase):
+
+    def test_render_once(self):
+        cache = RenderCache()
+        calls = []
+
+        def render():
+            calls.append(1)
+            return "<p>page</p>"
+
+        first = cache.get(('index',), render)
+        second = cache.get(('index',), render)
+        self.assertIs(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(first.body, b"<p>page</p>")
+
+    def test_other_pages_do_not_wait_for_a_render(self):
+        cache = RenderCache()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow_render():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "<p>slow</p>"
+
+        threads = [threading.Thread(target=cache.get, args=(('recipe', 1), slow_render)) for _ in range(2)]
+        threads[0].start()
+        self.assertTrue(started.wait(5))
+        threads[1].start()
+        other = threading.Thread(target=cache.get, args=(('recipe', 2), lambda: "<p>fast</p>"))
+        other.start()
+        other.join(2)
+        self.assertFalse(other.is_alive()) # Rendered while ('recipe', 1) is still being rendered
+        self.assertFalse(release.is_set())
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1) # The second request for ('recipe', 1) waited for the first
+        self.assertEqual(cache.get(('recipe', 1), slow_render).body, b"<p>slow</p>")
+        self.assertEqual(cache._building, {})
+
+    def test_failed_render_leaves_nothing_behind(self):
+        cache = RenderCache()
+
+        def broken_render():
+            raise ValueError("template error")
+
+        for key in range(3):
+            with self.assertRaises(ValueError):
+                cache.get(('recipe', key), broken_render)
+        self.assertEqual((len(cache), cache._building), (0, {}))
+        self.assertEqual(cache.get(('recipe', 0), lambda: "<p>fixed</p>").body, b"<p>fixed</p>")
+
+    def test_negotiate(self):
+        page = CachedPage("<p>" + "x" * 1000 + "</p>")
+        encoding, body, etag = page.negotiate(parse_accept_header("gzip, deflate"))
+        self.assertEqual(encoding, "gzip")
+        self.assertEqual(gzip.decompress(body), page.body)
+        self.assertEqual(etag, f"{page.etag}-gz")
+        self.assertEqual(page.negotiate(parse_accept_header(""))[0], None)
+        self.assertEqual(page.negotiate(parse_accept_header("gzip;q=0"))[0], None)
+        if brotli is not None:
+            self.assertEqual(page.negotiate(parse_accept_header("gzip, br"))[0], "br")
+        # Same bytes, same ETag, regardless of when the page was built
+        self.assertEqual(CachedPage(page.body).variants, page.variants)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import os
+import shutil
+import tempfile
+from search_index import SearchIndex, tokenize
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.recipes = [
+            {"title": "红烧肉的做法", "description": "经典家常菜", "ingredients": ["五花肉", "冰糖"],
+             "instructions": ["五花肉切块", "小火炖煮"]},
+            {"title": "番茄炒蛋的做法", "description": "Quick and easy", "ingredients": ["番茄", "鸡蛋"],
+             "instructions": ["鸡蛋打散", "番茄切块"]},
+            {"title": "清蒸鲈鱼的做法", "description": "", "ingredients": ["鲈鱼", "葱"],
+             "instructions": ["鱼身划刀"]},
+        ]
+        self.index = SearchIndex.build(self.recipes)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("红烧肉 Coke", unigrams=False), ["红烧", "烧肉", "coke"])
+        self.assertEqual(tokenize("鱼"), ["鱼"])
+        self.assertEqual(tokenize("鸡蛋"), ["鸡蛋", "鸡", "蛋"])
+
+    def test_search_ranking(self):
+        results = self.index.search("红烧肉")
+        self.assertEqual(results[0][0], 0)
+        self.assertEqual([recipe_id for recipe_id, _ in self.index.search("番茄")], [1])
+        # Title matches weigh more than instructions
+        self.assertEqual(self.index.search("鸡蛋")[0][0], 1)
+        self.assertEqual(self.index.search("QUICK")[0][0], 1)
+        self.assertEqual(self.index.search("鱼")[0][0], 2)
+        self.assertEqual(self.index.search("的做法"), [])
+        self.assertEqual(self.index.search("不存在"), [])
+
+    def test_save_and_load(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, "search_index.json")
+            self.index.save(path, "digest-a")
+            self.assertIsNone(SearchIndex.load(path, "digest-b"))
+            loaded = SearchIndex.load(path, "digest-a")
+            self.assertEqual(loaded.search("五花肉"), self.index.search("五花肉"))
+            self.assertIsNone(SearchIndex.load(os.path.join(test_dir, "missing.json"), "digest-a"))
+        finally:
+            shutil.rmtree(test_dir)
+
+if __name__ == '__main__':
+    unittest.main()
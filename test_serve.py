@@ -0,0 +1,73 @@
+import unittest
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+@unittest.skipUnless(hasattr(os, 'fork'), "serve.py needs fork()")
+class TestServe(unittest.TestCase):
+
+    def setUp(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.server = subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "serve.py"),
+                                        "--port", str(self.port), "-w", "2"],
+                                       cwd=REPO_ROOT, stderr=subprocess.DEVNULL)
+        # The socket listens before the workers exist, so wait for an actual response
+        deadline = time.time() + 60
+        while True:
+            try:
+                self.get('/')
+                break
+            except OSError:
+                if time.time() > deadline or self.server.poll() is not None:
+                    self.fail("serve.py did not start")
+                time.sleep(0.1)
+
+    def tearDown(self):
+        if self.server.poll() is None:
+            self.server.terminate()
+        self.server.wait(timeout=30)
+
+    def get(self, path):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def test_workers_serve_and_stop(self):
+        with open(f"/proc/{self.server.pid}/task/{self.server.pid}/children", 'r') as f:
+            workers = [int(pid) for pid in f.read().split()]
+        self.assertEqual(len(workers), 2)
+        for _ in range(4):
+            status, body = self.get('/api/recipes/0?fields=title')
+            self.assertEqual(status, 200)
+            self.assertEqual(json.loads(body)["id"], 0)
+
+        # A crashed worker is replaced
+        os.kill(workers[0], signal.SIGKILL)
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            with open(f"/proc/{self.server.pid}/task/{self.server.pid}/children", 'r') as f:
+                current = [int(pid) for pid in f.read().split()]
+            if len(current) == 2 and workers[0] not in current:
+                break
+            time.sleep(0.1)
+        self.assertEqual(len(current), 2)
+        self.assertEqual(self.get('/')[0], 200)
+
+        self.server.terminate()
+        self.assertEqual(self.server.wait(timeout=30), 0)
+
+if __name__ == '__main__':
+    unittest.main()
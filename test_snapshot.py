@@ -0,0 +1,60 @@
+import unittest
+import os
+import shutil
+import tempfile
+from snapshot import RecipeSnapshot, write_snapshot
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "recipes.snapshot")
+        self.recipes = [
+            {"title": "红烧肉的做法", "difficulty": "★★★", "ingredients": ["五花肉", "冰糖"],
+             "calculations": {"五花肉": "500g"}, "image_paths": [], "category": "meat_dish"},
+            {"title": "Error parsing file", "source_file": "dishes/x.md", "error": "boom",
+             "category": "error", "description": None, "calculations": None},
+            {},
+        ]
+        write_snapshot(self.path, self.recipes, recipes_digest="abc")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_round_trip(self):
+        snapshot = RecipeSnapshot(self.path)
+        self.assertEqual(len(snapshot), 3)
+        self.assertEqual(snapshot.recipes_digest, "abc")
+        self.assertEqual([dict(recipe) for recipe in snapshot], self.recipes)
+        # Field order is kept, as in recipes.json
+        self.assertEqual(list(snapshot[1]), list(self.recipes[1]))
+        self.assertEqual(snapshot[-1].copy(), {})
+        with self.assertRaises(IndexError):
+            snapshot[3]
+
+    def test_lazy_fields(self):
+        recipe = RecipeSnapshot(self.path)[0]
+        self.assertEqual(recipe._values, {})
+        self.assertEqual(recipe['title'], "红烧肉的做法")
+        self.assertEqual(list(recipe._values), ['title'])
+        self.assertEqual(recipe.raw('calculations'), '{"五花肉":"500g"}'.encode('utf-8'))
+        self.assertIsNone(recipe.get('source_file'))
+        self.assertNotIn('source_file', recipe)
+        with self.assertRaises(KeyError):
+            recipe['source_file']
+        # Fields are attributes too, decoded on first access
+        self.assertEqual(recipe.difficulty, "★★★")
+        self.assertEqual(list(recipe._values), ['title', 'difficulty'])
+        self.assertEqual(recipe.difficulty, "★★★")
+        with self.assertRaises(AttributeError):
+            recipe.source_file
+
+    def test_rejects_other_files(self):
+        other = os.path.join(self.test_dir, "recipes.json")
+        with open(other, 'w', encoding='utf-8') as f:
+            f.write("[]")
+        with self.assertRaises(ValueError):
+            RecipeSnapshot(other)
+
+if __name__ == '__main__':
+    unittest.main()
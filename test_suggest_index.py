@@ -0,0 +1,60 @@
+import unittest
+import random
+from unittest import mock
+import suggest_index
+from suggest_index import SuggestIndex
+
+INGREDIENTS = ["鸡蛋", "鸡腿", "鸡胸肉", "番茄", "土豆", "红薯", "红枣", "五花肉", "豆腐", "青椒"]
+
+
+class TestSuggestIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.recipes = [
+            {"title": "番茄炒蛋的做法", "ingredients": ["番茄", "鸡蛋", "食用油"]},
+            {"title": "番茄蛋汤的做法", "ingredients": ["番茄", "鸡蛋", "小葱"]},
+            {"title": "鸡蛋羹的做法", "ingredients": ["鸡蛋", "温水"]},
+            {"title": "Pasta Carbonara", "ingredients": ["Pasta", "鸡蛋"]},
+            {"title": "", "ingredients": []},
+        ]
+        self.index = SuggestIndex.build(self.recipes)
+
+    def _texts(self, prefix, limit=10):
+        return [suggestion["text"] for suggestion in self.index.suggest(prefix, limit)]
+
+    def test_titles_without_suffix_and_ingredients(self):
+        self.assertEqual(self.index.suggest("番茄炒"), [{"text": "番茄炒蛋", "type": "recipe", "id": 0}])
+        self.assertEqual(self.index.suggest("鸡蛋")[0], {"text": "鸡蛋", "type": "ingredient", "recipes": 4})
+        self.assertEqual(self._texts("的做法"), [])
+        # Kitchen basics (食用油) are not suggested as ingredients
+        self.assertEqual(self._texts("食用"), [])
+
+    def test_ranking(self):
+        # Ingredients used by more recipes first, then shorter texts
+        self.assertEqual(self._texts("番"), ["番茄", "番茄炒蛋", "番茄蛋汤"])
+        self.assertEqual(self._texts("鸡"), ["鸡蛋", "鸡蛋羹"])
+        self.assertEqual(self._texts("番", limit=1), ["番茄"])
+
+    def test_prefix_normalization(self):
+        self.assertEqual(self._texts("pas"), ["Pasta", "Pasta Carbonara"])
+        self.assertEqual(self._texts(" PASTA C "), ["Pasta Carbonara"])
+        self.assertEqual(self._texts(""), [])
+        self.assertEqual(self._texts("   "), [])
+        self.assertEqual(self._texts("牛"), [])
+
+    def test_precomputed_prefixes_match_scanning(self):
+        rng = random.Random(3)
+        recipes = [{"title": f"{rng.choice(INGREDIENTS)}{rng.choice(INGREDIENTS)}{i}的做法",
+                    "ingredients": rng.sample(INGREDIENTS, 3)} for i in range(300)]
+        with mock.patch.object(suggest_index, "SCAN_LIMIT", 20):
+            index = SuggestIndex.build(recipes)
+        scanning = SuggestIndex(index.keys, index.ranks, index.suggestions, {})
+        self.assertIn("鸡", index.top)
+        self.assertIn("鸡蛋", index.top)
+        for prefix in ["鸡", "鸡蛋", "鸡蛋番", "红", "土豆1", "z"]:
+            for limit in (1, 5, 10):
+                self.assertEqual(index.suggest(prefix, limit), scanning.suggest(prefix, limit), (prefix, limit))
+
+
+if __name__ == '__main__':
+    unittest.main()